@@ -1,153 +1,595 @@
-from flask import Flask, request, jsonify, render_template
-import pandas as pd
-import numpy as np
-import joblib
+from flask import Flask, Response, g, request, jsonify, render_template
+import json
 import os
-from sklearn.preprocessing import LabelEncoder
+import threading
+import time
+import warnings
 import logging
+from features import REQUIRED_FIELDS
+from prediction_cache import PredictionCache
+from model_store import MODEL_DIR, ModelWatcher, load_bundle
+from micro_batcher import MicroBatcher
+from shadow import ShadowEvaluator
+from drift import DriftMonitor
+from metrics import MetricsRegistry, SlowRequestProfiler, StageTimer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Models fitted on a DataFrame warn when scored with the pipeline's NumPy rows
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
 app = Flask(__name__)
 
-# Global variables for encoders and model
-label_encoders = {}
-model = None
+# The active model version (a model_store.ModelBundle). Requests read it once
+# and reloads replace it with a single assignment.
+active_model = None
+
+# Serializes reloads and records the outcome of the last one
+reload_lock = threading.Lock()
+reload_status = {'state': 'idle'}
+
+# Batch scoring limits
+BATCH_CHUNK_SIZE = 1000
+MAX_BATCH_ROWS = 50000
+
+# Prediction cache, keyed on the encoded feature row (size 0 disables it)
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 10000))
+PREDICTION_CACHE_TTL = float(os.environ['PREDICTION_CACHE_TTL']) if os.environ.get('PREDICTION_CACHE_TTL') else None
+prediction_cache = PredictionCache(max_size=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL)
+
+# Inputs up to this many rows are scored with the flat forest; larger batches
+# go to sklearn's compiled traversal, which wins once per-call overhead is amortized
+FLAT_FOREST_MAX_ROWS = int(os.environ.get('FLAT_FOREST_MAX_ROWS', 64))
+
+# Slim serving: the flat forest scores every input, so the sklearn model is
+# never deserialized and sklearn never imported (serve.py skips preloading it)
+SLIM_SERVING = os.environ.get('SLIM_SERVING', '0') == '1'
+if SLIM_SERVING:
+    FLAT_FOREST_MAX_ROWS = MAX_BATCH_ROWS
+
+# Optional micro-batching of concurrent /api/predict calls: rows are queued and
+# scored together once MICRO_BATCH_MAX_SIZE rows are waiting or the oldest has
+# waited MICRO_BATCH_WAIT_MS
+MICRO_BATCHING = os.environ.get('MICRO_BATCHING', '0') == '1'
+MICRO_BATCH_WAIT_MS = float(os.environ.get('MICRO_BATCH_WAIT_MS', 2))
+MICRO_BATCH_MAX_SIZE = int(os.environ.get('MICRO_BATCH_MAX_SIZE', 64))
+MICRO_BATCH_TIMEOUT = 30
+micro_batcher = MicroBatcher(max_wait=MICRO_BATCH_WAIT_MS / 1e3,
+                             max_batch_size=MICRO_BATCH_MAX_SIZE) if MICRO_BATCHING else None
+
+# Optional shadow evaluation: a candidate model loaded from SHADOW_MODEL_DIR
+# scores a SHADOW_SAMPLE_RATE sample of /api/predict rows on background
+# threads. Samples that do not fit in the queue are dropped.
+SHADOW_MODEL_DIR = os.environ.get('SHADOW_MODEL_DIR')
+SHADOW_SAMPLE_RATE = float(os.environ.get('SHADOW_SAMPLE_RATE', 0.1))
+SHADOW_WORKERS = int(os.environ.get('SHADOW_WORKERS', 1))
+SHADOW_QUEUE_SIZE = int(os.environ.get('SHADOW_QUEUE_SIZE', 1000))
+SHADOW_BATCH_SIZE = int(os.environ.get('SHADOW_BATCH_SIZE', 64))
+shadow = None
+
+# Feature drift monitoring: encoded /api/predict rows are counted into a
+# fixed-size sketch of the latest DRIFT_WINDOW to 2 x DRIFT_WINDOW requests and
+# compared with the model's training sketch on /api/drift (0 disables)
+DRIFT_WINDOW = int(os.environ.get('DRIFT_WINDOW', 10000))
+drift_monitor = None
+
+# Serving metrics, exposed in the Prometheus text format on /api/metrics
+metrics = MetricsRegistry()
+REQUESTS = metrics.counter('car_price_requests_total', 'HTTP requests by endpoint and status', ('endpoint', 'status'))
+REQUEST_LATENCY = metrics.histogram('car_price_request_duration_seconds', 'Request latency by endpoint', ('endpoint',))
+PREDICT_STAGE_LATENCY = metrics.histogram('car_price_predict_stage_seconds',
+                                          '/api/predict latency by stage', ('stage',))
+PREDICT_ERRORS = metrics.counter('car_price_predict_errors_total', '/api/predict failures by cause', ('cause',))
+BATCH_ROWS = metrics.counter('car_price_batch_rows_total', 'Rows received by /api/predict/batch', ('result',))
+MODEL_RELOADS = metrics.counter('car_price_model_reloads_total', 'Model loads by result', ('result',))
+MODEL_LOAD_SECONDS = metrics.gauge('car_price_model_load_seconds', 'Time to load and smoke-test the active model')
+MODEL_INFO = metrics.gauge('car_price_model_info', 'Active model version', ('version',))
+CACHE_LOOKUPS = metrics.counter('car_price_prediction_cache_lookups_total', 'Prediction cache lookups', ('result',))
+CACHE_ENTRIES = metrics.gauge('car_price_prediction_cache_entries', 'Predictions held in the cache')
+QUOTES = metrics.counter('car_price_quotes_total', '/api/quote answers by source', ('source',))
+SHADOW_ROWS = metrics.counter('car_price_shadow_rows_total', 'Rows sampled for the shadow model by outcome',
+                              ('result',))
+SHADOW_DIFFERENCE = metrics.gauge('car_price_shadow_mean_abs_difference',
+                                  'Mean absolute shadow minus primary prediction over recent rows')
+FEATURE_DRIFT = metrics.gauge('car_price_feature_drift_psi',
+                              'Population stability index of recent request features vs training', ('feature',))
+
+# Percentiles returned for a bare ?quantiles on the predict endpoints
+DEFAULT_QUANTILES = [10, 50, 90]
+
+# Optionally cProfile a sample of /api/predict requests and keep the slowest
+slow_request_profiler = SlowRequestProfiler(
+    sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', 0)),
+    keep=int(os.environ.get('PROFILE_KEEP', 10)),
+    directory=os.environ.get('PROFILE_DIR', 'profiles'),
+)
+
+# Poll the model directory for a retrained model every N seconds (0 disables)
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 0))
 
-def load_model_and_encoders():
+# Token required by the admin endpoints; when unset they only answer localhost
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+def load_model_and_encoders(model_dir=MODEL_DIR):
     """Load the trained model and label encoders"""
-    global model, label_encoders
-    
     try:
-        # Load the trained model
-        model = joblib.load('models/random_forest_model.joblib')
-        
-        # Load label encoders
-        label_encoders = joblib.load('models/label_encoders.joblib')
-        
+        reload_model(model_dir)
         logger.info("Model and encoders loaded successfully")
-        return True
     except Exception as e:
         logger.error(f"Error loading model: {str(e)}")
         return False
+    
+    if SHADOW_MODEL_DIR:
+        try:
+            load_shadow_model(SHADOW_MODEL_DIR)
+        except Exception as e:
+            # The primary model serves regardless
+            logger.error(f"Error loading shadow model: {str(e)}")
+    return True
 
-def preprocess_input(data):
-    """Preprocess input data for prediction"""
-    try:
-        # Create a DataFrame with the input data
-        df = pd.DataFrame([data])
+def load_shadow_model(model_dir, sample_rate=None):
+    """Start shadow-scoring a sample of /api/predict rows with the model in ``model_dir``.
+    
+    Replaces the current shadow model, if any, after its queued rows are scored.
+    """
+    global shadow
+    
+    bundle = load_bundle(model_dir, flat_forest_max_rows=FLAT_FOREST_MAX_ROWS)
+    bundle.smoke_test()
+    previous = shadow
+    shadow = ShadowEvaluator(bundle, sample_rate=SHADOW_SAMPLE_RATE if sample_rate is None else sample_rate,
+                             workers=SHADOW_WORKERS, queue_size=SHADOW_QUEUE_SIZE,
+                             max_batch_size=SHADOW_BATCH_SIZE)
+    if previous is not None:
+        previous.stop()
+    logger.info(f"Shadow model version {bundle.version} scores {shadow.sample_rate:.1%} of predictions")
+    return shadow
+
+def reload_model(model_dir=MODEL_DIR):
+    """Load a model version, smoke-test it and swap it in atomically.
+    
+    Requests already running keep the bundle they started with; the old
+    model is released once they finish. Raises if loading or the smoke
+    prediction fails, leaving the active model untouched.
+    """
+    global active_model, drift_monitor
+    
+    with reload_lock:
+        started_at = time.time()
+        reload_status.update(state='loading', started_at=started_at, finished_at=None, error=None)
+        try:
+            bundle = load_bundle(model_dir, flat_forest_max_rows=FLAT_FOREST_MAX_ROWS)
+            bundle.smoke_test()
+        except Exception as e:
+            reload_status.update(state='failed', error=str(e), finished_at=time.time())
+            MODEL_RELOADS.inc(result='failure')
+            raise
         
-        # Feature engineering
-        df['Company'] = df['Name'].str.split().str[0]
+        previous = active_model
+        active_model = bundle
         
-        # Extract numeric values from string columns
-        df['Mileage(km/kg)'] = df['Mileage'].str.split().str[0].astype(float)
-        df['Engine(CC)'] = df['Engine'].str.split().str[0].astype(float)
-        df['Power(bhp)'] = df['Power'].str.split().str[0].astype(float)
+        # Drift is measured against the new model's training data
+        drift_monitor = (DriftMonitor(bundle.drift_reference, window=DRIFT_WINDOW)
+                         if bundle.drift_reference is not None and DRIFT_WINDOW > 0 else None)
         
-        # Handle New_Price if provided
-        if 'New_Price' in df.columns and not pd.isna(df['New_Price'].iloc[0]):
-            df['New_car_Price'] = df['New_Price'].str.split().str[0].astype(float)
-        else:
-            df['New_car_Price'] = np.nan
-        
-        # Encode categorical variables
-        categorical_columns = ['Location', 'Fuel_Type', 'Transmission', 'Owner_Type', 'Company']
-        
-        for col in categorical_columns:
-            if col in label_encoders:
-                df[col] = label_encoders[col].transform(df[col])
-        
-        # Create dummy variables for Location, Fuel_Type, and Transmission
-        location_dummies = pd.get_dummies(df['Location'], prefix='Location')
-        fuel_dummies = pd.get_dummies(df['Fuel_Type'], prefix='Fuel_Type')
-        transmission_dummies = pd.get_dummies(df['Transmission'], prefix='Transmission')
-        
-        # Combine all features
-        final_features = pd.concat([
-            df[['Year', 'Kilometers_Driven', 'Owner_Type', 'Seats', 
-                'Mileage(km/kg)', 'Engine(CC)', 'Power(bhp)']],
-            location_dummies,
-            fuel_dummies,
-            transmission_dummies
-        ], axis=1)
-        
-        # Ensure all expected columns are present
-        expected_columns = [
-            'Year', 'Kilometers_Driven', 'Owner_Type', 'Seats',
-            'Mileage(km/kg)', 'Engine(CC)', 'Power(bhp)',
-            'Location_Bangalore', 'Location_Chennai', 'Location_Coimbatore',
-            'Location_Delhi', 'Location_Hyderabad', 'Location_Jaipur',
-            'Location_Kochi', 'Location_Kolkata', 'Location_Mumbai',
-            'Location_Pune', 'Fuel_Type_Diesel', 'Fuel_Type_LPG',
-            'Fuel_Type_Petrol', 'Transmission_Manual'
-        ]
-        
-        for col in expected_columns:
-            if col not in final_features.columns:
-                final_features[col] = 0
-        
-        # Reorder columns to match training data
-        final_features = final_features[expected_columns]
-        
-        return final_features
+        # Cached predictions belong to the previous model
+        prediction_cache.clear()
         
+        load_seconds = time.time() - started_at
+        reload_status.update(state='succeeded', version=bundle.version, finished_at=time.time(),
+                             load_seconds=round(load_seconds, 3))
+        MODEL_RELOADS.inc(result='success')
+        MODEL_LOAD_SECONDS.set(load_seconds)
+        MODEL_INFO.clear()
+        MODEL_INFO.set(1, version=bundle.version)
+        logger.info(f"Model version {bundle.version} active"
+                    + (f" (replaced {previous.version})" if previous is not None else ""))
+        return bundle
+
+def reload_in_background(model_dir=MODEL_DIR):
+    """Start ``reload_model`` on a background thread"""
+    def run():
+        try:
+            reload_model(model_dir)
+        except Exception as e:
+            logger.error(f"Background model reload failed: {str(e)}")
+    
+    thread = threading.Thread(target=run, name='model-reload', daemon=True)
+    thread.start()
+    return thread
+
+def start_model_watcher(model_dir=MODEL_DIR, interval=MODEL_WATCH_INTERVAL):
+    """Reload automatically whenever train_model.py writes a new model version"""
+    watcher = ModelWatcher(model_dir, interval, lambda: reload_model(model_dir))
+    watcher.start()
+    logger.info(f"Watching {model_dir} for new models every {interval}s")
+    return watcher
+
+def preprocess_input(data, bundle=None, timer=None):
+    """Preprocess input data for prediction"""
+    try:
+        return (bundle or active_model).feature_pipeline.transform_record(data, timer)
     except Exception as e:
         logger.error(f"Error in preprocessing: {str(e)}")
         raise
 
+def preprocess_batch(records, bundle=None):
+    """Preprocess many input records together.
+    
+    Returns the feature matrix for the rows that could be encoded, the
+    positions of those rows in ``records`` and a dict of per-row errors.
+    """
+    return (bundle or active_model).feature_pipeline.transform_records(records)
+
+def parse_batch_body():
+    """Parse a JSON array or NDJSON request body into a list of records.
+    
+    Lines of an NDJSON body that are not valid JSON are kept as per-row
+    errors so the remaining rows can still be scored.
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        records, errors = [], {}
+        lines = [line for line in request.get_data(as_text=True).splitlines() if line.strip()]
+        for i, line in enumerate(lines):
+            try:
+                records.append(json.loads(line))
+            except ValueError as e:
+                records.append(None)
+                errors[i] = f'Invalid JSON: {str(e)}'
+        return records, errors
+    
+    records = request.get_json(silent=True)
+    if not isinstance(records, list):
+        raise ValueError('Expected a JSON array or NDJSON body')
+    return records, {}
+
+def parse_quantiles():
+    """Percentiles requested with ``?quantiles=10,50,90``, or None when not requested"""
+    raw = request.args.get('quantiles')
+    if raw is None:
+        return None
+    if not raw.strip():
+        return DEFAULT_QUANTILES
+    try:
+        percentiles = [float(p) for p in raw.split(',')]
+    except ValueError:
+        raise ValueError(f'Invalid quantiles: {raw!r} (expected percentiles such as 10,50,90)')
+    if not all(0 <= p <= 100 for p in percentiles):
+        raise ValueError(f'Quantiles must be percentiles between 0 and 100, got {raw!r}')
+    return percentiles
+
+def quantile_fields(percentiles, values):
+    """Name each quantile by its percentile, e.g. {"p10": 6.1, "p90": 9.8}"""
+    return {f'p{p:g}': float(value) for p, value in zip(percentiles, values)}
+
 @app.route('/')
 def home():
     """Home page with prediction form"""
     return render_template('index.html')
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.endpoint or 'not_found'
+    REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    started = g.get('request_started')
+    if started is not None:
+        REQUEST_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint)
+    return response
+
+def predict_error(cause, message, status):
+    """Count a failed /api/predict call and build its error response"""
+    PREDICT_ERRORS.inc(cause=cause)
+    return jsonify({'error': message}), status
+
 @app.route('/api/predict', methods=['POST'])
 def predict():
     """API endpoint for car price prediction"""
+    # Stages are charged in order: parse, encode, preprocess, drift, cache, predict, shadow, serialize
+    timer = StageTimer()
+    profile = slow_request_profiler.start()
     try:
         # Get input data
         data = request.get_json()
         
         if not data:
-            return jsonify({'error': 'No data provided'}), 400
+            return predict_error('no_data', 'No data provided', 400)
         
         # Validate required fields
-        required_fields = ['Name', 'Location', 'Year', 'Kilometers_Driven', 
-                          'Fuel_Type', 'Transmission', 'Owner_Type', 
-                          'Mileage', 'Engine', 'Power', 'Seats']
-        
-        missing_fields = [field for field in required_fields if field not in data]
+        missing_fields = [field for field in REQUIRED_FIELDS if field not in data]
         if missing_fields:
-            return jsonify({'error': f'Missing required fields: {missing_fields}'}), 400
+            return predict_error('missing_fields', f'Missing required fields: {missing_fields}', 400)
+        
+        try:
+            percentiles = parse_quantiles()
+        except ValueError as e:
+            return predict_error('invalid_quantiles', str(e), 400)
+        
+        # Pin the model version for the whole request
+        generation = prediction_cache.generation
+        bundle = active_model
+        if bundle is None:
+            return predict_error('model_not_loaded', 'Model not loaded', 503)
+        if percentiles is not None and not bundle.supports_quantiles:
+            return predict_error('invalid_quantiles', f'Model version {bundle.version} cannot return quantiles', 400)
+        timer.mark('parse')
         
         # Preprocess input data
-        processed_data = preprocess_input(data)
+        processed_data = preprocess_input(data, bundle, timer)
+        timer.mark('preprocess')
+        monitor = drift_monitor
+        if monitor is not None:
+            monitor.observe(processed_data)
+            timer.mark('drift')
+        
+        # Intervals come from the same single pass over the trees as the price
+        if percentiles is not None:
+            predictions, quantiles = bundle.predict_quantiles(processed_data, percentiles)
+            prediction = predictions[0]
+            timer.mark('predict')
+            if shadow is not None:
+                shadow.offer(bundle, data, processed_data, prediction)
+                timer.mark('shadow')
+            response = jsonify({
+                'predicted_price': float(prediction),
+                'predicted_price_formatted': f"₹{prediction:,.2f}",
+                'quantiles': quantile_fields(percentiles, quantiles[0]),
+                'input_data': data
+            })
+            timer.mark('serialize')
+            return response
         
-        # Make prediction
-        prediction = model.predict(processed_data)[0]
+        # Make prediction, reusing the cached result for identical features
+        cache_key = PredictionCache.key_for(processed_data)
+        prediction = prediction_cache.get(cache_key)
+        timer.mark('cache')
+        if prediction is None:
+            if micro_batcher is not None:
+                prediction = micro_batcher.predict(bundle, processed_data, timeout=MICRO_BATCH_TIMEOUT)
+            else:
+                prediction = bundle.predict(processed_data)[0]
+            timer.mark('predict')
+            prediction_cache.put(cache_key, prediction, generation)
+        
+        # Queued for the candidate model, or dropped; never waited on
+        if shadow is not None:
+            shadow.offer(bundle, data, processed_data, prediction, timer.stages.get('predict'))
+            timer.mark('shadow')
         
         # Return prediction
-        return jsonify({
+        response = jsonify({
             'predicted_price': float(prediction),
             'predicted_price_formatted': f"₹{prediction:,.2f}",
             'input_data': data
         })
+        timer.mark('serialize')
+        return response
         
     except Exception as e:
         logger.error(f"Prediction error: {str(e)}")
+        if isinstance(e, TimeoutError):
+            cause = 'timeout'
+        elif isinstance(e, ValueError):
+            cause = 'invalid_input'
+        else:
+            cause = 'internal'
+        return predict_error(cause, f'Prediction failed: {str(e)}', 500)
+    
+    finally:
+        for stage, seconds in timer.stages.items():
+            PREDICT_STAGE_LATENCY.observe(seconds, stage=stage)
+        slow_request_profiler.finish(profile, timer.elapsed, 'predict')
+
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_batch():
+    """API endpoint for scoring many cars in one request"""
+    try:
+        records, errors = parse_batch_body()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not records:
+        return jsonify({'error': 'No data provided'}), 400
+    
+    if len(records) > MAX_BATCH_ROWS:
+        return jsonify({'error': f'Batch too large: {len(records)} rows (max {MAX_BATCH_ROWS})'}), 413
+    
+    try:
+        percentiles = parse_quantiles()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    bundle = active_model
+    if bundle is None:
+        return jsonify({'error': 'Model not loaded'}), 503
+    if percentiles is not None and not bundle.supports_quantiles:
+        return jsonify({'error': f'Model version {bundle.version} cannot return quantiles'}), 400
+    
+    results = [None] * len(records)
+    try:
+        for start in range(0, len(records), BATCH_CHUNK_SIZE):
+            chunk = records[start:start + BATCH_CHUNK_SIZE]
+            features, positions, chunk_errors = preprocess_batch(chunk, bundle)
+            
+            for i, message in chunk_errors.items():
+                errors.setdefault(start + i, message)
+            
+            if positions:
+                monitor = drift_monitor
+                if monitor is not None:
+                    monitor.observe(features)
+                # One forest traversal for the whole chunk
+                if percentiles is not None:
+                    predictions, quantiles = bundle.predict_quantiles(features, percentiles)
+                else:
+                    predictions, quantiles = bundle.predict(features), None
+                for j, (i, prediction) in enumerate(zip(positions, predictions)):
+                    results[start + i] = {
+                        'index': start + i,
+                        'predicted_price': float(prediction),
+                        'predicted_price_formatted': f"₹{prediction:,.2f}"
+                    }
+                    if quantiles is not None:
+                        results[start + i]['quantiles'] = quantile_fields(percentiles, quantiles[j])
+    except Exception as e:
+        logger.error(f"Batch prediction error: {str(e)}")
         return jsonify({'error': f'Prediction failed: {str(e)}'}), 500
+    
+    for i, message in errors.items():
+        results[i] = {'index': i, 'error': message}
+    
+    BATCH_ROWS.inc(len(results) - len(errors), result='succeeded')
+    BATCH_ROWS.inc(len(errors), result='failed')
+    
+    return jsonify({
+        'results': results,
+        'count': len(results),
+        'succeeded': len(results) - len(errors),
+        'failed': len(errors)
+    })
+
+@app.route('/api/quote', methods=['POST'])
+def quote():
+    """Quick quote: the precomputed price of the nearest grid cell (see quote_table.py).
+    
+    Cars outside the grid, or any car when no table was built for the active
+    model, get the exact prediction instead.
+    """
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        missing_fields = [field for field in REQUIRED_FIELDS if field not in data]
+        if missing_fields:
+            return jsonify({'error': f'Missing required fields: {missing_fields}'}), 400
+        
+        bundle = active_model
+        if bundle is None:
+            return jsonify({'error': 'Model not loaded'}), 503
+        
+        processed_data = preprocess_input(data, bundle)
+        table = bundle.quote_table
+        price = table.lookup(processed_data[0]) if table is not None else None
+        approximate = price is not None
+        if not approximate:
+            price = float(bundle.predict(processed_data)[0])
+        QUOTES.inc(source='table' if approximate else 'exact')
+        
+        return jsonify({
+            'predicted_price': price,
+            'predicted_price_formatted': f"₹{price:,.2f}",
+            'approximate': approximate,
+            'max_error': table.max_error if approximate else 0.0,
+            'model_version': bundle.version
+        })
+        
+    except Exception as e:
+        logger.error(f"Quote error: {str(e)}")
+        return jsonify({'error': f'Quote failed: {str(e)}'}), 500
 
 @app.route('/api/health')
 def health_check():
     """Health check endpoint"""
+    bundle = active_model
     return jsonify({
         'status': 'healthy',
-        'model_loaded': model is not None,
-        'encoders_loaded': len(label_encoders) > 0
+        'model_loaded': bundle is not None,
+        'model_version': bundle.version if bundle is not None else None,
+        'model_loaded_at': bundle.loaded_at if bundle is not None else None,
+        'flat_forest_loaded': bundle is not None and bundle.flat_forest is not None,
+        'quote_table_loaded': bundle is not None and bundle.quote_table is not None,
+        'encoders_loaded': bundle is not None and len(bundle.label_encoders) > 0,
+        'prediction_cache': prediction_cache.stats(),
+        'micro_batching': micro_batcher.stats() if micro_batcher is not None else {'enabled': False},
+        'shadow': shadow.stats() if shadow is not None else {'enabled': False},
+        'drift_monitoring': drift_monitor is not None
     })
 
+@app.route('/api/ready')
+def readiness_check():
+    """Readiness probe: 200 once a model is loaded and serving, 503 before"""
+    bundle = active_model
+    if bundle is None:
+        return jsonify({'ready': False, 'error': 'Model not loaded'}), 503
+    return jsonify({'ready': True, 'model_version': bundle.version, 'pid': os.getpid()})
+
+def collect_metrics():
+    """Copy counts kept by other components into the registry"""
+    stats = prediction_cache.stats()
+    CACHE_LOOKUPS.set(stats['hits'], result='hit')
+    CACHE_LOOKUPS.set(stats['misses'], result='miss')
+    CACHE_ENTRIES.set(stats['size'])
+    monitor = drift_monitor
+    if monitor is not None:
+        FEATURE_DRIFT.clear()
+        for feature, scores in monitor.scores()['features'].items():
+            if scores['psi'] is not None:
+                FEATURE_DRIFT.set(scores['psi'], feature=feature)
+    if shadow is not None:
+        stats = shadow.stats()
+        SHADOW_ROWS.set(stats['scored'], result='scored')
+        SHADOW_ROWS.set(stats['dropped'], result='dropped')
+        SHADOW_ROWS.set(stats['failed'], result='failed')
+        if 'difference' in stats:
+            SHADOW_DIFFERENCE.set(stats['difference']['mean_abs'])
+
+metrics.add_collector(collect_metrics)
+
+@app.route('/api/metrics')
+def get_metrics():
+    """Serving metrics in the Prometheus text exposition format"""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/drift')
+def get_drift():
+    """How far recent request features have drifted from the active model's training data"""
+    bundle, monitor = active_model, drift_monitor
+    if bundle is None:
+        return jsonify({'error': 'Model not loaded'}), 503
+    if monitor is None:
+        reason = 'drift monitoring is disabled' if DRIFT_WINDOW <= 0 else 'it has no drift reference; retrain it'
+        return jsonify({'error': f'No drift scores for model version {bundle.version}: {reason}'}), 404
+    return jsonify({'model_version': bundle.version, 'pid': os.getpid(), **monitor.scores()})
+
+def admin_authorized():
+    """Check the admin token, or require a local caller when no token is configured"""
+    if ADMIN_TOKEN:
+        return request.headers.get('X-Admin-Token') == ADMIN_TOKEN
+    return request.remote_addr in ('127.0.0.1', '::1')
+
+@app.route('/api/admin/reload', methods=['GET', 'POST'])
+def admin_reload():
+    """Reload the model from disk without restarting the server.
+    
+    POST starts a background reload (or waits for it with ?wait=1);
+    GET reports the outcome of the last reload.
+    """
+    if not admin_authorized():
+        return jsonify({'error': 'Forbidden'}), 403
+    
+    if request.method == 'GET':
+        return jsonify(reload_status)
+    
+    if reload_lock.locked():
+        return jsonify({'error': 'Reload already in progress', **reload_status}), 409
+    
+    if request.args.get('wait'):
+        try:
+            bundle = reload_model()
+        except Exception as e:
+            return jsonify({'error': f'Reload failed: {str(e)}', **reload_status}), 500
+        return jsonify({'model_version': bundle.version, **reload_status})
+    
+    reload_in_background()
+    return jsonify({'status': 'reloading'}), 202
+
 @app.route('/api/features')
 def get_features():
     """Get available features and their options"""
@@ -167,6 +609,9 @@ if __name__ == '__main__':
         os.makedirs('models')
         logger.warning("Models directory created. Please train and save your model first.")
     
+    if MODEL_WATCH_INTERVAL > 0:
+        start_model_watcher()
+    
     if load_model_and_encoders():
         app.run(debug=True, host='0.0.0.0', port=5000)
     else:
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Cold Start Benchmark
+Starts fresh Python processes that each bring up the server the way serve.py
+does (import app, load and smoke-test the model, preload) and answer one
+/api/predict request through the Flask test client. Reports the time of each
+step and the total time to first prediction, measured from process launch.
+
+Modes compared:
+    full   SLIM_SERVING=0: preloads the sklearn model and pandas before serving
+    slim   SLIM_SERVING=1: flat forest and JSON encoders only, sklearn never imported
+
+Usage:
+    python -m benchmarks.cold_start
+    python -m benchmarks.cold_start --model-dir models --repeats 10 --budget 0.5 --output cold_start.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+MODES = {'full': '0', 'slim': '1'}
+
+# Libraries a slim worker should never load
+HEAVY_MODULES = ['pandas', 'sklearn', 'scipy', 'joblib']
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.reload_model({model_dir!r})
+loaded = time.perf_counter()
+import serve
+serve.preload(app.active_model)
+preloaded = time.perf_counter()
+response = app.app.test_client().post('/api/predict', json={car!r})
+assert response.status_code == 200, response.get_data(as_text=True)
+predicted = time.perf_counter()
+print(json.dumps({{'import_s': imported - start, 'load_s': loaded - imported, 'preload_s': preloaded - loaded,
+                  'predict_s': predicted - preloaded,
+                  'heavy_modules': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def cold_start(mode, model_dir, car):
+    """Time one fresh process from launch to its first prediction"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, 'SLIM_SERVING': MODES[mode], 'PYTHONPATH': root}
+    script = CHILD.format(model_dir=model_dir, car=car, heavy=HEAVY_MODULES)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, env=env, cwd=root)
+    total_s = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{mode} cold start failed:\n{result.stderr}")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['total_s'] = total_s
+    # Interpreter start-up and module teardown, outside the child's own timers
+    timings['interpreter_s'] = total_s - sum(timings[k] for k in ['import_s', 'load_s', 'preload_s', 'predict_s'])
+    return timings
+
+
+def prepare_model_dir(train_rows, n_estimators):
+    """Train a forest on synthetic listings and save it the way train_model.py does"""
+    import joblib
+    from sklearn.ensemble import RandomForestRegressor
+    from benchmarks.synthetic_data import make_listings
+    from flat_forest import FlatForest
+    from model_store import FEATURE_PIPELINE_FILE, FLAT_FOREST_DIR, MODEL_FILE, write_model_info
+    from train_model import build_training_matrix
+
+    model_dir = tempfile.mkdtemp(prefix='cold_start_')
+    X, y, pipeline = build_training_matrix(make_listings(train_rows, seed=1))
+    forest = RandomForestRegressor(n_estimators=n_estimators, random_state=42).fit(X, y)
+    joblib.dump(forest, os.path.join(model_dir, MODEL_FILE))
+    FlatForest.from_sklearn(forest).save(os.path.join(model_dir, FLAT_FOREST_DIR))
+    pipeline.save(os.path.join(model_dir, FEATURE_PIPELINE_FILE))
+    write_model_info({'version': 'cold-start'}, model_dir)
+    return model_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model-dir', help='Directory written by train_model.py (default: synthetic model)')
+    parser.add_argument('--train-rows', type=int, default=6000)
+    parser.add_argument('--n-estimators', type=int, default=100)
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    parser.add_argument('--repeats', type=int, default=5, help='Fresh processes per mode')
+    parser.add_argument('--budget', type=float, default=1.0,
+                        help='Exit non-zero if the slim median time to first prediction exceeds this (seconds)')
+    parser.add_argument('--output', help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    from benchmarks.synthetic_data import make_requests
+
+    created_dir = not args.model_dir
+    if args.model_dir:
+        model_dir = os.path.abspath(args.model_dir)
+    else:
+        print(f"🤖 Training a {args.n_estimators}-tree forest on {args.train_rows:,} synthetic listings...")
+        model_dir = prepare_model_dir(args.train_rows, args.n_estimators)
+    car = make_requests(1, seed=7)[0]
+
+    print(f"📂 Model directory: {model_dir}, {args.repeats} processes per mode (medians)\n")
+    print(f"{'mode':<5} | {'python':>8} | {'import':>8} | {'load':>8} | {'preload':>8} | {'predict':>8} | "
+          f"{'total':>8} | heavy modules")
+    summary = {}
+    for mode in args.modes:
+        runs = [cold_start(mode, model_dir, car) for _ in range(args.repeats)]
+        median = {key: round(float(np.median([run[key] for run in runs])) * 1e3, 1)
+                  for key in ['interpreter_s', 'import_s', 'load_s', 'preload_s', 'predict_s', 'total_s']}
+        summary[mode] = {'median_ms': median, 'heavy_modules': runs[-1]['heavy_modules'], 'runs': runs}
+        print(f"{mode:<5} | {median['interpreter_s']:>5.0f} ms | {median['import_s']:>5.0f} ms | "
+              f"{median['load_s']:>5.0f} ms | {median['preload_s']:>5.0f} ms | {median['predict_s']:>5.1f} ms | "
+              f"{median['total_s']:>5.0f} ms | {', '.join(runs[-1]['heavy_modules']) or 'none'}")
+
+    if created_dir:
+        shutil.rmtree(model_dir)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+    if 'slim' in summary and summary['slim']['median_ms']['total_s'] > args.budget * 1e3:
+        print(f"\n❌ Slim time to first prediction is over the {args.budget:g} s budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
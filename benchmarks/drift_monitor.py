@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Drift Monitor Benchmark
+Measures what the streaming drift monitor (drift.py) costs and shows what it
+reports:
+
+    observe        DriftMonitor.observe per row: one request, and a 1,000-row batch
+    predict        /api/predict latency through the Flask test client, with the
+                   monitor on and off (interleaved, same cars, no prediction cache)
+    memory         size of the live sketch, which stays fixed however many rows arrive
+    detection      PSI of requests drawn like the training data vs a shifted mix
+                   (older, more driven cars, half of them in Mumbai)
+
+Usage:
+    python -m benchmarks.drift_monitor
+    python -m benchmarks.drift_monitor --requests 5000 --output drift.json
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+import app as webapp
+from benchmarks.forest_inference import median_latency
+from benchmarks.synthetic_data import make_listings, make_requests
+from drift import DriftMonitor, DriftSketch
+from flat_forest import FlatForest
+from model_store import ModelBundle
+from train_model import build_training_matrix
+
+
+def shift(cars):
+    return [dict(car, Year=car['Year'] - 6, Kilometers_Driven=car['Kilometers_Driven'] * 2,
+                 Location='Mumbai' if i % 2 else car['Location']) for i, car in enumerate(cars)]
+
+
+def observe_cost(reference, rows):
+    monitor = DriftMonitor(reference)
+    single = [rows[i:i + 1] for i in range(len(rows))]
+    start = time.perf_counter()
+    for row in single:
+        monitor.observe(row)
+    per_row_us = (time.perf_counter() - start) / len(single) * 1e6
+    batch_us = median_latency(monitor.observe, rows[:1000], 20) / len(rows[:1000]) * 1e6
+    return per_row_us, batch_us
+
+
+def predict_latency(bundle, reference, cars, window):
+    """Median /api/predict latency (ms) with and without the monitor, requests interleaved"""
+    client = webapp.app.test_client()
+    webapp.active_model = bundle
+    webapp.prediction_cache.max_size = 0
+    monitors = {'off': None, 'on': DriftMonitor(reference, window=window)}
+    timings = {'off': [], 'on': []}
+    for car in cars[:50]:
+        client.post('/api/predict', json=car)
+    for i, car in enumerate(cars):
+        for mode in (('off', 'on') if i % 2 else ('on', 'off')):
+            webapp.drift_monitor = monitors[mode]
+            start = time.perf_counter()
+            client.post('/api/predict', json=car)
+            timings[mode].append(time.perf_counter() - start)
+    webapp.drift_monitor = None
+    return {mode: float(np.median(values)) * 1e3 for mode, values in timings.items()}, monitors['on']
+
+
+def detection(reference, pipeline, cars, window):
+    results = {}
+    for name, batch in [('steady', cars), ('shifted', shift(cars))]:
+        monitor = DriftMonitor(reference, window=window)
+        for car in batch:
+            monitor.observe(pipeline.transform_record(car))
+        results[name] = monitor.scores()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--train-rows', type=int, default=6000)
+    parser.add_argument('--n-estimators', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=3000, help='/api/predict calls per mode')
+    parser.add_argument('--window', type=int, default=10000, help='DriftMonitor window (rows)')
+    parser.add_argument('--output', help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    print(f"🤖 Training a {args.n_estimators}-tree forest on {args.train_rows:,} synthetic listings...")
+    X, y, pipeline = build_training_matrix(make_listings(args.train_rows, seed=1))
+    forest = RandomForestRegressor(n_estimators=args.n_estimators, random_state=42).fit(X, y)
+    bundle = ModelBundle(pipeline, flat_forest=FlatForest.from_sklearn(forest), model=forest, version='benchmark')
+    start = time.perf_counter()
+    reference = DriftSketch.from_matrix(X, pipeline)
+    reference_s = time.perf_counter() - start
+
+    cars = make_requests(args.requests, seed=7)
+    rows = np.vstack([pipeline.transform_record(car) for car in cars])
+    per_row_us, batch_us = observe_cost(reference, rows)
+    latency, monitor = predict_latency(bundle, reference, cars, args.window)
+    overhead_us = (latency['on'] - latency['off']) * 1e3
+    sketch_bytes = reference.size * 8 * 2  # current and previous window counts
+    found = detection(reference, pipeline, cars, args.window)
+
+    print(f"\n📐 Sketch: {len(reference.layout)} features, {reference.size} counters "
+          f"(~{sketch_bytes / 1024:.1f} KB live), reference built in {reference_s * 1e3:.1f} ms")
+    print(f"⏱️  observe: {per_row_us:.2f} µs per request, {batch_us:.2f} µs per row in 1,000-row batches")
+    print(f"🌐 /api/predict median: {latency['off']:.3f} ms off, {latency['on']:.3f} ms on "
+          f"({overhead_us:+.1f} µs, {overhead_us / 10 / latency['off']:+.2f}%)")
+    for name, scores in found.items():
+        print(f"🔎 {name:<8} max PSI {scores['max_psi']:.3f} ({scores['status']}); drifted: "
+              f"{', '.join(scores['drifted']) or 'none'}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'sketch_counters': reference.size, 'sketch_bytes': sketch_bytes,
+                       'reference_build_ms': reference_s * 1e3, 'observe_us': per_row_us,
+                       'observe_batch_us_per_row': batch_us, 'predict_ms': latency,
+                       'predict_overhead_us': overhead_us, 'monitored_rows': monitor.observed,
+                       'detection': found}, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Forest Inference Benchmark
+Compares sklearn's RandomForestRegressor.predict with the flat array forest
+(flat_forest.py) for single-row and batch latency, and checks they agree.
+
+Usage:
+    python -m benchmarks.forest_inference
+    python -m benchmarks.forest_inference --model models/random_forest_model.joblib --output forest.json
+"""
+
+import argparse
+import json
+import time
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from benchmarks.synthetic_data import make_listings
+from flat_forest import FlatForest
+from train_model import build_training_matrix
+
+
+def median_latency(func, X, repeats):
+    """Median wall time of ``func(X)`` over ``repeats`` calls, after one warm-up"""
+    func(X)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def load_or_train(model_path, train_rows, n_estimators, max_depth=None):
+    """Load a saved forest or train one on synthetic listings"""
+    if model_path:
+        print(f"📂 Loading {model_path}")
+        return joblib.load(model_path)
+    print(f"🤖 Training {n_estimators}-tree forest on {train_rows:,} synthetic listings")
+    X, y, _ = build_training_matrix(make_listings(train_rows, seed=1))
+    return RandomForestRegressor(n_estimators=n_estimators, max_depth=max_depth, random_state=42).fit(X, y)
+
+
+def run(forest, batch_sizes, repeats):
+    flat_forest = FlatForest.from_sklearn(forest)
+    X, _, _ = build_training_matrix(make_listings(max(batch_sizes) + 1000, seed=2))
+
+    max_diff = float(np.abs(flat_forest.predict(X) - forest.predict(X)).max())
+    print(f"🌲 {flat_forest.n_trees} trees, {flat_forest.node_count:,} nodes, max depth {flat_forest.max_depth}")
+    print(f"✅ Max abs difference vs sklearn: {max_diff:.3g}")
+
+    results = {'n_trees': flat_forest.n_trees, 'node_count': flat_forest.node_count,
+               'max_depth': flat_forest.max_depth, 'max_abs_diff': max_diff, 'latency': []}
+    print(f"\n{'rows':>8} | {'sklearn':>12} | {'flat':>12} | speedup")
+    for n_rows in batch_sizes:
+        batch = X[:n_rows]
+        # Fewer repeats for large batches keeps the run short
+        n_repeats = max(3, repeats // max(1, n_rows // 100))
+        sklearn_s = median_latency(forest.predict, batch, n_repeats)
+        flat_s = median_latency(flat_forest.predict, batch, n_repeats)
+        results['latency'].append({'rows': n_rows, 'sklearn_ms': sklearn_s * 1e3, 'flat_ms': flat_s * 1e3})
+        print(f"{n_rows:>8,} | {sklearn_s * 1e3:>9.3f} ms | {flat_s * 1e3:>9.3f} ms | {sklearn_s / flat_s:>6.2f}x")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', help='Saved RandomForestRegressor (default: train on synthetic data)')
+    parser.add_argument('--train-rows', type=int, default=6000)
+    parser.add_argument('--n-estimators', type=int, default=100)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10, 100, 1000, 10000])
+    parser.add_argument('--repeats', type=int, default=200)
+    parser.add_argument('--output', help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    forest = load_or_train(args.model, args.train_rows, args.n_estimators)
+    results = run(forest, args.batch_sizes, args.repeats)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+API Load Test
+Sends concurrent /api/predict traffic from a mix of cars and reports
+throughput and p50/p95/p99 latency. Results are saved as JSON; pass an earlier
+result with --compare to fail on throughput or tail latency regressions.
+
+Targets:
+    --target client   Flask test client in this process (no network, default)
+    --target server   start `python app.py` locally and load it over HTTP
+    --target serve    start `python serve.py --workers N` and load it over HTTP
+    --url URL         load an already running server
+
+With --micro no load is generated: preprocess_input and the model predict
+call are timed separately, row by row, in this process.
+
+Usage:
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --target server --concurrency 16 --duration 20 --output load.json
+    python -m benchmarks.load_test --target serve --workers 4 --concurrency 16 --duration 20
+    python -m benchmarks.load_test --mix-size 100000 --compare load.json
+    python -m benchmarks.load_test --micro --requests 5000
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.synthetic_data import make_requests
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT_DIR, 'app.py')
+SERVE_PATH = os.path.join(ROOT_DIR, 'serve.py')
+
+
+def load_mix(mix_file, mix_size, seed):
+    """Cars to send: a JSON array or train-data.csv-shaped CSV, or synthetic cars"""
+    if not mix_file:
+        return make_requests(mix_size, seed=seed)
+    if mix_file.endswith('.csv'):
+        import pandas as pd
+        from features import REQUIRED_FIELDS
+        return pd.read_csv(mix_file, usecols=REQUIRED_FIELDS).dropna().to_dict('records')
+    with open(mix_file) as f:
+        return json.load(f)
+
+
+def latency_summary(seconds):
+    """Percentiles of a list of latencies, in milliseconds"""
+    ms = np.asarray(seconds) * 1e3
+    if ms.size == 0:
+        return {}
+    return {
+        'mean_ms': round(float(ms.mean()), 3),
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(ms, 95)), 3),
+        'p99_ms': round(float(np.percentile(ms, 99)), 3),
+        'max_ms': round(float(ms.max()), 3),
+    }
+
+
+class ClientTarget:
+    """Calls the app in-process through Flask's test client"""
+
+    name = 'client'
+
+    def __init__(self):
+        import app
+        if not app.load_model_and_encoders():
+            raise SystemExit("❌ Could not load the model; run train_model.py first")
+        self._app = app.app
+
+    def session(self):
+        client = self._app.test_client()
+        def post(car):
+            response = client.post('/api/predict', json=car)
+            return response.status_code
+        return post
+
+    def health(self):
+        return self._app.test_client().get('/api/health').get_json()
+
+    def close(self):
+        pass
+
+
+class HttpTarget:
+    """Calls a server over HTTP, optionally starting it first with ``command``"""
+
+    def __init__(self, url, command=None, name='url', timeout=60):
+        import requests
+        self._requests = requests
+        self.url = url.rstrip('/')
+        self.name = name
+        self._process = None
+        if command:
+            # Its own session so the debug reloader's child or serve.py's workers are stopped too
+            self._process = subprocess.Popen(command,
+                                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                             start_new_session=True)
+        self._wait_until_healthy(timeout)
+
+    def _wait_until_healthy(self, timeout):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                if self._requests.get(f"{self.url}/api/health", timeout=2).json().get('model_loaded'):
+                    return
+            except (self._requests.RequestException, ValueError):
+                pass
+            if self._process is not None and self._process.poll() is not None:
+                break
+            time.sleep(0.5)
+        self.close()
+        raise SystemExit(f"❌ Server at {self.url} did not become healthy")
+
+    def session(self):
+        session = self._requests.Session()
+        def post(car):
+            return session.post(f"{self.url}/api/predict", json=car, timeout=30).status_code
+        return post
+
+    def health(self):
+        return self._requests.get(f"{self.url}/api/health", timeout=5).json()
+
+    def close(self):
+        if self._process is not None and self._process.poll() is None:
+            os.killpg(self._process.pid, signal.SIGTERM)
+            self._process.wait()
+
+
+def run_load(target, cars, concurrency, duration, n_requests, seed):
+    """Post cars from ``concurrency`` threads until the duration or request budget runs out"""
+    latencies = [[] for _ in range(concurrency)]
+    statuses = [{} for _ in range(concurrency)]
+    budget = iter(range(n_requests)) if n_requests else None
+    budget_lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def worker(i):
+        post = target.session()
+        rng = np.random.default_rng(seed + i)
+        while time.perf_counter() < stop_at:
+            if budget is not None:
+                with budget_lock:
+                    if next(budget, None) is None:
+                        return
+            car = cars[rng.integers(len(cars))]
+            start = time.perf_counter()
+            try:
+                status = post(car)
+            except Exception as e:
+                status = type(e).__name__
+            latencies[i].append(time.perf_counter() - start)
+            statuses[i][status] = statuses[i].get(status, 0) + 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    all_latencies = [s for per_thread in latencies for s in per_thread]
+    status_counts = {}
+    for per_thread in statuses:
+        for status, count in per_thread.items():
+            status_counts[str(status)] = status_counts.get(str(status), 0) + count
+    return {
+        'requests': len(all_latencies),
+        'errors': len(all_latencies) - status_counts.get('200', 0),
+        'status_counts': status_counts,
+        'elapsed_s': round(elapsed, 3),
+        'rps': round(len(all_latencies) / elapsed, 1),
+        **latency_summary(all_latencies),
+    }
+
+
+def run_micro(cars, n_requests):
+    """Time preprocessing and model prediction separately for single rows"""
+    import app
+    if not app.load_model_and_encoders():
+        raise SystemExit("❌ Could not load the model; run train_model.py first")
+    bundle = app.active_model
+
+    preprocess_s, predict_s = [], []
+    for i in range(n_requests):
+        car = cars[i % len(cars)]
+        start = time.perf_counter()
+        features = app.preprocess_input(car, bundle)
+        mid = time.perf_counter()
+        bundle.predict(features)
+        end = time.perf_counter()
+        preprocess_s.append(mid - start)
+        predict_s.append(end - mid)
+
+    return {
+        'rows': n_requests,
+        'model_version': bundle.version,
+        'flat_forest': bundle.flat_forest is not None,
+        'preprocess_input': latency_summary(preprocess_s),
+        'predict': latency_summary(predict_s),
+    }
+
+
+def compare(result, baseline, tolerance):
+    """Return regressions of ``result`` against ``baseline`` beyond ``tolerance`` (a fraction)"""
+    regressions = []
+    if 'rps' in baseline and result['rps'] < baseline['rps'] * (1 - tolerance):
+        regressions.append(f"rps {result['rps']:,.1f} < baseline {baseline['rps']:,.1f}")
+    for key in ['p50_ms', 'p95_ms', 'p99_ms']:
+        if key in baseline and result[key] > baseline[key] * (1 + tolerance):
+            regressions.append(f"{key} {result[key]:.2f} > baseline {baseline[key]:.2f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--target', choices=['client', 'server', 'serve'], default='client')
+    parser.add_argument('--workers', type=int, default=2, help='serve.py worker processes (--target serve)')
+    parser.add_argument('--url', help='Load an already running server instead')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of load')
+    parser.add_argument('--requests', type=int, help='Stop after this many requests')
+    parser.add_argument('--warmup', type=int, default=50, help='Requests sent before measuring')
+    parser.add_argument('--mix-file', help='Cars as a JSON array or train-data.csv-shaped CSV')
+    parser.add_argument('--mix-size', type=int, default=1000, help='Distinct synthetic cars (few = cache hits)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--micro', action='store_true', help='Time preprocess_input and predict separately')
+    parser.add_argument('--output', help='Write results as JSON to this path')
+    parser.add_argument('--compare', help='Earlier --output file to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='Allowed regression (fraction)')
+    args = parser.parse_args()
+
+    cars = load_mix(args.mix_file, args.mix_size, args.seed)
+    config = {key: value for key, value in vars(args).items() if key not in ('output', 'compare')}
+    result = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'config': config, 'mix_cars': len(cars)}
+
+    if args.micro:
+        print(f"🔬 Timing preprocess_input and predict on {args.requests or 5000:,} rows...")
+        micro = run_micro(cars, args.requests or 5000)
+        result['micro'] = micro
+        print(f"\n{'stage':<18} | {'p50':>10} | {'p95':>10} | {'p99':>10}")
+        for stage in ['preprocess_input', 'predict']:
+            s = micro[stage]
+            print(f"{stage:<18} | {s['p50_ms'] * 1e3:>7.1f} µs | {s['p95_ms'] * 1e3:>7.1f} µs | "
+                  f"{s['p99_ms'] * 1e3:>7.1f} µs")
+    else:
+        if args.url:
+            target = HttpTarget(args.url)
+        elif args.target == 'server':
+            print("🚀 Starting app.py...")
+            target = HttpTarget('http://localhost:5000', [sys.executable, APP_PATH], 'server')
+        elif args.target == 'serve':
+            print(f"🚀 Starting serve.py with {args.workers} workers...")
+            target = HttpTarget('http://localhost:5000', [sys.executable, SERVE_PATH, '--workers', str(args.workers)],
+                                f'serve.py x{args.workers}')
+        else:
+            target = ClientTarget()
+
+        try:
+            if args.warmup:
+                run_load(target, cars, 1, float('inf'), args.warmup, args.seed)
+            print(f"🔥 {args.concurrency} clients, {len(cars):,} distinct cars, "
+                  f"{args.requests or f'{args.duration:g}s'} against {target.name}...")
+            load = run_load(target, cars, args.concurrency, args.duration if not args.requests else float('inf'),
+                            args.requests, args.seed)
+            load['health'] = target.health()
+        finally:
+            target.close()
+
+        result['load'] = load
+        print(f"\n✅ {load['requests']:,} requests, {load['errors']:,} errors, {load['rps']:,.1f} req/s")
+        print(f"   p50 {load['p50_ms']:.2f} ms | p95 {load['p95_ms']:.2f} ms | "
+              f"p99 {load['p99_ms']:.2f} ms | max {load['max_ms']:.2f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2, default=str)
+        print(f"\n💾 Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if args.micro:
+            pairs = [(result['micro'][s], baseline['micro'][s]) for s in ['preprocess_input', 'predict']]
+        else:
+            pairs = [(result['load'], baseline['load'])]
+        regressions = [r for current, base in pairs for r in compare(current, base, args.tolerance)]
+        if regressions:
+            print(f"\n❌ Regressions vs {args.compare} (tolerance {args.tolerance:.0%}):")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print(f"\n✅ No regressions vs {args.compare} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Micro-batching Benchmark
+Runs N client threads that each score single rows back to back, once calling
+the model directly per request and once through MicroBatcher, and reports
+throughput, per-request latency and how full the merged batches were.
+
+Usage:
+    python -m benchmarks.micro_batching
+    python -m benchmarks.micro_batching --clients 1 8 32 --wait-ms 1 2 5 --output batching.json
+"""
+
+import argparse
+import json
+import threading
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from benchmarks.synthetic_data import make_listings
+from flat_forest import FlatForest
+from micro_batcher import MicroBatcher
+from model_store import ModelBundle
+from train_model import build_training_matrix
+
+
+def make_bundle(train_rows, n_estimators):
+    """Train a forest on synthetic listings and wrap it the way the server does"""
+    X, y, pipeline = build_training_matrix(make_listings(train_rows, seed=1))
+    forest = RandomForestRegressor(n_estimators=n_estimators, random_state=42).fit(X, y)
+    return ModelBundle(pipeline, flat_forest=FlatForest.from_sklearn(forest), model=forest), X
+
+
+def run_clients(score, rows, n_clients, duration):
+    """Call ``score(row)`` from ``n_clients`` threads for ``duration`` seconds"""
+    latencies = [[] for _ in range(n_clients)]
+    stop_at = time.perf_counter() + duration
+
+    def client(i):
+        rng = np.random.default_rng(i)
+        while time.perf_counter() < stop_at:
+            row = rows[rng.integers(len(rows))][None, :]
+            start = time.perf_counter()
+            score(row)
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n_clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    all_ms = np.concatenate([np.asarray(l) for l in latencies]) * 1e3
+    return {
+        'requests': int(all_ms.size),
+        'throughput_rps': round(all_ms.size / elapsed, 1),
+        'p50_ms': round(float(np.percentile(all_ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(all_ms, 95)), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--train-rows', type=int, default=6000)
+    parser.add_argument('--n-estimators', type=int, default=100)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--wait-ms', type=float, nargs='+', default=[2.0])
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=3.0, help='Seconds per measurement')
+    parser.add_argument('--output', help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    print(f"🤖 Training a {args.n_estimators}-tree forest on {args.train_rows:,} synthetic listings...")
+    bundle, X = make_bundle(args.train_rows, args.n_estimators)
+
+    results = []
+    print(f"\n{'clients':>7} | {'mode':<14} | {'req/s':>9} | {'p50':>9} | {'p95':>9} | batch fill")
+    for n_clients in args.clients:
+        direct = run_clients(lambda row: bundle.predict(row)[0], X, n_clients, args.duration)
+        results.append({'clients': n_clients, 'mode': 'direct', **direct})
+        print(f"{n_clients:>7} | {'direct':<14} | {direct['throughput_rps']:>9,.0f} | "
+              f"{direct['p50_ms']:>6.2f} ms | {direct['p95_ms']:>6.2f} ms |")
+
+        for wait_ms in args.wait_ms:
+            batcher = MicroBatcher(max_wait=wait_ms / 1e3, max_batch_size=args.max_batch_size)
+            batched = run_clients(lambda row: batcher.predict(bundle, row), X, n_clients, args.duration)
+            stats = batcher.stats()
+            batcher.stop()
+            mode = f'batched {wait_ms:g}ms'
+            results.append({'clients': n_clients, 'mode': mode, **batched, 'batcher': stats})
+            print(f"{n_clients:>7} | {mode:<14} | {batched['throughput_rps']:>9,.0f} | "
+                  f"{batched['p50_ms']:>6.2f} ms | {batched['p95_ms']:>6.2f} ms | "
+                  f"{stats['mean_batch_size']:.1f}/{args.max_batch_size}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
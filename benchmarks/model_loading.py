@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Model Loading Benchmark
+Starts N worker processes that each load the model the way a server worker
+would, and reports per-worker load time, first-prediction latency and memory
+(RSS, plus PSS/private from /proc so pages shared between workers are visible).
+
+Loaders compared:
+    joblib       joblib.load of the sklearn model (the original loader)
+    joblib_mmap  joblib.load(..., mmap_mode='r') of the sklearn model
+    flat_mmap    FlatForest.load of the .npy node arrays, memory-mapped
+
+Usage:
+    python -m benchmarks.model_loading
+    python -m benchmarks.model_loading --model-dir models --workers 4 --output loading.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+LOADERS = ['joblib', 'joblib_mmap', 'flat_mmap']
+
+
+def read_memory_mb():
+    """RSS, PSS and private memory of this process in MB (Linux only)"""
+    memory = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and parts[2] == 'kB':
+                    memory[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    except OSError:
+        return {}
+    return {
+        'rss_mb': round(memory.get('Rss', 0), 1),
+        'pss_mb': round(memory.get('Pss', 0), 1),
+        'private_mb': round(memory.get('Private_Clean', 0) + memory.get('Private_Dirty', 0), 1),
+    }
+
+
+def load_model(loader, model_dir):
+    if loader == 'joblib':
+        import joblib
+        return joblib.load(os.path.join(model_dir, 'random_forest_model.joblib'))
+    if loader == 'joblib_mmap':
+        import joblib
+        return joblib.load(os.path.join(model_dir, 'random_forest_model.joblib'), mmap_mode='r')
+    from flat_forest import FlatForest
+    return FlatForest.load(os.path.join(model_dir, 'random_forest_flat'), mmap_mode='r')
+
+
+def worker(loader, model_dir, sample, barrier, results):
+    """Load the model, score one row and report timings and memory"""
+    # Import the heavy libraries up front so only loading is timed
+    import sklearn.ensemble  # noqa: F401
+    import flat_forest  # noqa: F401
+    baseline = read_memory_mb()
+
+    start = time.perf_counter()
+    model = load_model(loader, model_dir)
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model.predict(sample)
+    first_predict_s = time.perf_counter() - start
+
+    # Measure while every worker is alive so shared pages are split between them
+    barrier.wait()
+    memory = read_memory_mb()
+    results.put({
+        'loader': loader,
+        'pid': os.getpid(),
+        'load_ms': round(load_s * 1e3, 2),
+        'first_predict_ms': round(first_predict_s * 1e3, 2),
+        'model_rss_mb': round(memory.get('rss_mb', 0) - baseline.get('rss_mb', 0), 1),
+        **memory,
+    })
+    barrier.wait()
+
+
+def run_loader(loader, model_dir, sample, n_workers):
+    ctx = multiprocessing.get_context('spawn')
+    barrier = ctx.Barrier(n_workers)
+    results = ctx.Queue()
+    processes = [ctx.Process(target=worker, args=(loader, model_dir, sample, barrier, results))
+                 for _ in range(n_workers)]
+    for p in processes:
+        p.start()
+    measurements = [results.get() for _ in processes]
+    for p in processes:
+        p.join()
+    return measurements
+
+
+def prepare_model_dir(train_rows):
+    """Train a forest on synthetic listings and save it in both formats"""
+    import joblib
+    from sklearn.ensemble import RandomForestRegressor
+    from benchmarks.synthetic_data import make_listings
+    from flat_forest import FlatForest
+    from train_model import build_training_matrix
+
+    model_dir = tempfile.mkdtemp(prefix='model_loading_')
+    X, y, _ = build_training_matrix(make_listings(train_rows, seed=1))
+    forest = RandomForestRegressor(n_estimators=100, random_state=42).fit(X, y)
+    joblib.dump(forest, os.path.join(model_dir, 'random_forest_model.joblib'))
+    FlatForest.from_sklearn(forest).save(os.path.join(model_dir, 'random_forest_flat'))
+    return model_dir, X[:1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model-dir', help='Directory written by train_model.py (default: synthetic model)')
+    parser.add_argument('--train-rows', type=int, default=6000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--loaders', nargs='+', choices=LOADERS, default=LOADERS)
+    parser.add_argument('--output', help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    created_dir = not args.model_dir
+    if args.model_dir:
+        model_dir, sample = args.model_dir, np.zeros((1, 21))
+        sample[0, :7] = [2015, 50000, 0, 5, 18.0, 1197, 88.7]
+    else:
+        print(f"🤖 Training a 100-tree forest on {args.train_rows:,} synthetic listings...")
+        model_dir, sample = prepare_model_dir(args.train_rows)
+
+    print(f"📂 Model directory: {model_dir}, {args.workers} workers per loader\n")
+    print(f"{'loader':<12} | {'load':>9} | {'1st pred':>9} | {'RSS':>8} | {'PSS':>8} | {'private':>8}")
+    summary = {}
+    for loader in args.loaders:
+        measurements = run_loader(loader, model_dir, sample, args.workers)
+        mean = {key: round(float(np.mean([m[key] for m in measurements])), 2)
+                for key in ['load_ms', 'first_predict_ms', 'rss_mb', 'pss_mb', 'private_mb', 'model_rss_mb']}
+        summary[loader] = {'mean': mean, 'workers': measurements}
+        print(f"{loader:<12} | {mean['load_ms']:>6.1f} ms | {mean['first_predict_ms']:>6.1f} ms | "
+              f"{mean['rss_mb']:>5.0f} MB | {mean['pss_mb']:>5.0f} MB | {mean['private_mb']:>5.0f} MB")
+
+    if created_dir:
+        shutil.rmtree(model_dir)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Prediction Interval Benchmark
+Compares the latency of a plain forest prediction with prediction plus
+P10/P50/P90 from the per-tree outputs, computed two ways:
+
+    point        ModelBundle.predict (the normal request path)
+    vectorized   ModelBundle.predict_quantiles: all trees in one pass
+    per_tree     calling every estimator's predict in a Python loop
+
+It also reports how often the held-out true price falls inside the interval,
+since the spread of the trees is not a calibrated prediction interval.
+
+Usage:
+    python -m benchmarks.prediction_intervals
+    python -m benchmarks.prediction_intervals --model models/random_forest_model.joblib --output intervals.json
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+from benchmarks.forest_inference import load_or_train, median_latency
+from benchmarks.synthetic_data import make_listings
+from flat_forest import FlatForest
+from model_store import ModelBundle
+from train_model import build_training_matrix
+
+PERCENTILES = [10, 50, 90]
+
+
+def per_tree_loop(forest, X):
+    """The ad hoc way: one predict call per estimator, then percentiles"""
+    per_tree = np.column_stack([estimator.predict(X) for estimator in forest.estimators_])
+    return per_tree.mean(axis=1), np.percentile(per_tree, PERCENTILES, axis=1).T
+
+
+def run(forest, batch_sizes, repeats):
+    bundle = ModelBundle(None, flat_forest=FlatForest.from_sklearn(forest), model=forest)
+    X, y, _ = build_training_matrix(make_listings(max(batch_sizes) + 1000, seed=2))
+    X = np.asarray(X)
+
+    _, quantiles = bundle.predict_quantiles(X, PERCENTILES)
+    _, expected = per_tree_loop(forest, X)
+    max_diff = float(np.abs(quantiles - expected).max())
+    coverage = float(np.mean((quantiles[:, 0] <= y) & (y <= quantiles[:, 2])))
+    width = float(np.median((quantiles[:, 2] - quantiles[:, 0]) / quantiles[:, 1]))
+    print(f"🌲 {len(forest.estimators_)} trees; max abs difference vs per-tree loop: {max_diff:.3g}")
+    print(f"🎯 P10-P90 holds the true price for {coverage:.1%} of {len(y):,} unseen listings "
+          f"(median width {width:.0%} of P50)")
+
+    results = {'n_trees': len(forest.estimators_), 'percentiles': PERCENTILES, 'max_abs_diff': max_diff,
+               'p10_p90_coverage': coverage, 'median_relative_width': width, 'latency': []}
+    print(f"\n{'rows':>8} | {'point':>11} | {'vectorized':>11} | {'per_tree':>11} | overhead")
+    for n_rows in batch_sizes:
+        batch = X[:n_rows]
+        n_repeats = max(3, repeats // max(1, n_rows // 100))
+        point_s = median_latency(bundle.predict, batch, n_repeats)
+        vectorized_s = median_latency(lambda rows: bundle.predict_quantiles(rows, PERCENTILES), batch, n_repeats)
+        loop_s = median_latency(lambda rows: per_tree_loop(forest, rows), batch, n_repeats)
+        results['latency'].append({'rows': n_rows, 'point_ms': point_s * 1e3, 'vectorized_ms': vectorized_s * 1e3,
+                                   'per_tree_ms': loop_s * 1e3})
+        print(f"{n_rows:>8,} | {point_s * 1e3:>8.3f} ms | {vectorized_s * 1e3:>8.3f} ms | "
+              f"{loop_s * 1e3:>8.3f} ms | {vectorized_s / point_s:>6.2f}x")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', help='Saved RandomForestRegressor (default: train on synthetic data)')
+    parser.add_argument('--train-rows', type=int, default=6000)
+    parser.add_argument('--n-estimators', type=int, default=100)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10, 100, 1000, 10000])
+    parser.add_argument('--repeats', type=int, default=200)
+    parser.add_argument('--output', help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    forest = load_or_train(args.model, args.train_rows, args.n_estimators)
+    results = run(forest, args.batch_sizes, args.repeats)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
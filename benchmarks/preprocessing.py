@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Training Preprocessing Benchmark
+Times the vectorized training feature pipeline (clean, fit and transform) against
+the original row-by-row feature engineering loops on synthetic listings of
+increasing size.
+
+Usage:
+    python -m benchmarks.preprocessing
+    python -m benchmarks.preprocessing --rows 10000 100000 1000000 --legacy-max-rows 100000
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_data import make_listings
+from features import FEATURE_COLUMNS
+from train_model import build_training_matrix
+
+# Columns produced by both implementations
+COMPARED_COLUMNS = ['Year', 'Kilometers_Driven', 'Seats', 'Mileage(km/kg)', 'Engine(CC)', 'Power(bhp)']
+
+
+def legacy_preprocess(train_data):
+    """The original per-row feature engineering from train_model.py, kept for comparison"""
+    train_data = train_data[train_data['Mileage'].notna()]
+    train_data = train_data[train_data['Engine'].notna()]
+    train_data = train_data[train_data['Power'].notna()]
+    train_data = train_data[train_data['Seats'].notna()]
+    train_data = train_data.reset_index(drop=True)
+
+    for i in range(train_data.shape[0]):
+        train_data.at[i, 'Company'] = train_data['Name'][i].split()[0]
+        train_data.at[i, 'Mileage(km/kg)'] = train_data['Mileage'][i].split()[0]
+        train_data.at[i, 'Engine(CC)'] = train_data['Engine'][i].split()[0]
+        train_data.at[i, 'Power(bhp)'] = train_data['Power'][i].split()[0]
+
+    train_data['Mileage(km/kg)'] = train_data['Mileage(km/kg)'].astype(float)
+    train_data['Engine(CC)'] = train_data['Engine(CC)'].astype(float)
+
+    train_data = train_data[train_data['Power(bhp)'] != 'null']
+    train_data = train_data.reset_index(drop=True)
+    train_data['Power(bhp)'] = train_data['Power(bhp)'].astype(float)
+
+    for i in range(train_data.shape[0]):
+        if pd.isnull(train_data.loc[i, 'New_Price']) == False:
+            train_data.at[i, 'New_car_Price'] = train_data['New_Price'][i].split()[0]
+
+    train_data['New_car_Price'] = train_data['New_car_Price'].astype(float)
+    return train_data.drop(["Name", "Mileage", "Engine", "Power", "New_Price"], axis=1)
+
+
+def time_call(func, data):
+    """Run ``func`` on a fresh copy of ``data`` and return (seconds, result)"""
+    data = data.copy()
+    start = time.perf_counter()
+    result = func(data)
+    return time.perf_counter() - start, result
+
+
+def run(rows, legacy_max_rows):
+    """Benchmark both implementations for every size in ``rows``"""
+    results = []
+    for n_rows in rows:
+        data = make_listings(n_rows)
+        vectorized_time, (X, _, _) = time_call(build_training_matrix, data)
+        entry = {
+            'rows': n_rows,
+            'vectorized_s': round(vectorized_time, 4),
+            'vectorized_rows_per_s': round(n_rows / vectorized_time),
+        }
+
+        if n_rows <= legacy_max_rows:
+            legacy_time, legacy = time_call(legacy_preprocess, data)
+            # build_training_matrix returns the float32 matrix the models are trained on
+            expected = legacy[COMPARED_COLUMNS].to_numpy(dtype=np.float32)
+            actual = X[:, [FEATURE_COLUMNS.index(col) for col in COMPARED_COLUMNS]]
+            assert np.array_equal(expected, actual), "vectorized features differ from the row loops"
+            entry['legacy_s'] = round(legacy_time, 4)
+            entry['speedup'] = round(legacy_time / vectorized_time, 1)
+
+        results.append(entry)
+        print(f"{n_rows:>10,} rows | vectorized {entry['vectorized_s']:>8.3f}s"
+              + (f" | legacy {entry['legacy_s']:>9.3f}s | {entry['speedup']:>7.1f}x"
+                 if 'legacy_s' in entry else " | legacy skipped"))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--legacy-max-rows', type=int, default=100_000,
+                        help='Skip the row-by-row baseline above this size (it scales badly)')
+    parser.add_argument('--output', help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    print("📊 Training preprocessing benchmark")
+    print("=" * 60)
+    results = run(args.rows, args.legacy_max_rows)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Model Serialization Benchmark
+Saves and loads the same model in every artifact format and compares save
+time, load time, size on disk and the latency of the first prediction after
+loading, over repeated runs:
+
+    joblib           joblib.dump (what train_model.py writes)
+    joblib_zlib<N>   joblib.dump with zlib compression level N (--compress-levels)
+    joblib_mmap      uncompressed joblib, loaded with mmap_mode='r'
+    pickle5          pickle protocol 5, arrays in the pickle stream
+    pickle5_oob      pickle protocol 5, arrays written as out-of-band buffer files
+    flat_mmap        flat node arrays (flat_forest.py), memory-mapped on load
+
+Every load is checked against the original model's predictions. Files are
+re-read from the page cache, so load times are warm-cache times; see
+benchmarks.model_loading for fresh worker processes.
+
+Usage:
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --model models/random_forest_model.joblib --output serialization.json
+    python -m benchmarks.serialization --n-estimators 300 --max-depth 12 --repeats 10
+"""
+
+import argparse
+import gc
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+
+import joblib
+import numpy as np
+
+from benchmarks.forest_inference import load_or_train
+from flat_forest import FlatForest, can_flatten
+
+
+def directory_mb(path):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names) / 2**20
+
+
+def joblib_format(compress=0, mmap_mode=None):
+    def save(model, path):
+        joblib.dump(model, os.path.join(path, 'model.joblib'), compress=('zlib', compress) if compress else 0)
+
+    def load(path):
+        return joblib.load(os.path.join(path, 'model.joblib'), mmap_mode=mmap_mode)
+    return save, load
+
+
+def save_pickle5(model, path):
+    with open(os.path.join(path, 'model.pkl'), 'wb') as f:
+        pickle.dump(model, f, protocol=5)
+
+
+def load_pickle5(path):
+    with open(os.path.join(path, 'model.pkl'), 'rb') as f:
+        return pickle.load(f)
+
+
+def save_pickle5_oob(model, path):
+    """Pickle the object graph; every large buffer goes to its own raw file"""
+    buffers = []
+    with open(os.path.join(path, 'model.pkl'), 'wb') as f:
+        pickle.dump(model, f, protocol=5, buffer_callback=buffers.append)
+    for i, buffer in enumerate(buffers):
+        with open(os.path.join(path, f'buffer_{i}.bin'), 'wb') as f:
+            f.write(buffer.raw())
+    with open(os.path.join(path, 'buffers.json'), 'w') as f:
+        json.dump(len(buffers), f)
+
+
+def load_pickle5_oob(path):
+    with open(os.path.join(path, 'buffers.json')) as f:
+        n_buffers = json.load(f)
+    buffers = []
+    for i in range(n_buffers):
+        buffer_path = os.path.join(path, f'buffer_{i}.bin')
+        buffer = bytearray(os.path.getsize(buffer_path))
+        with open(buffer_path, 'rb') as f:
+            f.readinto(buffer)
+        buffers.append(buffer)
+    with open(os.path.join(path, 'model.pkl'), 'rb') as f:
+        return pickle.load(f, buffers=buffers)
+
+
+def save_flat(model, path):
+    FlatForest.from_sklearn(model).save(path)
+
+
+def load_flat(path):
+    return FlatForest.load(path, mmap_mode='r')
+
+
+def build_formats(compress_levels, flat):
+    """Name -> (save(model, dir), load(dir)) for every format in the run"""
+    formats = {'joblib': joblib_format()}
+    for level in compress_levels:
+        if level:
+            formats[f'joblib_zlib{level}'] = joblib_format(compress=level)
+    formats['joblib_mmap'] = joblib_format(mmap_mode='r')
+    formats['pickle5'] = (save_pickle5, load_pickle5)
+    formats['pickle5_oob'] = (save_pickle5_oob, load_pickle5_oob)
+    if flat:
+        formats['flat_mmap'] = (save_flat, load_flat)
+    return formats
+
+
+def measure_format(name, save, load, model, sample, expected, repeats):
+    """Median save/load/first-predict times of one format over ``repeats`` fresh round trips"""
+    samples = {'save_ms': [], 'load_ms': [], 'first_predict_ms': []}
+    size_mb = None
+    for _ in range(repeats):
+        path = tempfile.mkdtemp(prefix=f'{name}_')
+        try:
+            start = time.perf_counter()
+            save(model, path)
+            samples['save_ms'].append((time.perf_counter() - start) * 1e3)
+            size_mb = directory_mb(path)
+
+            gc.collect()
+            start = time.perf_counter()
+            loaded = load(path)
+            samples['load_ms'].append((time.perf_counter() - start) * 1e3)
+
+            start = time.perf_counter()
+            prediction = loaded.predict(sample)
+            samples['first_predict_ms'].append((time.perf_counter() - start) * 1e3)
+            if np.abs(prediction - expected).max() > 1e-9:
+                raise ValueError(f"{name}: the loaded model predicts differently from the original")
+            del loaded
+        finally:
+            shutil.rmtree(path)
+    return {
+        'format': name,
+        'size_mb': round(size_mb, 2),
+        **{key: round(float(np.median(values)), 3) for key, values in samples.items()},
+        'samples': {key: [round(value, 3) for value in values] for key, values in samples.items()},
+    }
+
+
+def run(model, formats, repeats):
+    # Any row will do for timing; the real model's pipeline is not needed
+    sample = np.zeros((1, model.n_features_in_), dtype=np.float32)
+    expected = model.predict(sample)
+    report = []
+    print(f"\n{'format':<16} | {'size':>9} | {'save':>10} | {'load':>10} | {'1st pred':>10}")
+    for name, (save, load) in formats.items():
+        row = measure_format(name, save, load, model, sample, expected, repeats)
+        report.append(row)
+        print(f"{name:<16} | {row['size_mb']:>6.2f} MB | {row['save_ms']:>7.1f} ms | {row['load_ms']:>7.1f} ms | "
+              f"{row['first_predict_ms']:>7.2f} ms")
+    return report
+
+
+def describe(model):
+    info = {'model_type': type(model).__name__, 'n_features': int(model.n_features_in_)}
+    if can_flatten(model):
+        flat_forest = FlatForest.from_sklearn(model)
+        info.update(n_trees=flat_forest.n_trees, node_count=flat_forest.node_count,
+                    max_depth=int(flat_forest.max_depth))
+    return info
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', help='Saved model, e.g. models/random_forest_model.joblib '
+                                        '(default: train a forest on synthetic data)')
+    parser.add_argument('--train-rows', type=int, default=6000)
+    parser.add_argument('--n-estimators', type=int, default=100)
+    parser.add_argument('--max-depth', type=int, help='Depth cap of the synthetic forest (default: none)')
+    parser.add_argument('--compress-levels', type=int, nargs='+', default=[3, 9],
+                        help='zlib levels to compare with uncompressed joblib (default: 3 9)')
+    parser.add_argument('--repeats', type=int, default=5, help='Round trips per format (default: 5)')
+    parser.add_argument('--output', help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    model = load_or_train(args.model, args.train_rows, args.n_estimators, args.max_depth)
+    info = describe(model)
+    print(f"🌲 {info}; {args.repeats} round trips per format")
+    report = run(model, build_formats(args.compress_levels, can_flatten(model)), args.repeats)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'model': info, 'repeats': args.repeats, 'formats': report}, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Synthetic used-car listings with the same schema as train-data.csv.
+Used by the benchmarks (and tests) so they can run at any size without the real dataset.
+"""
+
+import numpy as np
+import pandas as pd
+
+COMPANIES = ['Maruti', 'Hyundai', 'Honda', 'Toyota', 'Mercedes-Benz', 'Volkswagen',
+             'Ford', 'Mahindra', 'BMW', 'Audi', 'Tata', 'Skoda', 'Renault']
+LOCATIONS = ['Mumbai', 'Pune', 'Chennai', 'Coimbatore', 'Hyderabad', 'Jaipur',
+             'Kochi', 'Kolkata', 'Delhi', 'Bangalore', 'Ahmedabad']
+FUEL_TYPES = ['Diesel', 'Petrol', 'CNG', 'LPG']
+TRANSMISSIONS = ['Manual', 'Automatic']
+OWNER_TYPES = ['First', 'Second', 'Third', 'Fourth & Above']
+
+
+def _with_unit(values, unit, decimals):
+    """Format numbers as "<value> <unit>" strings"""
+    return pd.Series(np.round(values, decimals)).astype(str) + ' ' + unit
+
+
+def make_listings(n_rows, seed=42, null_rate=0.01):
+    """Generate ``n_rows`` raw listings shaped like train-data.csv.
+
+    A small fraction of rows carry the same defects as the real data: missing
+    Mileage/Engine/Power/Seats and 'null bhp' power values. New_Price is
+    mostly missing, as in the original dataset.
+    """
+    rng = np.random.default_rng(seed)
+
+    company = rng.choice(COMPANIES, n_rows)
+    model_no = rng.integers(1, 40, n_rows).astype(str)
+    year = rng.integers(1998, 2020, n_rows)
+    kilometers = rng.integers(1000, 250000, n_rows)
+    fuel = rng.choice(FUEL_TYPES, n_rows, p=[0.53, 0.45, 0.015, 0.005])
+    transmission = rng.choice(TRANSMISSIONS, n_rows, p=[0.71, 0.29])
+    owner = rng.choice(OWNER_TYPES, n_rows, p=[0.82, 0.16, 0.015, 0.005])
+    engine = rng.integers(800, 5000, n_rows)
+    power = engine * rng.uniform(0.05, 0.09, n_rows)
+    mileage = rng.uniform(8.0, 28.0, n_rows)
+
+    df = pd.DataFrame({
+        'Name': pd.Series(company) + ' Model' + model_no + ' VX',
+        'Location': rng.choice(LOCATIONS, n_rows),
+        'Year': year,
+        'Kilometers_Driven': kilometers,
+        'Fuel_Type': fuel,
+        'Transmission': transmission,
+        'Owner_Type': owner,
+        'Mileage': _with_unit(mileage, 'kmpl', 2),
+        'Engine': _with_unit(engine, 'CC', 0),
+        'Power': _with_unit(power, 'bhp', 1),
+        'Seats': rng.choice([4.0, 5.0, 7.0], n_rows, p=[0.1, 0.75, 0.15]),
+        'New_Price': _with_unit(rng.uniform(4.0, 60.0, n_rows), 'Lakh', 2),
+        'Price': np.round(
+            40 * np.exp(-0.12 * (2020 - year)) * (engine / 2000) * rng.uniform(0.7, 1.3, n_rows), 2
+        ),
+    })
+
+    # Inject the defects found in the real data
+    for col in ['Mileage', 'Engine', 'Power', 'Seats']:
+        df.loc[rng.random(n_rows) < null_rate, col] = np.nan
+    df.loc[rng.random(n_rows) < null_rate, 'Power'] = 'null bhp'
+    df.loc[rng.random(n_rows) < 0.85, 'New_Price'] = np.nan
+
+    df.insert(0, 'Unnamed: 0', np.arange(n_rows))
+    return df
+
+
+def make_requests(n_rows, seed=42):
+    """Generate ``n_rows`` clean /api/predict payloads"""
+    df = make_listings(n_rows, seed=seed, null_rate=0.0)
+    df = df.drop(columns=['Unnamed: 0', 'New_Price', 'Price'])
+    return df.to_dict('records')
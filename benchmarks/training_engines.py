@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Training Engine Comparison
+Trains every train_model.py engine (--engine) on the same split and compares
+them side by side:
+
+    fit_s          wall time of fit()
+    peak_fit_mb    peak memory fit() added on top of the loaded data
+    artifact_mb    files train_model.py would save (joblib model plus the
+                   flat node arrays)
+    single_row_ms  one-row latency on the serving path (ModelBundle.predict)
+    batch_ms       1,000-row latency
+    holdout MAE, RMSE and R²
+
+Each engine is trained in a fresh process so peak memory is its own.
+
+Usage:
+    python -m benchmarks.training_engines
+    python -m benchmarks.training_engines --rows 100000 --output engines.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+import joblib
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+from benchmarks.forest_inference import median_latency
+from benchmarks.synthetic_data import make_listings
+from flat_forest import FlatForest, can_flatten
+from model_store import ModelBundle
+from train_model import ENGINES, build_engine, build_training_matrix, evaluate_model
+
+
+def read_status_mb(field):
+    """A memory field of /proc/self/status (e.g. VmRSS, VmHWM) in MB, or None off Linux"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(f'{field}:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_memory():
+    """Reset VmHWM to the current RSS (Linux); returns False where that is not possible"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def directory_mb(path):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names) / 2**20
+
+
+def measure_engine(engine, X_fit, y_fit, X_hold, y_hold, results):
+    """Fit ``engine`` and put its row of the report on ``results`` (runs in a child process)"""
+    model = build_engine(engine)
+    baseline = read_status_mb('VmRSS')
+    peak_tracked = reset_peak_memory()
+    start = time.perf_counter()
+    model.fit(X_fit, y_fit)
+    fit_s = time.perf_counter() - start
+    peak = read_status_mb('VmHWM') if peak_tracked else None
+
+    # Save and load it the way train_model.py and the server do
+    model_dir = tempfile.mkdtemp(prefix=f'{engine}_')
+    try:
+        joblib.dump(model, os.path.join(model_dir, 'model.joblib'))
+        flat_forest = None
+        if can_flatten(model):
+            flat_forest = FlatForest.from_sklearn(model)
+            flat_forest.save(os.path.join(model_dir, 'flat'))
+        artifact_mb = directory_mb(model_dir)
+    finally:
+        shutil.rmtree(model_dir)
+    bundle = ModelBundle(None, flat_forest=flat_forest, model=model)
+
+    holdout = evaluate_model(model, X_hold, y_hold)
+    results.put({
+        'engine': engine,
+        'model_type': type(model).__name__,
+        'fit_s': round(fit_s, 2),
+        'peak_fit_mb': round(peak - baseline, 1) if peak is not None else None,
+        'artifact_mb': round(artifact_mb, 2),
+        'single_row_ms': round(median_latency(bundle.predict, X_hold[:1], 200) * 1e3, 3),
+        'batch_ms': round(median_latency(bundle.predict, X_hold[:1000], 10) * 1e3, 2),
+        'holdout_mae': round(holdout['mae'], 4),
+        'holdout_rmse': round(holdout['rmse'], 4),
+        'holdout_r2': round(holdout['r2'], 4),
+    })
+
+
+def run(engines, X, y):
+    X_fit, X_hold, y_fit, y_hold = train_test_split(np.asarray(X), np.asarray(y), test_size=0.2,
+                                                    random_state=42)
+    # fork: the children share the split instead of pickling it
+    ctx = multiprocessing.get_context('fork')
+    report = []
+    for engine in engines:
+        print(f"⏳ {engine}...")
+        results = ctx.Queue()
+        process = ctx.Process(target=measure_engine, args=(engine, X_fit, y_fit, X_hold, y_hold, results))
+        process.start()
+        report.append(results.get())
+        process.join()
+    return report, len(X_fit), len(X_hold)
+
+
+def print_report(report):
+    columns = [('fit_s', 'fit s'), ('peak_fit_mb', 'peak MB'), ('artifact_mb', 'size MB'),
+               ('single_row_ms', '1 row ms'), ('batch_ms', '1k rows ms'), ('holdout_mae', 'MAE'),
+               ('holdout_rmse', 'RMSE'), ('holdout_r2', 'R²')]
+    print(f"\n{'engine':<24} | " + ' | '.join(f'{label:>10}' for _, label in columns))
+    for row in report:
+        values = ['n/a' if row[key] is None else f'{row[key]:,}' for key, _ in columns]
+        print(f"{row['engine']:<24} | " + ' | '.join(f'{value:>10}' for value in values))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000, help='Synthetic listings (default 50,000)')
+    parser.add_argument('--data', help='Use this CSV of listings instead of synthetic data')
+    parser.add_argument('--engines', nargs='+', choices=list(ENGINES), default=list(ENGINES))
+    parser.add_argument('--output', help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    if args.data:
+        import pandas as pd
+        listings = pd.read_csv(args.data)
+    else:
+        listings = make_listings(args.rows, seed=1)
+    X, y, _ = build_training_matrix(listings)
+    report, n_fit, n_hold = run(args.engines, X, y)
+    print(f"\n📊 {n_fit:,} training rows, {n_hold:,} held out, {os.cpu_count()} CPU cores")
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'fit_rows': n_fit, 'holdout_rows': n_hold, 'cpu_count': os.cpu_count(),
+                       'engines': report}, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
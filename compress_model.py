@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Forest Compression
+Shrinks the trained forest for serving and reports the size/latency/accuracy
+trade-off of each option:
+
+    best_k   keep the k trees that together give the lowest out-of-bag error
+    depth    cut every tree at a maximum depth (nodes there become leaves)
+    distil   train a small forest on the big forest's predictions
+
+A reference forest with the saved model's parameters is refitted on 80% of
+train-data.csv, so each step can be scored on the remaining 20%. Every step is
+saved under models/compressed/<step>/ (sklearn model and flat forest) together
+with report.json and the drift reference of the training data. --deploy copies the chosen step into models/; a running
+server picks it up through its reload endpoint or model watcher.
+
+Usage:
+    python compress_model.py
+    python compress_model.py --best-k 10 20 40 --max-depth 10 14 --distil 20x12
+    python compress_model.py --deploy best_k_20
+"""
+
+import argparse
+import copy
+import json
+import os
+import shutil
+import time
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import train_test_split
+from sklearn.tree._tree import Tree
+
+from drift import DRIFT_REFERENCE_FILE, DriftSketch
+from features import FEATURE_COLUMNS, UNIT_FIELDS
+from flat_forest import FlatForest
+from model_store import (MODEL_DIR, MODEL_FILE, LABEL_ENCODERS_FILE, FEATURE_PIPELINE_FILE, FLAT_FOREST_DIR,
+                         SERVING_PIPELINE_FILE, write_model_info)
+from train_model import TRAIN_DATA_PATH, build_training_matrix, data_info, read_listings
+
+COMPRESSED_DIR = os.path.join(MODEL_DIR, 'compressed')
+REPORT_FILE = 'report.json'
+
+# sklearn's markers for leaf nodes
+TREE_LEAF = -1
+TREE_UNDEFINED = -2
+
+
+def truncate_tree(estimator, max_depth):
+    """Copy of a fitted decision tree cut at ``max_depth``, with unreachable nodes dropped.
+
+    Internal nodes already store the mean target of their samples, so a node
+    at the cut simply becomes a leaf predicting that mean.
+    """
+    state = estimator.tree_.__getstate__()
+    nodes, values = state['nodes'], state['values']
+
+    # Breadth-first walk that renumbers the nodes that are kept
+    order, depth = [0], [0]
+    new_id = {0: 0}
+    i = 0
+    while i < len(order):
+        node = order[i]
+        if nodes['left_child'][node] != TREE_LEAF and depth[i] < max_depth:
+            for child in (nodes['left_child'][node], nodes['right_child'][node]):
+                new_id[child] = len(order)
+                order.append(child)
+                depth.append(depth[i] + 1)
+        i += 1
+
+    kept = np.array(order)
+    new_nodes = nodes[kept].copy()
+    for j, node in enumerate(kept):
+        left = nodes['left_child'][node]
+        if left == TREE_LEAF or left not in new_id:
+            new_nodes[j]['left_child'] = new_nodes[j]['right_child'] = TREE_LEAF
+            new_nodes[j]['feature'] = TREE_UNDEFINED
+            new_nodes[j]['threshold'] = TREE_UNDEFINED
+        else:
+            new_nodes[j]['left_child'] = new_id[left]
+            new_nodes[j]['right_child'] = new_id[nodes['right_child'][node]]
+
+    tree = Tree(estimator.tree_.n_features, np.array([1], dtype=np.intp), estimator.tree_.n_outputs)
+    tree.__setstate__({'max_depth': int(max(depth)), 'node_count': len(kept),
+                       'nodes': new_nodes, 'values': values[kept].copy()})
+    truncated = copy.copy(estimator)
+    truncated.tree_ = tree
+    truncated.max_depth = max_depth
+    return truncated
+
+
+def cap_depth(forest, max_depth):
+    """Copy of ``forest`` with every tree cut at ``max_depth``"""
+    capped = copy.copy(forest)
+    capped.estimators_ = [truncate_tree(estimator, max_depth) for estimator in forest.estimators_]
+    capped.max_depth = max_depth
+    return capped
+
+
+def keep_trees(forest, indices):
+    """Copy of ``forest`` with only the trees at ``indices``"""
+    subset = copy.copy(forest)
+    subset.estimators_ = [forest.estimators_[i] for i in indices]
+    subset.n_estimators = len(indices)
+    return subset
+
+
+def out_of_bag_mask(forest, n_samples):
+    """Boolean (n_samples, n_trees) mask of the rows each tree did not train on.
+
+    Regenerates each tree's bootstrap sample the way sklearn draws it
+    (sklearn.ensemble._forest._generate_sample_indices).
+    """
+    if not forest.bootstrap:
+        raise ValueError("best-k selection needs a forest fitted with bootstrap=True (out-of-bag rows)")
+    if forest.max_samples is None:
+        n_bootstrap = n_samples
+    elif isinstance(forest.max_samples, float):
+        n_bootstrap = max(round(n_samples * forest.max_samples), 1)
+    else:
+        n_bootstrap = forest.max_samples
+    mask = np.ones((n_samples, len(forest.estimators_)), dtype=bool)
+    for t, estimator in enumerate(forest.estimators_):
+        in_bag = np.random.RandomState(estimator.random_state).randint(0, n_samples, n_bootstrap)
+        mask[in_bag, t] = False
+    return mask
+
+
+def rank_trees(forest, X, y):
+    """Order the trees by greedy forward selection on out-of-bag error.
+
+    Each step adds the tree that most lowers the MAE of the selected trees'
+    mean, scored on rows that are out-of-bag for at least one of them. Any
+    prefix of the returned order is the best-k subset for that k.
+    """
+    predictions = np.column_stack([estimator.predict(X) for estimator in forest.estimators_])
+    oob = out_of_bag_mask(forest, len(X))
+    oob_predictions = np.where(oob, predictions, 0.0)
+
+    total = np.zeros(len(X))
+    count = np.zeros(len(X))
+    remaining = list(range(predictions.shape[1]))
+    order = []
+    while remaining:
+        candidates = np.array(remaining)
+        new_total = total[:, None] + oob_predictions[:, candidates]
+        new_count = count[:, None] + oob[:, candidates]
+        covered = new_count > 0
+        errors = np.abs(new_total / np.maximum(new_count, 1) - y[:, None]) * covered
+        mae = errors.sum(axis=0) / np.maximum(covered.sum(axis=0), 1)
+        best = candidates[int(np.argmin(mae))]
+        order.append(int(best))
+        remaining.remove(best)
+        total += oob_predictions[:, best]
+        count += oob[:, best]
+    return order
+
+
+def distil(teacher, X, n_estimators, max_depth, augment=2, seed=42):
+    """Fit a small forest on the teacher's predictions.
+
+    The training rows are augmented with copies whose continuous features
+    (kilometers, mileage, engine, power) are jittered by about 5%, so the
+    student also learns the teacher's behaviour between the training points.
+    """
+    rng = np.random.default_rng(seed)
+    continuous = [FEATURE_COLUMNS.index(name) for name in ['Kilometers_Driven'] + [f for _, f in UNIT_FIELDS]]
+    samples = [X]
+    for _ in range(augment):
+        jittered = X.copy()
+        jittered[:, continuous] *= rng.normal(1.0, 0.05, (len(X), len(continuous)))
+        samples.append(jittered)
+    X_student = np.vstack(samples)
+
+    student = RandomForestRegressor(n_estimators=n_estimators, max_depth=max_depth, random_state=seed)
+    return student.fit(X_student, teacher.predict(X_student))
+
+
+def dir_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def median_seconds(func, repeats):
+    func()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def measure_step(name, model, X_hold, y_hold, out_dir, batch_rows=1000):
+    """Save ``model`` in both serving formats and measure size, load time, latency and holdout error"""
+    step_dir = os.path.join(out_dir, name)
+    model_path = os.path.join(step_dir, MODEL_FILE)
+    flat_path = os.path.join(step_dir, FLAT_FOREST_DIR)
+    os.makedirs(step_dir, exist_ok=True)
+    joblib.dump(model, model_path)
+    flat_forest = FlatForest.from_sklearn(model)
+    flat_forest.save(flat_path)
+
+    loaded = FlatForest.load(flat_path)
+    row = X_hold[:1]
+    batch = np.resize(X_hold, (batch_rows, X_hold.shape[1]))
+    errors = model.predict(X_hold) - y_hold
+    return {
+        'step': name,
+        'model_type': type(model).__name__,
+        'trees': flat_forest.n_trees,
+        'nodes': flat_forest.node_count,
+        'max_depth': flat_forest.max_depth,
+        'joblib_mb': round(dir_size(model_path) / 2**20, 3),
+        'flat_mb': round(dir_size(flat_path) / 2**20, 3),
+        'joblib_load_ms': round(median_seconds(lambda: joblib.load(model_path), 3) * 1e3, 2),
+        'flat_load_ms': round(median_seconds(lambda: FlatForest.load(flat_path), 3) * 1e3, 2),
+        'single_row_ms': round(median_seconds(lambda: loaded.predict(row), 200) * 1e3, 4),
+        'batch_ms': round(median_seconds(lambda: model.predict(batch), 5) * 1e3, 2),
+        'holdout_mae': round(float(np.abs(errors).mean()), 4),
+        'holdout_rmse': round(float(np.sqrt((errors ** 2).mean())), 4),
+    }
+
+
+def reference_forest(model_dir):
+    """Unfitted forest with the saved model's parameters (train_model.py defaults otherwise)"""
+    model_path = os.path.join(model_dir, MODEL_FILE)
+    if os.path.exists(model_path):
+        saved = joblib.load(model_path)
+        if hasattr(saved, 'estimators_'):
+            return type(saved)(**saved.get_params())
+    return RandomForestRegressor(n_estimators=100, random_state=42)
+
+
+def build_report(X, y, pipeline, best_k, max_depths, distil_shapes, model_dir=MODEL_DIR, out_dir=COMPRESSED_DIR,
+                 data=None):
+    """Fit the reference forest, run every compression step and write the report.
+    
+    ``data`` is the train_model.data_info record of the rows in ``X``; a
+    deployed step needs it for later ``train_model.py --incremental`` runs.
+    """
+    X_fit, X_hold, y_fit, y_hold = train_test_split(X, y, test_size=0.2, random_state=42)
+    forest = reference_forest(model_dir)
+    print(f"🌲 Fitting reference {type(forest).__name__} ({forest.n_estimators} trees) on {len(X_fit):,} rows, "
+          f"holding out {len(X_hold):,}")
+    forest.fit(X_fit, y_fit)
+
+    steps = [('reference', forest, {})]
+    if best_k:
+        try:
+            order = rank_trees(forest, X_fit, y_fit)
+            steps += [(f'best_k_{k}', keep_trees(forest, order[:k]), {'method': 'best_k', 'k': k, 'trees': order[:k]})
+                      for k in best_k if k < len(order)]
+        except ValueError as e:
+            print(f"⚠️  Skipping best-k: {e}")
+    steps += [(f'depth_{d}', cap_depth(forest, d), {'method': 'depth', 'max_depth': d}) for d in max_depths]
+    for n_estimators, max_depth in distil_shapes:
+        print(f"🎓 Distilling into {n_estimators} trees of depth {max_depth}...")
+        steps.append((f'distil_{n_estimators}x{max_depth}', distil(forest, X_fit, n_estimators, max_depth),
+                      {'method': 'distil', 'n_estimators': n_estimators, 'max_depth': max_depth}))
+
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir)
+    os.makedirs(out_dir)
+    # Every step shares the feature pipeline the matrix was built with
+    pipeline.save(os.path.join(out_dir, FEATURE_PIPELINE_FILE))
+    joblib.dump(pipeline.label_encoders, os.path.join(out_dir, LABEL_ENCODERS_FILE))
+    # ...and the training features the drift monitor compares requests with
+    DriftSketch.from_matrix(X, pipeline).save(os.path.join(out_dir, DRIFT_REFERENCE_FILE))
+    report = []
+    print(f"\n{'step':<16} | {'trees':>5} | {'nodes':>9} | {'depth':>5} | {'joblib':>9} | {'flat':>8} | "
+          f"{'load':>8} | {'1 row':>8} | {'1k rows':>9} | {'MAE':>7} | {'RMSE':>7}")
+    for name, model, recipe in steps:
+        result = {**measure_step(name, model, X_hold, y_hold, out_dir), 'recipe': recipe}
+        report.append(result)
+        print(f"{name:<16} | {result['trees']:>5} | {result['nodes']:>9,} | {result['max_depth']:>5} | "
+              f"{result['joblib_mb']:>6.1f} MB | {result['flat_mb']:>5.1f} MB | {result['joblib_load_ms']:>5.0f} ms | "
+              f"{result['single_row_ms']:>5.2f} ms | {result['batch_ms']:>6.1f} ms | "
+              f"{result['holdout_mae']:>7.4f} | {result['holdout_rmse']:>7.4f}")
+
+    with open(os.path.join(out_dir, REPORT_FILE), 'w') as f:
+        json.dump({'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'fit_rows': len(X_fit),
+                   'holdout_rows': len(X_hold), 'data': data, 'steps': report}, f, indent=2)
+    print(f"\n💾 Report and artifacts written to {out_dir}/")
+    return report
+
+
+def deploy(step, model_dir=MODEL_DIR, out_dir=COMPRESSED_DIR):
+    """Copy a compressed step's artifacts into ``model_dir`` and publish a new model version"""
+    with open(os.path.join(out_dir, REPORT_FILE)) as f:
+        report = json.load(f)
+    result = next((r for r in report['steps'] if r['step'] == step), None)
+    if result is None:
+        raise SystemExit(f"❌ Unknown step {step!r}; choose from {[r['step'] for r in report['steps']]}")
+
+    step_dir = os.path.join(out_dir, step)
+    shutil.copy(os.path.join(step_dir, MODEL_FILE), os.path.join(model_dir, MODEL_FILE))
+    for name in [LABEL_ENCODERS_FILE, FEATURE_PIPELINE_FILE, SERVING_PIPELINE_FILE]:
+        shutil.copy(os.path.join(out_dir, name), os.path.join(model_dir, name))
+    if os.path.exists(os.path.join(model_dir, FLAT_FOREST_DIR)):
+        shutil.rmtree(os.path.join(model_dir, FLAT_FOREST_DIR))
+    shutil.copytree(os.path.join(step_dir, FLAT_FOREST_DIR), os.path.join(model_dir, FLAT_FOREST_DIR))
+
+    # The previous model's drift reference describes other training data
+    drift_reference_path = os.path.join(model_dir, DRIFT_REFERENCE_FILE)
+    if os.path.exists(os.path.join(out_dir, DRIFT_REFERENCE_FILE)):
+        shutil.copy(os.path.join(out_dir, DRIFT_REFERENCE_FILE), drift_reference_path)
+    elif os.path.exists(drift_reference_path):
+        os.remove(drift_reference_path)
+
+    # Reports from before the data record was kept cannot be updated incrementally
+    extra_info = {'data': report['data']} if report.get('data') else {}
+    if not extra_info:
+        print(f"⚠️  {REPORT_FILE} does not record the training rows: `train_model.py --incremental` will need "
+              f"a full retrain first. Rerun compress_model.py to record them.")
+
+    # Written last: a running server's model watcher reloads when it changes
+    version = time.strftime('%Y%m%d-%H%M%S') + f'-{step}'
+    write_model_info({
+        'version': version,
+        'trained_at': report['created_at'],
+        'model_type': result['model_type'],
+        'n_rows': report['fit_rows'],
+        'metrics': {'mae': result['holdout_mae'], 'rmse': result['holdout_rmse'],
+                    'evaluated_on': f"{report['holdout_rows']}-row holdout"},
+        'compression': result,
+        **extra_info,
+    }, model_dir)
+    print(f"🚀 Deployed {step} as model version {version} "
+          f"({result['trees']} trees, {result['flat_mb']:.1f} MB flat, holdout MAE {result['holdout_mae']:.4f})")
+
+
+def parse_shape(value):
+    n_estimators, max_depth = value.lower().split('x')
+    return int(n_estimators), int(max_depth)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--best-k', type=int, nargs='*', default=[10, 20, 30, 50])
+    parser.add_argument('--max-depth', type=int, nargs='*', default=[8, 12, 16])
+    parser.add_argument('--distil', type=parse_shape, nargs='*', default=[(20, 12)],
+                        help='Student forests as TREESxDEPTH, e.g. 20x12')
+    parser.add_argument('--deploy', metavar='STEP', help='Copy a step from the last report into models/')
+    args = parser.parse_args()
+
+    if args.deploy:
+        deploy(args.deploy)
+        return
+
+    print("Loading training data...")
+    listings, size = read_listings(TRAIN_DATA_PATH)
+    X, y, pipeline = build_training_matrix(listings)
+    build_report(X, y, pipeline, args.best_k, args.max_depth, args.distil,
+                 data=data_info(TRAIN_DATA_PATH, size, len(listings)))
+
+
+if __name__ == "__main__":
+    main()
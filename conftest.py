@@ -0,0 +1,33 @@
+import joblib
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from benchmarks.synthetic_data import make_listings
+from flat_forest import FlatForest
+from model_store import FEATURE_PIPELINE_FILE, FLAT_FOREST_DIR, MODEL_FILE, write_model_info
+from train_model import build_training_matrix
+
+
+def save_model_dir(path, forest, pipeline, version='v1'):
+    """Write the serving artifacts of ``forest`` to ``path``, as train_model.py saves them"""
+    path.mkdir(parents=True, exist_ok=True)
+    joblib.dump(forest, path / MODEL_FILE)
+    FlatForest.from_sklearn(forest).save(path / FLAT_FOREST_DIR)
+    pipeline.save(path / FEATURE_PIPELINE_FILE)
+    write_model_info({'version': version}, path)
+    return path
+
+
+@pytest.fixture(scope="session")
+def trained_forest():
+    """A small forest fitted on synthetic listings: (forest, X, y, pipeline)"""
+    X, y, pipeline = build_training_matrix(make_listings(800, seed=5))
+    forest = RandomForestRegressor(n_estimators=10, random_state=0).fit(X, y)
+    return forest, X, y, pipeline
+
+
+@pytest.fixture(scope="module")
+def model_dir(tmp_path_factory, trained_forest):
+    """A model directory holding ``trained_forest``, version 'v1' (one per test module)"""
+    forest, _, _, pipeline = trained_forest
+    return save_model_dir(tmp_path_factory.mktemp('models'), forest, pipeline)
@@ -0,0 +1,263 @@
+"""
+Streaming drift monitor for the features /api/predict receives.
+train_model.py saves a reference sketch of the training matrix next to the
+model: a histogram of every numeric feature on its training quantiles and a
+count table of every categorical one. The server keeps a sketch of the same
+fixed shape for recent requests, updated in constant time per row, and
+scores each feature by its population stability index (PSI) against the
+reference. Memory does not grow with traffic.
+"""
+
+import json
+import threading
+from bisect import bisect_right
+
+import numpy as np
+
+from features import NUMERIC_FIELDS, ONE_HOT_FIELDS, UNIT_FIELDS
+
+DRIFT_REFERENCE_FILE = 'drift_reference.json'
+
+# Histogram bins per numeric feature (fewer when the training values repeat)
+DEFAULT_BINS = 20
+
+# Conventional PSI bands: below 0.1 stable, 0.1-0.25 moderate, above 0.25 drifted
+PSI_MODERATE = 0.1
+PSI_DRIFT = 0.25
+
+# Proportion used in place of 0 so empty bins keep PSI finite
+PSI_EPSILON = 1e-4
+
+
+def feature_layout(X, columns, label_encoders, bins=DEFAULT_BINS):
+    """The sketched features of the encoded matrix ``X``, in a JSON-friendly form.
+
+    Numeric features are split at the quantiles of their training values;
+    ``min``/``max`` close the outer bins when estimating quantiles. Owner type
+    is a code column; locations, fuel types and transmissions are one-hot
+    groups whose first label is the dropped baseline category.
+    """
+    slot = {name: i for i, name in enumerate(columns)}
+    layout = []
+    for column in NUMERIC_FIELDS + [feature for _, feature in UNIT_FIELDS]:
+        values = np.asarray(X[:, slot[column]], dtype=np.float64)
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+        layout.append({'name': column, 'kind': 'numeric', 'edges': edges.tolist(),
+                       'min': float(values.min()), 'max': float(values.max())})
+    layout.append({'name': 'Owner_Type', 'kind': 'code',
+                   'labels': [str(c) for c in label_encoders['Owner_Type'].classes_]})
+    for field in ONE_HOT_FIELDS:
+        prefix = field + '_'
+        group = [c for c in columns if c.startswith(prefix)]
+        baseline = [str(c) for c in label_encoders[field].classes_ if prefix + str(c) not in group]
+        layout.append({'name': field, 'kind': 'one_hot', 'columns': group,
+                       'labels': [baseline[0] if len(baseline) == 1 else 'other'] + [c[len(prefix):] for c in group]})
+    return layout
+
+
+class DriftSketch:
+    """Fixed-size counts of encoded feature rows, laid out by ``feature_layout``.
+
+    All features share one flat count array; each feature owns a contiguous
+    range of it. The per-feature lookups are precompiled: ``row_indices``
+    places one row with a bisection per numeric feature and a short scan per
+    one-hot group, and ``indices`` does the same for a whole matrix with NumPy.
+    """
+
+    def __init__(self, layout, columns, counts=None, rows=0):
+        self.layout = layout
+        self.columns = list(columns)
+        slot = {name: i for i, name in enumerate(self.columns)}
+
+        # (slot, edges, offset) per numeric feature; (is_code, slots, offset, n_labels) per categorical one
+        self._numeric, self._categorical, self._ranges = [], [], []
+        offset = 0
+        for feature in layout:
+            if feature['kind'] == 'numeric':
+                size = len(feature['edges']) + 1
+                self._numeric.append((slot[feature['name']], [float(e) for e in feature['edges']], offset))
+            else:
+                size = len(feature['labels'])
+                slots = [slot[feature['name']]] if feature['kind'] == 'code' else [slot[c] for c in feature['columns']]
+                self._categorical.append((feature['kind'] == 'code', slots, offset, size))
+            self._ranges.append((offset, offset + size))
+            offset += size
+        self.size = offset
+
+        self.counts = np.zeros(self.size, dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+        self.rows = rows
+
+    def row_indices(self, row):
+        """Flat count index of every sketched feature of one encoded row"""
+        values = row.tolist()
+        indices = [bisect_right(edges, values[i]) + offset for i, edges, offset in self._numeric]
+        for is_code, slots, offset, size in self._categorical:
+            if is_code:
+                label = min(max(int(values[slots[0]]), 0), size - 1)
+            else:
+                # Baseline (0) unless one of the group's columns is set
+                label = 0
+                for k, i in enumerate(slots):
+                    if values[i]:
+                        label = k + 1
+                        break
+            indices.append(label + offset)
+        return indices
+
+    def indices(self, features):
+        """Flat count indices of many encoded rows: shape (n_rows, n_sketched_features)"""
+        features = np.asarray(features)
+        columns = [np.searchsorted(edges, features[:, i], side='right') + offset
+                   for i, edges, offset in self._numeric]
+        for is_code, slots, offset, size in self._categorical:
+            if is_code:
+                labels = np.clip(features[:, slots[0]].astype(np.int64), 0, size - 1)
+            else:
+                labels = (features[:, slots] != 0) @ np.arange(1, len(slots) + 1)
+            columns.append(labels + offset)
+        return np.column_stack(columns).astype(np.int64)
+
+    def add(self, features):
+        self.counts += np.bincount(self.indices(features).ravel(), minlength=self.size)
+        self.rows += len(features)
+
+    def feature_counts(self, counts=None):
+        """Counts of every feature, by name"""
+        counts = self.counts if counts is None else counts
+        return {f['name']: counts[start:stop] for f, (start, stop) in zip(self.layout, self._ranges)}
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'columns': self.columns, 'rows': int(self.rows), 'layout': self.layout,
+                       'counts': self.counts.tolist()}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            meta = json.load(f)
+        return cls(meta['layout'], meta['columns'], meta['counts'], meta['rows'])
+
+    @classmethod
+    def from_matrix(cls, X, pipeline, bins=DEFAULT_BINS, chunk_size=100000):
+        """Reference sketch of the training matrix ``X`` encoded by ``pipeline``"""
+        sketch = cls(feature_layout(X, pipeline.columns, pipeline.label_encoders, bins), pipeline.columns)
+        return sketch.extended(X, chunk_size)
+
+    def extended(self, X, chunk_size=100000):
+        """A copy with the rows of ``X`` counted too, on the same bins"""
+        sketch = DriftSketch(self.layout, self.columns, self.counts.copy(), self.rows)
+        for start in range(0, len(X), chunk_size):
+            sketch.add(X[start:start + chunk_size])
+        return sketch
+
+
+def population_stability(reference, live):
+    """PSI between two count arrays over the same bins"""
+    p = np.maximum(reference / max(reference.sum(), 1), PSI_EPSILON)
+    q = np.maximum(live / max(live.sum(), 1), PSI_EPSILON)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def psi_status(psi):
+    if psi is None:
+        return 'insufficient_data'
+    if psi >= PSI_DRIFT:
+        return 'drift'
+    return 'moderate' if psi >= PSI_MODERATE else 'stable'
+
+
+def histogram_quantile(feature, counts, q):
+    """Estimate quantile ``q`` of a numeric feature from its bin counts (linear within a bin)"""
+    total = counts.sum()
+    if not total:
+        return None
+    bounds = [feature['min']] + feature['edges'] + [feature['max']]
+    cumulative = np.cumsum(counts)
+    i = int(np.searchsorted(cumulative, q * total))
+    below = cumulative[i - 1] if i else 0
+    fraction = (q * total - below) / counts[i] if counts[i] else 0.0
+    return float(bounds[i] + fraction * (bounds[i + 1] - bounds[i]))
+
+
+class DriftMonitor:
+    """Live sketch of the recent requests, compared with a reference sketch.
+
+    Rows are counted into the current window; after ``window`` rows it
+    becomes the previous window and counting starts afresh. Scores cover
+    both windows, so they always reflect between ``window`` and
+    ``2 * window`` of the latest rows (fewer right after startup).
+    """
+
+    def __init__(self, reference, window=10000, min_rows=100):
+        self.reference = reference
+        self.window = window
+        self.min_rows = min_rows
+        # A plain list: incrementing a few Python ints beats a NumPy scatter for one row
+        self._current = [0] * reference.size
+        self._current_rows = 0
+        self._previous = np.zeros(reference.size, dtype=np.int64)
+        self._previous_rows = 0
+        self.observed = 0
+        self._lock = threading.Lock()
+
+    def observe(self, features):
+        """Count encoded feature rows (shape (n_rows, n_features)) into the live sketch"""
+        if len(features) == 1:
+            indices = self.reference.row_indices(features[0])
+            with self._lock:
+                current = self._current
+                for i in indices:
+                    current[i] += 1
+                self._count_rows(1)
+            return
+        counts = np.bincount(self.reference.indices(features).ravel(), minlength=self.reference.size)
+        with self._lock:
+            self._current = (np.asarray(self._current) + counts).tolist()
+            self._count_rows(len(features))
+
+    def _count_rows(self, n_rows):
+        self._current_rows += n_rows
+        self.observed += n_rows
+        if self._current_rows >= self.window:
+            self._previous = np.array(self._current, dtype=np.int64)
+            self._previous_rows = self._current_rows
+            self._current = [0] * self.reference.size
+            self._current_rows = 0
+
+    def scores(self):
+        """PSI and status of every feature, plus medians or the most changed label for context"""
+        with self._lock:
+            live = np.array(self._current, dtype=np.int64) + self._previous
+            rows = self._current_rows + self._previous_rows
+            observed = self.observed
+        reference = self.reference.feature_counts()
+        features = {}
+        for feature, (name, live_counts) in zip(self.reference.layout,
+                                                self.reference.feature_counts(live).items()):
+            reference_counts = reference[name]
+            psi = round(population_stability(reference_counts, live_counts), 4) if rows >= self.min_rows else None
+            entry = {'kind': 'numeric' if feature['kind'] == 'numeric' else 'categorical',
+                     'psi': psi, 'status': psi_status(psi)}
+            if feature['kind'] == 'numeric':
+                entry['reference_median'] = histogram_quantile(feature, reference_counts, 0.5)
+                entry['live_median'] = histogram_quantile(feature, live_counts, 0.5)
+            elif rows:
+                reference_shares = reference_counts / max(reference_counts.sum(), 1)
+                live_shares = live_counts / rows
+                i = int(np.argmax(np.abs(live_shares - reference_shares)))
+                entry['largest_change'] = {'label': feature['labels'][i],
+                                           'reference_share': round(float(reference_shares[i]), 4),
+                                           'live_share': round(float(live_shares[i]), 4)}
+            features[name] = entry
+        scored = [entry['psi'] for entry in features.values() if entry['psi'] is not None]
+        max_psi = max(scored) if scored else None
+        return {
+            'rows': int(rows),
+            'observed': int(observed),
+            'window': self.window,
+            'reference_rows': int(self.reference.rows),
+            'max_psi': max_psi,
+            'status': psi_status(max_psi),
+            'drifted': [name for name, entry in features.items() if entry['status'] == 'drift'],
+            'features': features,
+        }
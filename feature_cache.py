@@ -0,0 +1,117 @@
+"""
+Cache of the engineered training matrix.
+Parsing train-data.csv and splitting the Mileage/Engine/Power strings is most
+of a training run on large dumps. The resulting matrix (column-major, so each
+feature is one contiguous column), the target and the fitted feature pipeline
+are stored as .npy files and memory-mapped on later runs. Entries are keyed by
+a hash of the CSV contents and of the preprocessing code, so any change to
+either rebuilds the cache.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import time
+from contextlib import nullcontext
+
+import numpy as np
+
+import features
+from features import FeaturePipeline
+
+FEATURE_CACHE_DIR = 'models/feature_cache'
+
+# Bump when the cache layout itself changes
+CACHE_FORMAT = 1
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-1 of the file contents and the number of bytes hashed"""
+    digest = hashlib.sha1()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def code_version(build):
+    """Hash of the preprocessing code: the features module and the ``build`` function"""
+    digest = hashlib.sha1(f'format {CACHE_FORMAT};'.encode())
+    with open(features.__file__, 'rb') as f:
+        digest.update(f.read())
+    digest.update(inspect.getsource(build).encode())
+    return digest.hexdigest()
+
+
+def cache_key(path, build):
+    """Cache key for ``path`` built by ``build``, and the number of bytes it covers"""
+    data_hash, size = file_digest(path)
+    key = hashlib.sha1(f'{data_hash}:{code_version(build)}'.encode()).hexdigest()[:16]
+    return key, size
+
+
+def load_entry(entry_dir):
+    """Memory-map a cache entry and return (X, y, pipeline, meta)"""
+    with open(os.path.join(entry_dir, 'meta.json')) as f:
+        meta = json.load(f)
+    X = np.load(os.path.join(entry_dir, 'X.npy'), mmap_mode='r')
+    y = np.load(os.path.join(entry_dir, 'y.npy'), mmap_mode='r')
+    pipeline = FeaturePipeline.load(os.path.join(entry_dir, 'feature_pipeline.joblib'))
+    return X, y, pipeline, meta
+
+
+def save_entry(entry_dir, X, y, pipeline, meta):
+    """Write a cache entry atomically: a crash leaves no half-written entry behind"""
+    tmp_dir = f'{entry_dir}.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, 'X.npy'), np.asfortranarray(X))
+    np.save(os.path.join(tmp_dir, 'y.npy'), np.ascontiguousarray(y))
+    pipeline.save(os.path.join(tmp_dir, 'feature_pipeline.joblib'))
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_dir, entry_dir)
+
+
+def load_or_build(path, read, build, cache_dir=FEATURE_CACHE_DIR, report=None):
+    """Return (X, y, pipeline, meta) for the listings in ``path``.
+
+    ``read(path)`` returns the raw listings and the bytes read;
+    ``build(listings)`` returns the matrix, target and fitted pipeline. On a
+    cache hit neither is called and the arrays are memory-mapped. On a miss
+    the new entry replaces every older one. Each step is timed as a stage of
+    ``report`` (a StageReport) when one is given.
+    """
+    stage = report.stage if report is not None else (lambda name: nullcontext())
+    with stage('hash data'):
+        key, size = cache_key(path, build)
+    entry_dir = os.path.join(cache_dir, key)
+    if os.path.exists(os.path.join(entry_dir, 'meta.json')):
+        with stage('load cache'):
+            X, y, pipeline, meta = load_entry(entry_dir)
+        return X, y, pipeline, {**meta, 'cache': 'hit'}
+
+    with stage('read csv'):
+        listings, offset = read(path)
+    n_rows = int(len(listings))
+    with stage('build features'):
+        X, y, pipeline = build(listings)
+        # The raw frame is the largest object here; drop it before writing
+        del listings
+    meta = {'key': key, 'source': os.path.abspath(path), 'offset': offset, 'rows': n_rows,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    if offset != size:
+        # The file changed while it was being read; don't cache a mismatched key
+        return X, y, pipeline, {**meta, 'cache': 'skipped'}
+
+    with stage('write cache'):
+        os.makedirs(cache_dir, exist_ok=True)
+        for name in os.listdir(cache_dir):
+            shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+        save_entry(entry_dir, X, y, pipeline, meta)
+    return X, y, pipeline, {**meta, 'cache': 'miss'}
@@ -0,0 +1,419 @@
+"""
+Feature pipeline for the car price model.
+Turns raw listings into the numeric feature rows the model was trained on. The
+same fitted pipeline is used by train_model.py and app.py so training and
+serving cannot drift apart.
+"""
+
+import json
+import os
+
+import numpy as np
+
+# pandas, sklearn and joblib are imported where they are used: serving a single
+# row needs none of them, and importing them dominates a worker's start-up time
+
+# Training column layout, in model order
+FEATURE_COLUMNS = [
+    'Year', 'Kilometers_Driven', 'Owner_Type', 'Seats',
+    'Mileage(km/kg)', 'Engine(CC)', 'Power(bhp)',
+    'Location_Bangalore', 'Location_Chennai', 'Location_Coimbatore',
+    'Location_Delhi', 'Location_Hyderabad', 'Location_Jaipur',
+    'Location_Kochi', 'Location_Kolkata', 'Location_Mumbai',
+    'Location_Pune', 'Fuel_Type_Diesel', 'Fuel_Type_LPG',
+    'Fuel_Type_Petrol', 'Transmission_Manual'
+]
+
+# Categorical fields validated against the fitted label encoders
+CATEGORICAL_COLUMNS = ['Location', 'Fuel_Type', 'Transmission', 'Owner_Type', 'Company']
+
+# Categorical fields that enter the model as one-hot columns
+ONE_HOT_FIELDS = ['Location', 'Fuel_Type', 'Transmission']
+
+# Raw fields holding "<number> <unit>" strings, and the feature they fill
+UNIT_FIELDS = [('Mileage', 'Mileage(km/kg)'), ('Engine', 'Engine(CC)'), ('Power', 'Power(bhp)')]
+
+# Raw fields that are plain numbers
+NUMERIC_FIELDS = ['Year', 'Kilometers_Driven', 'Seats']
+
+# Fields every listing must provide
+REQUIRED_FIELDS = ['Name', 'Location', 'Year', 'Kilometers_Driven',
+                   'Fuel_Type', 'Transmission', 'Owner_Type',
+                   'Mileage', 'Engine', 'Power', 'Seats']
+
+# Fitted pipeline state, saved next to the model
+FEATURE_PIPELINE_PATH = 'models/feature_pipeline.joblib'
+
+# Compact dtypes for reading listings in bulk: these text columns repeat a
+# few hundred distinct values, so categoricals store one small code per row
+# and the pipeline parses and encodes each distinct value only once
+LISTING_DTYPES = {field: 'category' for field in ['Location', 'Fuel_Type', 'Transmission', 'Owner_Type',
+                                                   'Mileage', 'Engine', 'Power']}
+
+
+def first_token(column):
+    """Return the first whitespace-separated token of every value in a string column"""
+    return column.str.extract(r'^\s*(\S+)', expand=False)
+
+
+def as_text(column):
+    """Convert a column to str values without touching the original.
+    
+    ``Series.astype(str)`` on an unpickled object column (e.g. a chunk sent to
+    a worker process) rewrites NaN to 'nan' in the source frame on pandas 2.0.
+    """
+    return column.map(str)
+
+
+def first_token_floats(column):
+    """Parse the leading number of every value in a string column.
+    
+    Returns the float64 array and a mask of unparseable entries, like
+    ``parse_float_column``. Categorical columns are parsed once per category.
+    """
+    import pandas as pd
+
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        parsed, invalid = parse_float_column(first_token(as_text(column.cat.categories.to_series())))
+        codes = column.cat.codes.to_numpy()
+        present = codes >= 0
+        # Missing values parse as NaN, as the 'nan' text of an object column does
+        return np.where(present, parsed[codes], np.nan), present & invalid[codes]
+    return parse_float_column(first_token(as_text(column)))
+
+
+def clean_listings(listings):
+    """Drop listings the model cannot use (same as in notebook).
+    
+    Removes rows with missing Mileage/Engine/Power/Seats and rows whose
+    Power is reported as 'null bhp'.
+    """
+    import pandas as pd
+
+    keep = listings[['Mileage', 'Engine', 'Power', 'Seats']].notna().all(axis=1).to_numpy()
+    keep &= (first_token(listings['Power']) != 'null').to_numpy()
+    # One filtered copy; renumbering the rows in place does not copy again
+    listings = listings[keep]
+    listings.index = pd.RangeIndex(len(listings))
+    return listings
+
+
+def parse_float_column(values):
+    """Convert values to float64, returning the array and a mask of unparseable entries"""
+    values = np.asarray(values, dtype=object)
+    try:
+        return values.astype(float), np.zeros(len(values), dtype=bool)
+    except (TypeError, ValueError):
+        # Fall back to element-wise parsing only when something is malformed
+        parsed = np.empty(len(values))
+        invalid = np.zeros(len(values), dtype=bool)
+        for i, value in enumerate(values):
+            try:
+                parsed[i] = float(value)
+            except (TypeError, ValueError):
+                parsed[i] = np.nan
+                invalid[i] = True
+        return parsed, invalid
+
+
+def serving_pipeline_path(path):
+    """The JSON copy of a pipeline saved at ``path``, loadable without sklearn or joblib"""
+    return os.path.splitext(path)[0] + '.json'
+
+
+class FittedCategories:
+    """The fitted state of a LabelEncoder (its ``classes_``), as loaded for serving"""
+
+    def __init__(self, classes):
+        self.classes_ = np.array(classes, dtype=object)
+
+
+def parse_unit_value(value):
+    """Parse the leading number of a value like "15.2 km/kg" or "1197 CC" """
+    if isinstance(value, (int, float)):
+        return float(value)
+    return float(value.split()[0])
+
+
+class FeatureEncoder:
+    """Precompiled single-row encoder for the prediction hot path.
+
+    Built once from the fitted label encoders and the training column layout,
+    it resolves every category to a code or a one-hot slot through plain dict
+    lookups and writes straight into a float64 NumPy row, without pandas.
+    """
+
+    def __init__(self, label_encoders, columns=FEATURE_COLUMNS):
+        self.columns = list(columns)
+        self.n_features = len(self.columns)
+        slot = {name: i for i, name in enumerate(self.columns)}
+
+        # category -> label code, per encoded field
+        self.codes = {
+            col: {category: code for code, category in enumerate(encoder.classes_)}
+            for col, encoder in label_encoders.items()
+        }
+
+        # category -> one-hot column index; the dropped baseline category has no slot
+        self.one_hot_slots = {}
+        for field in ONE_HOT_FIELDS:
+            prefix = field + '_'
+            self.one_hot_slots[field] = {
+                name[len(prefix):]: i for name, i in slot.items() if name.startswith(prefix)
+            }
+
+        self.numeric_slots = [(field, slot[field]) for field in NUMERIC_FIELDS]
+        self.unit_slots = [(field, slot[feature]) for field, feature in UNIT_FIELDS]
+        self.owner_slot = slot['Owner_Type']
+
+    def lookup_code(self, col, value):
+        """Return the label code of ``value``, raising ValueError if unseen"""
+        try:
+            return self.codes[col][value]
+        except (KeyError, TypeError):
+            raise ValueError(f"Unknown {col}: {value}") from None
+
+    def encode_into(self, data, row, timer=None):
+        """Encode one record into the 1-D float64 array ``row`` (zeroed by the caller).
+        
+        With a metrics.StageTimer, the category lookups are charged to the
+        'encode' stage.
+        """
+        # Validate categories the same way LabelEncoder.transform would
+        name_parts = str(data['Name']).split()
+        company = name_parts[0] if name_parts else ''
+        for col in CATEGORICAL_COLUMNS:
+            if col in self.codes:
+                code = self.lookup_code(col, company if col == 'Company' else data[col])
+                if col == 'Owner_Type':
+                    row[self.owner_slot] = code
+        if timer is not None:
+            timer.mark('encode')
+
+        for field, i in self.numeric_slots:
+            row[i] = float(data[field])
+
+        for field, i in self.unit_slots:
+            row[i] = parse_unit_value(data[field])
+
+        # Missing values (NaN) parse as floats but cannot be scored
+        if np.isnan(row).any():
+            field = next(field for field, i in self.numeric_slots + self.unit_slots if np.isnan(row[i]))
+            raise ValueError(f"Invalid {field}: {data[field]}")
+
+        for field in ONE_HOT_FIELDS:
+            i = self.one_hot_slots[field].get(data[field])
+            if i is not None:
+                row[i] = 1.0
+
+        return row
+
+    def encode(self, data, timer=None):
+        """Encode one record into a (1, n_features) float64 array"""
+        features = np.zeros((1, self.n_features))
+        self.encode_into(data, features[0], timer)
+        return features
+
+
+class FeaturePipeline:
+    """Fit/transform feature pipeline shared by training and serving.
+
+    ``fit`` learns the label encoders from cleaned training listings;
+    ``transform`` encodes a whole DataFrame with vectorized NumPy operations;
+    ``transform_record`` is the compiled single-row path used per request.
+    All three paths produce identical float64 rows for the same input.
+    """
+
+    def __init__(self, columns=FEATURE_COLUMNS, label_encoders=None):
+        self.columns = list(columns)
+        self.label_encoders = {}
+        self.encoder = None
+        self._slots = {name: i for i, name in enumerate(self.columns)}
+        if label_encoders is not None:
+            self._set_encoders(label_encoders)
+
+    def _set_encoders(self, label_encoders):
+        self.label_encoders = dict(label_encoders)
+        self.encoder = FeatureEncoder(self.label_encoders, self.columns)
+
+    @property
+    def is_fitted(self):
+        return self.encoder is not None
+
+    def fit(self, listings):
+        """Fit the label encoders on cleaned training listings"""
+        from sklearn.preprocessing import LabelEncoder
+
+        label_encoders = {}
+        for col in CATEGORICAL_COLUMNS:
+            values = first_token(as_text(listings['Name'])) if col == 'Company' else listings[col]
+            # Categorical dtype categories are the sorted uniques, like LabelEncoder.classes_
+            le = LabelEncoder()
+            le.fit(values.astype('category').cat.remove_unused_categories().cat.categories)
+            label_encoders[col] = le
+        self._set_encoders(label_encoders)
+        return self
+
+    def fit_transform(self, listings, dtype=np.float64):
+        return self.fit(listings).transform(listings, dtype)
+
+    def extend(self, listings):
+        """Add categories first seen in ``listings`` to the fitted encoders.
+        
+        Known categories keep their codes and new ones are numbered after
+        them, so rows the current model was trained on encode unchanged.
+        ``classes_`` is then no longer sorted; encode through this pipeline,
+        not ``LabelEncoder.transform``. The feature columns stay fixed: a new
+        Location or Fuel_Type has no one-hot column of its own and encodes
+        like the dropped baseline category until a full retrain.
+        
+        Returns the new categories of each field.
+        """
+        from sklearn.preprocessing import LabelEncoder
+
+        label_encoders = dict(self.label_encoders)
+        added = {}
+        for col, encoder in self.label_encoders.items():
+            values = first_token(as_text(listings['Name'])) if col == 'Company' else listings[col]
+            known = self.encoder.codes[col]
+            new = sorted(value for value in values.dropna().unique() if value not in known)
+            if not new:
+                continue
+            le = LabelEncoder()
+            le.classes_ = np.array(list(encoder.classes_) + new, dtype=object)
+            label_encoders[col] = le
+            added[col] = new
+        if added:
+            self._set_encoders(label_encoders)
+        return added
+
+    def _encode_frame(self, listings, dtype=np.float64):
+        """Encode a DataFrame of listings.
+        
+        Returns the (n, n_features) matrix of ``dtype`` and an array holding
+        the first error message of every row ('' for rows that encoded cleanly).
+        """
+        import pandas as pd
+
+        n_rows = len(listings)
+        features = np.zeros((n_rows, len(self.columns)), dtype=dtype)
+        errors = np.full(n_rows, '', dtype=object)
+
+        def flag(mask, field, column):
+            # Keep the first error reported for each row
+            for i in np.flatnonzero(mask & (errors == '')):
+                errors[i] = f"Invalid {field}: {column.iloc[i]}"
+
+        for field in NUMERIC_FIELDS:
+            column = listings[field]
+            if pd.api.types.is_numeric_dtype(column.dtype):
+                parsed, invalid = column.to_numpy(dtype=np.float64), np.zeros(n_rows, dtype=bool)
+            else:
+                parsed, invalid = parse_float_column(column.to_numpy(dtype=object))
+            # Empty CSV cells arrive as NaN, which parses but cannot be scored
+            flag(invalid | np.isnan(parsed), field, column)
+            features[:, self._slots[field]] = parsed
+
+        for field, feature in UNIT_FIELDS:
+            parsed, invalid = first_token_floats(listings[field])
+            flag(invalid | np.isnan(parsed), field, listings[field])
+            features[:, self._slots[feature]] = parsed
+
+        # Validate categories the same way LabelEncoder.transform would
+        company = first_token(as_text(listings['Name']))
+        for col in CATEGORICAL_COLUMNS:
+            if col not in self.encoder.codes:
+                continue
+            values = company if col == 'Company' else listings[col]
+            codes = values.map(self.encoder.codes[col]).to_numpy(dtype=float)
+            unseen = np.isnan(codes)
+            for i in np.flatnonzero(unseen & (errors == '')):
+                errors[i] = f"Unknown {col}: {values.iloc[i]}"
+            if col == 'Owner_Type':
+                features[:, self._slots['Owner_Type']] = codes
+
+        for field in ONE_HOT_FIELDS:
+            values = listings[field]
+            for category, i in self.encoder.one_hot_slots[field].items():
+                features[:, i] = (values == category).to_numpy()
+
+        return features, errors
+
+    def transform(self, listings, dtype=np.float64):
+        """Encode a DataFrame of listings, raising ValueError on the first bad row"""
+        features, errors = self._encode_frame(listings, dtype)
+        bad = np.flatnonzero(errors != '')
+        if len(bad):
+            raise ValueError(f"Row {bad[0]}: {errors[bad[0]]}")
+        return features
+
+    def transform_frame(self, listings, dtype=np.float64):
+        """Encode a DataFrame of listings, keeping failures per row.
+        
+        Returns the matrix for every row and an array holding each row's
+        error message ('' for rows that encoded cleanly).
+        """
+        return self._encode_frame(listings, dtype)
+
+    def transform_record(self, data, timer=None):
+        """Encode a single record into a (1, n_features) float64 array"""
+        return self.encoder.encode(data, timer)
+
+    def transform_records(self, records):
+        """Encode many records, keeping failures per row.
+        
+        Returns the feature matrix for the rows that encoded cleanly, the
+        positions of those rows in ``records`` and a dict of per-row errors.
+        """
+        errors = {}
+        positions = []
+        for i, record in enumerate(records):
+            if not isinstance(record, dict):
+                errors[i] = 'Row must be a JSON object'
+                continue
+            missing_fields = [field for field in REQUIRED_FIELDS if field not in record]
+            if missing_fields:
+                errors[i] = f'Missing required fields: {missing_fields}'
+                continue
+            positions.append(i)
+
+        if not positions:
+            return np.zeros((0, len(self.columns))), [], errors
+
+        import pandas as pd
+
+        listings = pd.DataFrame([records[i] for i in positions], columns=REQUIRED_FIELDS)
+        features, row_errors = self._encode_frame(listings)
+        ok = row_errors == ''
+        for i in np.flatnonzero(~ok):
+            errors[positions[i]] = row_errors[i]
+
+        return features[ok], [p for p, good in zip(positions, ok) if good], errors
+
+    def save(self, path=FEATURE_PIPELINE_PATH):
+        """Save the fitted state with joblib, plus the categories as JSON for ``load_serving``"""
+        import joblib
+
+        with open(serving_pipeline_path(path), 'w') as f:
+            json.dump({'columns': self.columns,
+                       'classes': {col: encoder.classes_.tolist() for col, encoder in self.label_encoders.items()}}, f)
+        joblib.dump({'columns': self.columns, 'label_encoders': self.label_encoders}, path)
+
+    @classmethod
+    def load(cls, path=FEATURE_PIPELINE_PATH):
+        """Load a pipeline saved with ``save``"""
+        import joblib
+
+        state = joblib.load(path)
+        return cls(columns=state['columns'], label_encoders=state['label_encoders'])
+
+    @classmethod
+    def load_serving(cls, path=FEATURE_PIPELINE_PATH):
+        """Load the JSON copy written by ``save``: encodes the same, without importing sklearn.
+        
+        Its label encoders are ``FittedCategories``, which only hold ``classes_``.
+        """
+        with open(serving_pipeline_path(path)) as f:
+            state = json.load(f)
+        return cls(columns=state['columns'],
+                   label_encoders={col: FittedCategories(classes) for col, classes in state['classes'].items()})
@@ -0,0 +1,210 @@
+"""
+Flat array-based random forest inference.
+Exports a fitted RandomForestRegressor into contiguous NumPy arrays (one node
+table for all trees) and predicts by walking every tree for every row at once.
+The arrays are stored as raw .npy files so worker processes can memory-map
+them and share one page-cache copy. Histogram gradient boosting models are
+exported the same way; their prediction is the sum of the trees plus the
+baseline instead of the mean.
+"""
+
+import os
+
+import numpy as np
+
+# Flattened forest directory, saved next to the sklearn model by train_model.py
+FLAT_FOREST_PATH = 'models/random_forest_flat'
+
+# Node table arrays, one .npy file each
+NODE_ARRAYS = ['feature', 'threshold', 'children', 'value', 'roots']
+
+# Present only for boosted ensembles: the baseline added to the sum of the trees
+BOOSTING_FILE = 'boosting.npy'
+
+
+def can_flatten(model):
+    """Whether ``model`` can be exported to a FlatForest"""
+    from sklearn.ensemble import HistGradientBoostingRegressor
+    return hasattr(model, 'estimators_') or isinstance(model, HistGradientBoostingRegressor)
+
+
+class FlatForest:
+    """Random forest regressor stored as flat node arrays.
+
+    All trees share one node table; ``roots`` holds the index of every tree's
+    root and ``children[node]`` the (left, right) pair, so one gather picks the
+    next node. Leaves point to themselves on both sides.
+
+    With ``baseline`` set the trees are boosted: the prediction is the
+    baseline plus the sum of the trees.
+    """
+
+    def __init__(self, feature, threshold, children, value, roots, n_features, max_depth, baseline=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = np.array(roots)
+        self.n_features = int(n_features)
+        self.max_depth = int(max_depth)
+        self.baseline = None if baseline is None else float(baseline)
+        self._flat_children = children.reshape(-1)
+        self._is_internal = children[:, 0] != np.arange(len(children))
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def node_count(self):
+        return len(self.feature)
+
+    @property
+    def boosted(self):
+        return self.baseline is not None
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        """Flatten a fitted single-output RandomForestRegressor (or HistGradientBoostingRegressor)"""
+        # Imported here so serving, which only loads saved arrays, never imports sklearn
+        from sklearn.ensemble import HistGradientBoostingRegressor
+        if isinstance(forest, HistGradientBoostingRegressor):
+            return cls.from_boosting(forest)
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(offset, offset + n_nodes, dtype=np.int32)
+            is_leaf = tree.children_left == -1
+
+            left = np.where(is_leaf, node_ids, tree.children_left + offset).astype(np.int32)
+            right = np.where(is_leaf, node_ids, tree.children_right + offset).astype(np.int32)
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            children.append(np.stack([left, right], axis=1))
+            values.append(tree.value[:, 0, 0])
+            roots.append(offset)
+
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            children=np.concatenate(children),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int32),
+            n_features=forest.n_features_in_,
+            max_depth=max_depth,
+        )
+
+    @classmethod
+    def from_boosting(cls, model):
+        """Flatten a fitted HistGradientBoostingRegressor with the default squared error loss"""
+        if model.loss != 'squared_error':
+            raise ValueError(f"Only the squared error loss can be flattened, not {model.loss!r}")
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for (predictor,) in model._predictors:
+            nodes = predictor.nodes
+            if nodes['is_categorical'].any():
+                raise ValueError("Trees with categorical splits cannot be flattened")
+            n_nodes = len(nodes)
+            node_ids = np.arange(offset, offset + n_nodes, dtype=np.int32)
+            is_leaf = nodes['is_leaf'].astype(bool)
+
+            # Rows go left when x <= threshold, the same rule as the forest's trees
+            left = np.where(is_leaf, node_ids, nodes['left'].astype(np.int64) + offset).astype(np.int32)
+            right = np.where(is_leaf, node_ids, nodes['right'].astype(np.int64) + offset).astype(np.int32)
+
+            features.append(np.where(is_leaf, 0, nodes['feature_idx']).astype(np.int32))
+            thresholds.append(np.where(is_leaf, 0.0, nodes['num_threshold']))
+            children.append(np.stack([left, right], axis=1))
+            values.append(nodes['value'])
+            roots.append(offset)
+
+            offset += n_nodes
+            max_depth = max(max_depth, int(nodes['depth'].max()))
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            children=np.concatenate(children),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int32),
+            n_features=model.n_features_in_,
+            max_depth=max_depth,
+            baseline=np.ravel(model._baseline_prediction)[0],
+        )
+
+    def apply(self, X):
+        """Return the leaf node reached in every tree, shape (n_samples, n_trees)"""
+        # sklearn compares float32 features against float64 thresholds (boosted
+        # models are trained on the float32 matrix of train_model.py)
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected input of shape (n_samples, {self.n_features}), got {X.shape}")
+
+        n_samples = X.shape[0]
+        flat_X = X.ravel()
+        leaves = np.tile(self.roots, n_samples)
+
+        # Walk every (row, tree) pair one level per step, carrying only the
+        # pairs still on an internal node; finished pairs are written out
+        pair = np.arange(n_samples * self.n_trees)
+        offset = np.repeat(np.arange(n_samples, dtype=np.int64) * self.n_features, self.n_trees)
+        current = leaves.astype(np.int64)
+        for _ in range(self.max_depth):
+            if current.size == 0:
+                break
+            go_right = flat_X[offset + self.feature[current]] > self.threshold[current]
+            current = self._flat_children[2 * current + go_right]
+            internal = self._is_internal[current]
+            if not internal.all():
+                done = ~internal
+                leaves[pair[done]] = current[done]
+                pair, offset, current = pair[internal], offset[internal], current[internal]
+
+        return leaves.reshape(n_samples, self.n_trees)
+
+    def predict_per_tree(self, X):
+        """Return every tree's prediction, shape (n_samples, n_trees)"""
+        return self.value[self.apply(X)]
+
+    def predict(self, X):
+        """Return the forest prediction (mean over trees, or baseline plus sum when boosted) for every row"""
+        if self.boosted:
+            return self.baseline + self.predict_per_tree(X).sum(axis=1)
+        return self.predict_per_tree(X).mean(axis=1)
+
+    def save(self, path=FLAT_FOREST_PATH):
+        """Save the node arrays as raw .npy files in the directory ``path``"""
+        os.makedirs(path, exist_ok=True)
+        for name in NODE_ARRAYS:
+            np.save(os.path.join(path, f'{name}.npy'), np.ascontiguousarray(getattr(self, name)))
+        np.save(os.path.join(path, 'meta.npy'), np.array([self.n_features, self.max_depth], dtype=np.int64))
+        boosting_path = os.path.join(path, BOOSTING_FILE)
+        if self.boosted:
+            np.save(boosting_path, np.array([self.baseline]))
+        elif os.path.exists(boosting_path):
+            # Left over from a boosted model saved in the same directory
+            os.remove(boosting_path)
+
+    @classmethod
+    def load(cls, path=FLAT_FOREST_PATH, mmap_mode='r'):
+        """Load a forest saved with ``save``.
+        
+        With the default ``mmap_mode='r'`` the node arrays are memory-mapped
+        read-only rather than read into private memory, so loading is nearly
+        instant and processes serving the same files share their pages.
+        """
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode)
+                  for name in NODE_ARRAYS}
+        n_features, max_depth = np.load(os.path.join(path, 'meta.npy'))
+        boosting_path = os.path.join(path, BOOSTING_FILE)
+        baseline = np.load(boosting_path)[0] if os.path.exists(boosting_path) else None
+        return cls(n_features=n_features, max_depth=max_depth, baseline=baseline, **arrays)
@@ -0,0 +1,138 @@
+"""
+Request micro-batching for single-row predictions.
+Concurrent /api/predict calls are queued and scored together in one model call
+once the batch is full or the first queued request has waited ``max_wait``
+seconds, trading a little latency per request for far fewer forest traversals.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Merge single-row predictions from many threads into batched model calls.
+
+    A daemon thread, started on first use, drains the queue. Rows are grouped
+    by the model bundle they were encoded with, so a reload in the middle of a
+    batch never scores a row with another version's model.
+    """
+
+    def __init__(self, max_wait=0.002, max_batch_size=64, history=10000, clock=time.perf_counter):
+        self.max_wait = max_wait
+        self.max_batch_size = max_batch_size
+        self._clock = clock
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = deque(maxlen=history)
+        self._queue_waits = deque(maxlen=history)
+        self.batches = 0
+        self.requests = 0
+
+    def _ensure_started(self):
+        # Started lazily so a process that forks workers starts one per worker
+        if self._thread is None or not self._thread.is_alive():
+            with self._start_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                    self._thread.start()
+
+    def submit(self, bundle, features):
+        """Queue one encoded row (shape (1, n_features)) and return a Future for its prediction"""
+        future = Future()
+        self._ensure_started()
+        self._queue.put((bundle, features, future, self._clock()))
+        return future
+
+    def predict(self, bundle, features, timeout=None):
+        """Queue one encoded row and block until its prediction is ready"""
+        return self.submit(bundle, features).result(timeout=timeout)
+
+    def stop(self):
+        """Stop the worker thread once the queued requests have been scored"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = item[3] + self.max_wait
+            stopping = False
+            while len(batch) < self.max_batch_size:
+                # Past the deadline, still take rows that are already queued
+                remaining = deadline - self._clock()
+                try:
+                    if remaining > 0:
+                        item = self._queue.get(timeout=remaining)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._score(batch)
+            if stopping:
+                return
+
+    def _score(self, batch):
+        dispatched_at = self._clock()
+        with self._stats_lock:
+            self.batches += 1
+            self.requests += len(batch)
+            self._batch_sizes.append(len(batch))
+            self._queue_waits.extend(dispatched_at - enqueued_at for _, _, _, enqueued_at in batch)
+
+        groups = {}
+        for bundle, features, future, _ in batch:
+            groups.setdefault(id(bundle), (bundle, []))[1].append((features, future))
+
+        for bundle, items in groups.values():
+            try:
+                predictions = bundle.predict(np.vstack([features for features, _ in items]))
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            for (_, future), prediction in zip(items, predictions):
+                future.set_result(float(prediction))
+
+    def stats(self):
+        """Batch fill and queue wait figures for the health endpoint"""
+        with self._stats_lock:
+            sizes = np.array(self._batch_sizes, dtype=np.float64)
+            waits_ms = np.array(self._queue_waits, dtype=np.float64) * 1e3
+            batches, requests = self.batches, self.requests
+
+        stats = {
+            'enabled': True,
+            'max_wait_ms': self.max_wait * 1e3,
+            'max_batch_size': self.max_batch_size,
+            'batches': batches,
+            'requests': requests,
+            'queued': self._queue.qsize(),
+        }
+        if sizes.size:
+            stats.update({
+                'mean_batch_size': round(float(sizes.mean()), 2),
+                'mean_batch_fill': round(float(sizes.mean()) / self.max_batch_size, 4),
+                'full_batches': int((sizes >= self.max_batch_size).sum()),
+                'queue_wait_ms': {
+                    'p50': round(float(np.percentile(waits_ms, 50)), 3),
+                    'p95': round(float(np.percentile(waits_ms, 95)), 3),
+                    'max': round(float(waits_ms.max()), 3),
+                },
+            })
+        return stats
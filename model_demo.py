@@ -89,7 +89,7 @@ def test_model_prediction(model, encoders):
     return prediction
 
 def compare_joblib_vs_pickle():
-    """Compare joblib vs pickle for model serialization"""
+    """Compare joblib vs pickle (and the other artifact formats) for model serialization"""
     print("\n" + "="*50)
     print("🔄 Comparing joblib vs pickle...")
     print("="*50)
@@ -97,35 +97,17 @@ def compare_joblib_vs_pickle():
     # Create sample model
     model, encoders = create_sample_model()
     
-    # Test joblib
-    print("\n📦 Testing joblib:")
-    joblib_start = time.time()
-    joblib.dump(model, 'models/test_joblib.joblib')
-    joblib_model = joblib.load('models/test_joblib.joblib')
-    joblib_time = time.time() - joblib_start
-    
-    # Test pickle
-    import pickle
-    print("\n🥒 Testing pickle:")
-    pickle_start = time.time()
-    with open('models/test_pickle.pkl', 'wb') as f:
-        pickle.dump(model, f)
-    with open('models/test_pickle.pkl', 'rb') as f:
-        pickle_model = pickle.load(f)
-    pickle_time = time.time() - pickle_start
-    
-    # Compare file sizes
-    joblib_size = os.path.getsize('models/test_joblib.joblib') / 1024
-    pickle_size = os.path.getsize('models/test_pickle.pkl') / 1024
-    
-    print(f"\n📊 Comparison Results:")
-    print(f"   Joblib - Time: {joblib_time:.3f}s, Size: {joblib_size:.1f}KB")
-    print(f"   Pickle - Time: {pickle_time:.3f}s, Size: {pickle_size:.1f}KB")
-    print(f"   Joblib is {'faster' if joblib_time < pickle_time else 'slower'} and {'smaller' if joblib_size < pickle_size else 'larger'}")
-    
-    # Clean up test files
-    os.remove('models/test_joblib.joblib')
-    os.remove('models/test_pickle.pkl')
+    # Same round trips as the full benchmark (python -m benchmarks.serialization),
+    # in temporary directories, on this toy model
+    from benchmarks.serialization import build_formats, run
+    report = run(model, build_formats([3], flat=True), repeats=3)
+    
+    joblib_row, pickle_row = (next(row for row in report if row['format'] == name) for name in ['joblib', 'pickle5'])
+    joblib_time = joblib_row['save_ms'] + joblib_row['load_ms']
+    pickle_time = pickle_row['save_ms'] + pickle_row['load_ms']
+    print(f"\n📊 Joblib is {'faster' if joblib_time < pickle_time else 'slower'} and "
+          f"{'smaller' if joblib_row['size_mb'] < pickle_row['size_mb'] else 'larger'} than pickle on this toy model")
+    print("💡 Run python -m benchmarks.serialization --model models/random_forest_model.joblib for the real one")
 
 def main():
     """Main demonstration function"""
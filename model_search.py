@@ -0,0 +1,202 @@
+"""
+Cross-validated model search for train_model.py --search.
+Runs every candidate model and parameter combination through K-fold cross
+validation on a process pool. The workers memory-map one shared copy of the
+feature matrix, and every finished trial is written to disk straight away, so
+an interrupted search resumes where it stopped.
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.model_selection import KFold, ParameterGrid
+
+from flat_forest import FlatForest, can_flatten
+
+SEARCH_DIR = 'models/search'
+
+# Candidate models: (estimator class, fixed parameters, parameter grid)
+CANDIDATES = {
+    'random_forest': (RandomForestRegressor, {'random_state': 42, 'n_jobs': 1}, {
+        'n_estimators': [100, 200],
+        'max_features': [1.0, 0.5],
+        'min_samples_leaf': [1, 2],
+    }),
+    'extra_trees': (ExtraTreesRegressor, {'random_state': 42, 'n_jobs': 1}, {
+        'n_estimators': [100, 200],
+        'max_features': [1.0, 0.5],
+        'min_samples_leaf': [1, 2],
+    }),
+    'linear_regression': (LinearRegression, {}, {}),
+}
+
+# Feature matrix shared by the worker processes (memory-mapped in each)
+_X = None
+_y = None
+
+
+def data_fingerprint(X, y):
+    """Short hash of the training data, so trials from other data are never reused"""
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(X).tobytes())
+    digest.update(np.ascontiguousarray(y).tobytes())
+    return digest.hexdigest()[:12]
+
+
+def make_trials(model_names, cv, seed, data_hash):
+    """Expand the candidate grids into trials with stable ids"""
+    trials = []
+    for name in model_names:
+        _, _, grid = CANDIDATES[name]
+        for params in ParameterGrid(grid):
+            key = json.dumps({'model': name, 'params': params, 'cv': cv, 'seed': seed, 'data': data_hash},
+                             sort_keys=True)
+            trial_id = f"{name}-{hashlib.sha1(key.encode()).hexdigest()[:10]}"
+            trials.append({'trial_id': trial_id, 'model': name, 'params': params})
+    return trials
+
+
+def build_estimator(name, params):
+    """Instantiate candidate ``name`` with its fixed parameters plus ``params``"""
+    estimator_class, fixed, _ = CANDIDATES[name]
+    return estimator_class(**fixed, **params)
+
+
+def serving_latency_ms(model, row, repeats=200):
+    """Median single-row predict time, with the flat forest for tree ensembles as the server does"""
+    predictor = FlatForest.from_sklearn(model) if can_flatten(model) else model
+    predictor.predict(row)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predictor.predict(row)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1e3
+
+
+def _init_worker(search_dir):
+    global _X, _y
+    _X = np.load(os.path.join(search_dir, 'X.npy'), mmap_mode='r')
+    _y = np.load(os.path.join(search_dir, 'y.npy'), mmap_mode='r')
+
+
+def run_trial(trial, cv, seed):
+    """Cross-validate one trial on the shared matrix and return its scores"""
+    folds = KFold(n_splits=cv, shuffle=True, random_state=seed).split(_X)
+    maes, rmses, r2s, fit_seconds = [], [], [], []
+    for train_idx, test_idx in folds:
+        model = build_estimator(trial['model'], trial['params'])
+        start = time.perf_counter()
+        model.fit(_X[train_idx], _y[train_idx])
+        fit_seconds.append(time.perf_counter() - start)
+
+        y_true = _y[test_idx]
+        errors = model.predict(_X[test_idx]) - y_true
+        maes.append(np.abs(errors).mean())
+        rmses.append(np.sqrt((errors ** 2).mean()))
+        r2s.append(1 - (errors ** 2).sum() / ((y_true - y_true.mean()) ** 2).sum())
+
+    return {
+        **trial,
+        'cv': cv,
+        'mae': float(np.mean(maes)),
+        'mae_std': float(np.std(maes)),
+        'rmse': float(np.mean(rmses)),
+        'r2': float(np.mean(r2s)),
+        'fit_seconds': float(np.mean(fit_seconds)),
+        'predict_ms': serving_latency_ms(model, np.asarray(_X[test_idx[:1]])),
+        'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def trial_path(search_dir, trial_id):
+    return os.path.join(search_dir, 'trials', f'{trial_id}.json')
+
+
+def save_trial(search_dir, result):
+    """Write one finished trial atomically, so a crash never leaves half a file"""
+    path = trial_path(search_dir, result['trial_id'])
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(result, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_trial(search_dir, trial_id):
+    path = trial_path(search_dir, trial_id)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def run_search(X, y, search_dir=SEARCH_DIR, model_names=tuple(CANDIDATES), cv=5, workers=None, seed=42):
+    """Run every trial not already on disk and return the results of all trials"""
+    os.makedirs(os.path.join(search_dir, 'trials'), exist_ok=True)
+    data_hash = data_fingerprint(X, y)
+    trials = make_trials(model_names, cv, seed, data_hash)
+
+    results = {}
+    pending = []
+    for trial in trials:
+        done = load_trial(search_dir, trial['trial_id'])
+        if done is not None:
+            results[trial['trial_id']] = done
+        else:
+            pending.append(trial)
+    print(f"🔎 {len(trials)} trials ({len(results)} already finished, {len(pending)} to run), "
+          f"{cv}-fold CV, {workers or os.cpu_count()} workers")
+    if not pending:
+        return [results[t['trial_id']] for t in trials]
+
+    # One copy of the matrix on disk; every worker memory-maps the same pages
+    np.save(os.path.join(search_dir, 'X.npy'), np.ascontiguousarray(X))
+    np.save(os.path.join(search_dir, 'y.npy'), np.ascontiguousarray(y))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(search_dir,)) as pool:
+        futures = {pool.submit(run_trial, trial, cv, seed): trial for trial in pending}
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                save_trial(search_dir, result)
+                results[result['trial_id']] = result
+                print(f"   ✅ {result['trial_id']}: MAE {result['mae']:.4f}, RMSE {result['rmse']:.4f}, "
+                      f"fit {result['fit_seconds']:.2f}s, predict {result['predict_ms']:.3f} ms "
+                      f"[{len(results)}/{len(trials)}]")
+        except KeyboardInterrupt:
+            pool.shutdown(wait=False, cancel_futures=True)
+            print(f"\n⏸️  Search interrupted; {len(results)} finished trials are saved in {search_dir}. "
+                  f"Run it again to resume.")
+            raise
+
+    return [results[t['trial_id']] for t in trials]
+
+
+def select_best(results, tolerance=0.01):
+    """Pick the model to ship.
+
+    Trials whose MAE and RMSE are both within ``tolerance`` (a fraction) of
+    the best scores are treated as equally accurate; among those the one
+    that is fastest to serve, then to fit, wins.
+    """
+    best_mae = min(r['mae'] for r in results)
+    best_rmse = min(r['rmse'] for r in results)
+    contenders = [r for r in results
+                  if r['mae'] <= best_mae * (1 + tolerance) and r['rmse'] <= best_rmse * (1 + tolerance)]
+    if not contenders:
+        contenders = [min(results, key=lambda r: r['mae'])]
+    return min(contenders, key=lambda r: (r['predict_ms'], r['fit_seconds'], r['mae']))
+
+
+def print_leaderboard(results, chosen, limit=15):
+    print(f"\n{'trial':<30} | {'MAE':>8} | {'RMSE':>8} | {'R²':>6} | {'fit':>7} | {'predict':>9}")
+    for r in sorted(results, key=lambda r: r['mae'])[:limit]:
+        marker = ' ⭐' if r['trial_id'] == chosen['trial_id'] else ''
+        print(f"{r['trial_id']:<30} | {r['mae']:>8.4f} | {r['rmse']:>8.4f} | {r['r2']:>6.3f} | "
+              f"{r['fit_seconds']:>6.2f}s | {r['predict_ms']:>6.3f} ms{marker}")
@@ -0,0 +1,305 @@
+"""
+Model artifact loading for serving.
+Bundles the fitted feature pipeline with the forest so a complete model version
+can be loaded in the background, smoke-tested and swapped in with one assignment.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from drift import DRIFT_REFERENCE_FILE, DriftSketch
+from features import FeaturePipeline, FEATURE_PIPELINE_PATH, serving_pipeline_path
+from flat_forest import FlatForest, FLAT_FOREST_PATH
+from quote_table import QUOTE_TABLE_DIR, QuoteTable
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = 'models'
+MODEL_FILE = 'random_forest_model.joblib'
+LABEL_ENCODERS_FILE = 'label_encoders.joblib'
+FEATURE_PIPELINE_FILE = os.path.basename(FEATURE_PIPELINE_PATH)
+SERVING_PIPELINE_FILE = os.path.basename(serving_pipeline_path(FEATURE_PIPELINE_PATH))
+FLAT_FOREST_DIR = os.path.basename(FLAT_FOREST_PATH)
+
+# Written last by train_model.py, so its appearance marks a complete model version
+MODEL_INFO_FILE = 'model_info.json'
+
+# Copies of earlier model versions, one loadable model directory each
+VERSIONS_DIR = 'versions'
+
+
+def model_fingerprint(model_dir=MODEL_DIR):
+    """Cheap identifier of the artifacts in ``model_dir`` (size and mtime of each file).
+    
+    When train_model.py's info file exists only it is considered, so a
+    half-written retrain does not change the fingerprint.
+    """
+    names = [MODEL_INFO_FILE]
+    if not os.path.exists(os.path.join(model_dir, MODEL_INFO_FILE)):
+        names = [MODEL_FILE, LABEL_ENCODERS_FILE, FEATURE_PIPELINE_FILE]
+    digest = hashlib.sha1()
+    for name in names:
+        path = os.path.join(model_dir, name)
+        if os.path.exists(path):
+            stat = os.stat(path)
+            digest.update(f'{name}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+    return digest.hexdigest()[:12]
+
+
+def read_model_info(model_dir=MODEL_DIR):
+    """Return the metadata written by train_model.py, or {} for older model directories"""
+    path = os.path.join(model_dir, MODEL_INFO_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_model_info(info, model_dir=MODEL_DIR):
+    """Write the metadata file that marks a complete model version (atomically)"""
+    path = os.path.join(model_dir, MODEL_INFO_FILE)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(info, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def archive_version(model_dir=MODEL_DIR):
+    """Copy the current artifacts to ``versions/<version>/`` and return that directory.
+    
+    The copy is a complete model directory, so it can be served or scored
+    from directly (e.g. ``score_csv.py --model-dir``) or copied back to roll
+    back.
+    """
+    info = read_model_info(model_dir)
+    version_dir = os.path.join(model_dir, VERSIONS_DIR, info.get('version') or model_fingerprint(model_dir))
+    tmp_dir = f'{version_dir}.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    for name in [MODEL_FILE, LABEL_ENCODERS_FILE, FEATURE_PIPELINE_FILE, SERVING_PIPELINE_FILE, FLAT_FOREST_DIR,
+                 DRIFT_REFERENCE_FILE, MODEL_INFO_FILE]:
+        path = os.path.join(model_dir, name)
+        if os.path.isdir(path):
+            shutil.copytree(path, os.path.join(tmp_dir, name))
+        elif os.path.exists(path):
+            shutil.copy2(path, os.path.join(tmp_dir, name))
+    if os.path.exists(version_dir):
+        shutil.rmtree(version_dir)
+    os.replace(tmp_dir, version_dir)
+    return version_dir
+
+
+class ModelBundle:
+    """One loaded model version: feature pipeline, flat forest and sklearn model.
+
+    Request handlers take a reference to the active bundle once and use it for
+    the whole request, so swapping in a new bundle never mixes versions.
+    """
+
+    def __init__(self, feature_pipeline, flat_forest=None, model=None, model_dir=MODEL_DIR,
+                 version=None, info=None, flat_forest_max_rows=64, quote_table=None, drift_reference=None):
+        self.feature_pipeline = feature_pipeline
+        self.flat_forest = flat_forest
+        self.model = model
+        self.model_dir = model_dir
+        self.version = version
+        self.info = info or {}
+        self.flat_forest_max_rows = flat_forest_max_rows
+        self.quote_table = quote_table
+        self.drift_reference = drift_reference
+        self.loaded_at = time.time()
+        self._model_lock = threading.Lock()
+        self._node_values = None
+
+    @property
+    def label_encoders(self):
+        return self.feature_pipeline.label_encoders
+
+    def get_sklearn_model(self):
+        """Return the sklearn model, loading it on first use if only the flat forest is loaded"""
+        model_path = os.path.join(self.model_dir, MODEL_FILE)
+        if self.model is None and os.path.exists(model_path):
+            with self._model_lock:
+                if self.model is None:
+                    logger.info("Loading sklearn model for large batches")
+                    import joblib
+                    self.model = joblib.load(model_path, mmap_mode='r')
+        return self.model
+
+    def predict(self, features):
+        """Score encoded feature rows with the fastest loaded model for the input size"""
+        if self.flat_forest is not None and len(features) <= self.flat_forest_max_rows:
+            return self.flat_forest.predict(features)
+        sklearn_model = self.get_sklearn_model()
+        if sklearn_model is None:
+            return self.flat_forest.predict(features)
+        # Models are trained on float32 features; round the same way here
+        return sklearn_model.predict(np.asarray(features, dtype=np.float32))
+
+    @property
+    def supports_quantiles(self):
+        """Whether the model is a forest, whose per-tree predictions give ranges"""
+        if self.flat_forest is not None:
+            return not self.flat_forest.boosted
+        return hasattr(self.model, 'estimators_')
+
+    def predict_per_tree(self, features):
+        """Every tree's prediction for encoded feature rows, shape (n_samples, n_trees).
+        
+        For boosted models these are the trees' contributions to the sum.
+        One vectorized pass: the flat forest walks all trees at once for small
+        inputs; larger ones get their leaf ids from sklearn's compiled
+        ``apply`` and read the leaf values from one concatenated node table.
+        """
+        sklearn_model = None
+        if self.flat_forest is None or len(features) > self.flat_forest_max_rows:
+            sklearn_model = self.get_sklearn_model()
+        if sklearn_model is None:
+            if self.flat_forest is None:
+                raise ValueError("Prediction intervals need a tree ensemble model")
+            return self.flat_forest.predict_per_tree(features)
+        if not hasattr(sklearn_model, 'estimators_'):
+            raise ValueError(f"Prediction intervals need a tree ensemble, not {type(sklearn_model).__name__}")
+        roots, values = self._node_table()
+        return values[sklearn_model.apply(features) + roots]
+
+    def _node_table(self):
+        """Offset of every tree's nodes and the node values of all trees, concatenated"""
+        if self._node_values is None:
+            if self.flat_forest is not None:
+                self._node_values = (self.flat_forest.roots, self.flat_forest.value)
+            else:
+                trees = [estimator.tree_ for estimator in self.model.estimators_]
+                roots = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+                self._node_values = (roots, np.concatenate([tree.value[:, 0, 0] for tree in trees]))
+        return self._node_values
+
+    def predict_quantiles(self, features, percentiles):
+        """Forest predictions and the given percentiles (0-100) of the per-tree predictions.
+        
+        Returns ``(predictions, quantiles)`` with ``quantiles`` of shape
+        (n_samples, len(percentiles)). The predictions equal ``predict``.
+        """
+        if not self.supports_quantiles:
+            raise ValueError("Prediction intervals need a forest model")
+        per_tree = self.predict_per_tree(features)
+        return per_tree.mean(axis=1), row_percentiles(per_tree, percentiles)
+
+    def smoke_record(self):
+        """A valid listing built from categories the encoders know"""
+        classes = {col: encoder.classes_[0] for col, encoder in self.label_encoders.items()}
+        return {
+            'Name': f"{classes.get('Company', 'Maruti')} Smoke Test",
+            'Location': classes.get('Location', 'Mumbai'),
+            'Year': 2015,
+            'Kilometers_Driven': 50000,
+            'Fuel_Type': classes.get('Fuel_Type', 'Petrol'),
+            'Transmission': classes.get('Transmission', 'Manual'),
+            'Owner_Type': classes.get('Owner_Type', 'First'),
+            'Mileage': '18.0 kmpl',
+            'Engine': '1197 CC',
+            'Power': '82.0 bhp',
+            'Seats': 5,
+        }
+
+    def smoke_test(self):
+        """Run one prediction end to end, raising if the bundle cannot serve"""
+        features = self.feature_pipeline.transform_record(self.smoke_record())
+        prediction = self.predict(features)
+        if prediction.shape != (1,) or not np.isfinite(prediction).all():
+            raise ValueError(f"Smoke prediction returned {prediction!r}")
+        return float(prediction[0])
+
+
+def row_percentiles(values, percentiles):
+    """``np.percentile(values, percentiles, axis=1).T`` with one sort; far cheaper on a single row"""
+    ordered = np.sort(values, axis=1)
+    position = np.asarray(percentiles, dtype=float) / 100 * (values.shape[1] - 1)
+    lower = np.floor(position).astype(int)
+    upper = np.minimum(lower + 1, values.shape[1] - 1)
+    fraction = position - lower
+    return ordered[:, lower] * (1 - fraction) + ordered[:, upper] * fraction
+
+
+def load_bundle(model_dir=MODEL_DIR, flat_forest_max_rows=64):
+    """Load every artifact in ``model_dir`` into a new ModelBundle.
+    
+    With the flat forest and the pipeline's JSON copy present, neither
+    sklearn nor joblib is imported: only NumPy arrays and JSON are read.
+    """
+    info = read_model_info(model_dir)
+    version = info.get('version') or model_fingerprint(model_dir)
+
+    # Memory-map the flattened forest so workers share its pages; the sklearn
+    # model is then only deserialized when a large batch first needs it
+    flat_forest_path = os.path.join(model_dir, FLAT_FOREST_DIR)
+    if os.path.exists(flat_forest_path):
+        flat_forest = FlatForest.load(flat_forest_path, mmap_mode='r')
+        model = None
+    else:
+        import joblib
+        flat_forest = None
+        model = joblib.load(os.path.join(model_dir, MODEL_FILE), mmap_mode='r')
+
+    # Load the fitted feature pipeline from its JSON copy, falling back to the
+    # joblib file, or to bare label encoders for models trained before either
+    pipeline_path = os.path.join(model_dir, FEATURE_PIPELINE_FILE)
+    if os.path.exists(os.path.join(model_dir, SERVING_PIPELINE_FILE)):
+        feature_pipeline = FeaturePipeline.load_serving(pipeline_path)
+    elif os.path.exists(pipeline_path):
+        feature_pipeline = FeaturePipeline.load(pipeline_path)
+    else:
+        import joblib
+        feature_pipeline = FeaturePipeline(
+            label_encoders=joblib.load(os.path.join(model_dir, LABEL_ENCODERS_FILE)))
+
+    # Optional quick-quote table, only valid for the model version it priced
+    quote_table = None
+    quote_table_path = os.path.join(model_dir, QUOTE_TABLE_DIR)
+    if os.path.exists(os.path.join(quote_table_path, 'meta.json')):
+        quote_table = QuoteTable.load(quote_table_path)
+        if quote_table.model_version != version:
+            logger.warning(f"Ignoring quote table built for model version {quote_table.model_version}; "
+                           f"rebuild it with quote_table.py")
+            quote_table = None
+
+    # Training feature sketch for the drift monitor (models trained before it have none)
+    drift_reference_path = os.path.join(model_dir, DRIFT_REFERENCE_FILE)
+    drift_reference = DriftSketch.load(drift_reference_path) if os.path.exists(drift_reference_path) else None
+
+    return ModelBundle(feature_pipeline, flat_forest=flat_forest, model=model, model_dir=model_dir,
+                       version=version, info=info, flat_forest_max_rows=flat_forest_max_rows,
+                       quote_table=quote_table, drift_reference=drift_reference)
+
+
+class ModelWatcher(threading.Thread):
+    """Daemon thread that calls ``on_change`` when the model directory fingerprint changes"""
+
+    def __init__(self, model_dir, interval, on_change):
+        super().__init__(name='model-watcher', daemon=True)
+        self.model_dir = model_dir
+        self.interval = interval
+        self.on_change = on_change
+        self._stop_event = threading.Event()
+
+    def run(self):
+        last_seen = model_fingerprint(self.model_dir)
+        while not self._stop_event.wait(self.interval):
+            current = model_fingerprint(self.model_dir)
+            if current != last_seen:
+                last_seen = current
+                try:
+                    self.on_change()
+                except Exception as e:
+                    logger.error(f"Model watcher reload failed: {str(e)}")
+
+    def stop(self):
+        self._stop_event.set()
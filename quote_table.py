@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Quick Quote Table
+Precomputes the forest's price for every cell of a grid over the model
+features, so /api/quote can answer with one array lookup instead of walking
+every tree. The grid covers every location, fuel type, transmission and owner
+type the encoders know and every year of the training listings, plus quantile
+buckets of the numeric fields (kilometers, mileage, engine, power, seats).
+Each bucket is priced at the median training value inside it, so a quote is
+the exact price of a nearby car. The gap between the two is measured on the
+training listings when the table is built.
+
+The table is one float32 array indexed in mixed radix and saved as a raw .npy
+file next to the model, so serving processes memory-map and share it. It
+belongs to the model version it was built from, and is ignored once a
+different model is loaded.
+
+Usage:
+    python quote_table.py
+    python quote_table.py --engine-buckets 24 --power-buckets 8
+"""
+
+import argparse
+import json
+import os
+import time
+from bisect import bisect_right
+
+import numpy as np
+
+from features import NUMERIC_FIELDS, ONE_HOT_FIELDS, UNIT_FIELDS
+
+QUOTE_TABLE_DIR = 'quote_table'
+
+# Default bucket counts of the numeric features. Engine size moves the price
+# most, so it gets the finest split; mileage and seats barely matter once
+# engine and power are known
+DEFAULT_BUCKETS = {
+    'Kilometers_Driven': 5,
+    'Mileage(km/kg)': 1,
+    'Engine(CC)': 16,
+    'Power(bhp)': 6,
+    'Seats': 1,
+}
+
+
+class QuoteTable:
+    """Grid of precomputed prices addressed by encoded feature rows.
+
+    ``dims`` lists the grid dimensions in index order. Each is a dict with a
+    ``kind``:
+
+    * ``one_hot``: a group of one-hot ``columns``; state 0 is the dropped
+      baseline category, state i the i-th column
+    * ``discrete``: a column taking the integer ``values`` exactly (owner
+      code, year); other values are outside the grid
+    * ``bucket``: a numeric column split at ``edges`` and priced at the
+      bucket's ``representatives``
+    """
+
+    def __init__(self, dims, prices, columns, model_version=None, stats=None):
+        self.dims = dims
+        self.prices = prices
+        self.columns = list(columns)
+        self.model_version = model_version
+        self.stats = stats or {}
+        self.shape = tuple(self._size(dim) for dim in dims)
+
+        # Per dimension: (kind, slots, lookup) in the form used by ``index``
+        slot = {name: i for i, name in enumerate(self.columns)}
+        self._dims = []
+        for dim in dims:
+            if dim['kind'] == 'one_hot':
+                self._dims.append(('one_hot', [slot[c] for c in dim['columns']], None))
+            elif dim['kind'] == 'discrete':
+                self._dims.append(('discrete', slot[dim['column']],
+                                   {float(v): i for i, v in enumerate(dim['values'])}))
+            else:
+                self._dims.append(('bucket', slot[dim['column']], list(dim['edges'])))
+        self._strides = [int(np.prod(self.shape[i + 1:], dtype=np.int64)) for i in range(len(dims))]
+
+    @staticmethod
+    def _size(dim):
+        if dim['kind'] == 'one_hot':
+            return len(dim['columns']) + 1
+        if dim['kind'] == 'discrete':
+            return len(dim['values'])
+        return len(dim['representatives'])
+
+    @property
+    def max_error(self):
+        return self.stats.get('max_abs_error')
+
+    def index(self, row):
+        """Flat table index of one encoded feature row, or None if it lies outside the grid"""
+        flat = 0
+        for (kind, slots, lookup), stride in zip(self._dims, self._strides):
+            if kind == 'one_hot':
+                state = 0
+                for i, j in enumerate(slots):
+                    if row[j]:
+                        state = i + 1
+                        break
+            elif kind == 'discrete':
+                state = lookup.get(float(row[slots]))
+                if state is None:
+                    return None
+            else:
+                state = bisect_right(lookup, row[slots])
+            flat += state * stride
+        return flat
+
+    def lookup(self, row):
+        """Precomputed price for one encoded feature row, or None if it lies outside the grid"""
+        flat = self.index(row)
+        return None if flat is None else float(self.prices[flat])
+
+    def grid_rows(self, start, stop):
+        """Encoded feature rows of the cells ``start`` to ``stop`` (flat indices)"""
+        cells = np.unravel_index(np.arange(start, stop), self.shape)
+        X = np.zeros((stop - start, len(self.columns)))
+        for dim, (kind, slots, _), state in zip(self.dims, self._dims, cells):
+            if kind == 'one_hot':
+                for i, j in enumerate(slots):
+                    X[:, j] = state == i + 1
+            elif kind == 'discrete':
+                X[:, slots] = np.asarray(dim['values'], dtype=float)[state]
+            else:
+                X[:, slots] = np.asarray(dim['representatives'], dtype=float)[state]
+        return X
+
+    def save(self, path):
+        """Save the prices as a raw .npy file and the grid as JSON in the directory ``path``"""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'prices.npy'), np.ascontiguousarray(self.prices, dtype=np.float32))
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'model_version': self.model_version, 'columns': self.columns, 'shape': self.shape,
+                       'dims': self.dims, 'stats': self.stats}, f, indent=2)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """Load a table saved with ``save``, memory-mapping the prices by default"""
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        prices = np.load(os.path.join(path, 'prices.npy'), mmap_mode=mmap_mode)
+        return cls(meta['dims'], prices, meta['columns'], meta['model_version'], meta['stats'])
+
+
+def bucket_dim(column, values, n_buckets):
+    """Quantile buckets of a numeric feature, each priced at its median training value"""
+    edges = np.unique(np.quantile(values, np.linspace(0, 1, n_buckets + 1)[1:-1]))
+    buckets = np.searchsorted(edges, values, side='right')
+    representatives = [float(np.median(values[buckets == b])) for b in range(len(edges) + 1)]
+    return {'kind': 'bucket', 'column': column, 'edges': edges.tolist(), 'representatives': representatives}
+
+
+def grid_dims(X, pipeline, buckets=DEFAULT_BUCKETS, years=None):
+    """The grid over the feature columns of ``pipeline``, bucketed on the training matrix ``X``.
+    
+    ``years`` is the (first, last) year of the grid; by default the range of
+    years in ``X``, so newer listings are quoted once the model is retrained.
+    """
+    columns = pipeline.columns
+    if years is None:
+        year_values = np.asarray(X[:, columns.index('Year')])
+        years = (int(year_values.min()), int(year_values.max()))
+    dims = []
+    for field in ONE_HOT_FIELDS:
+        dims.append({'kind': 'one_hot', 'field': field,
+                     'columns': [c for c in columns if c.startswith(field + '_')]})
+    owner_codes = list(range(len(pipeline.label_encoders['Owner_Type'].classes_)))
+    dims.append({'kind': 'discrete', 'column': 'Owner_Type', 'values': owner_codes})
+    dims.append({'kind': 'discrete', 'column': 'Year', 'values': list(range(years[0], years[1] + 1))})
+    numeric = [field for field in NUMERIC_FIELDS if field != 'Year'] + [feature for _, feature in UNIT_FIELDS]
+    for column in numeric:
+        dims.append(bucket_dim(column, np.asarray(X[:, columns.index(column)]), buckets[column]))
+    return dims
+
+
+def training_matrix(pipeline, listings):
+    """Encode cleaned training listings with the model's own ``pipeline``.
+    
+    A pipeline refitted on the current CSV can number categories differently
+    from the model's (after --incremental updates, or once rows are
+    appended), so the table is built on rows encoded the way the server
+    encodes them. Rows with categories the model has never seen are skipped.
+    """
+    X, errors = pipeline.transform_frame(listings, dtype=np.float32)
+    return X[errors == '']
+
+
+def build_table(predict, X, pipeline, dims, chunk_size=200000, model_version=None):
+    """Price every cell of the grid ``dims`` with ``predict`` and measure the error on the rows of ``X``"""
+    table = QuoteTable(dims, None, pipeline.columns, model_version)
+    n_cells = int(np.prod(table.shape, dtype=np.int64))
+    prices = np.empty(n_cells, dtype=np.float32)
+    start_time = time.perf_counter()
+    for start in range(0, n_cells, chunk_size):
+        stop = min(start + chunk_size, n_cells)
+        prices[start:stop] = predict(table.grid_rows(start, stop))
+        print(f"   {stop:,}/{n_cells:,} cells priced", end='\r', flush=True)
+    print()
+    table.prices = prices
+    table.stats = {'cells': n_cells, 'megabytes': round(prices.nbytes / 2**20, 2),
+                   'build_seconds': round(time.perf_counter() - start_time, 1),
+                   **approximation_error(table, predict, X)}
+    return table
+
+
+def approximation_error(table, predict, X):
+    """Quote vs exact prediction on the rows of ``X`` (those inside the grid).
+    
+    The error stats are None when no row of ``X`` falls inside the grid.
+    """
+    indices = [table.index(row) for row in X]
+    inside = np.array([i is not None for i in indices], dtype=bool)
+    coverage = round(float(inside.mean()), 4) if len(X) else 0.0
+    if not inside.any():
+        keys = ['max_abs_error', 'p95_abs_error', 'mean_abs_error', 'max_relative_error', 'mean_relative_error']
+        return {'evaluated_rows': int(len(X)), 'coverage': coverage, **dict.fromkeys(keys)}
+    quotes = table.prices[np.array([i for i in indices if i is not None], dtype=np.int64)]
+    exact = predict(np.asarray(X)[inside])
+    errors = np.abs(quotes - exact)
+    relative = errors / np.maximum(np.abs(exact), 1e-9)
+    return {
+        'evaluated_rows': int(len(X)),
+        'coverage': coverage,
+        'max_abs_error': round(float(errors.max()), 4),
+        'p95_abs_error': round(float(np.percentile(errors, 95)), 4),
+        'mean_abs_error': round(float(errors.mean()), 4),
+        'max_relative_error': round(float(relative.max()), 4),
+        'mean_relative_error': round(float(relative.mean()), 4),
+    }
+
+
+def main():
+    from features import clean_listings
+    from model_store import MODEL_DIR, load_bundle
+    from train_model import read_listings
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    for column, default in DEFAULT_BUCKETS.items():
+        flag = column.split('(')[0].lower().replace('_driven', '').replace('kilometers', 'km')
+        parser.add_argument(f'--{flag}-buckets', dest=column, type=int, default=default,
+                            help=f'Buckets of {column} (default {default})')
+    args = parser.parse_args()
+    buckets = {column: getattr(args, column) for column in DEFAULT_BUCKETS}
+
+    bundle = load_bundle(args.model_dir)
+    model = bundle.get_sklearn_model()
+    if model is None:
+        raise SystemExit(f"❌ No model in {args.model_dir}; run train_model.py first")
+    listings = clean_listings(read_listings()[0])
+    X = training_matrix(bundle.feature_pipeline, listings)
+    if len(X) < len(listings):
+        print(f"⚠️  Skipping {len(listings) - len(X):,} listings with categories model version "
+              f"{bundle.version} has not seen")
+
+    dims = grid_dims(X, bundle.feature_pipeline, buckets)
+    shape = ' x '.join(str(QuoteTable._size(dim)) for dim in dims)
+    print(f"🧮 Pricing a {shape} grid with model version {bundle.version}...")
+    table = build_table(model.predict, X, bundle.feature_pipeline, dims, model_version=bundle.version)
+    path = os.path.join(args.model_dir, QUOTE_TABLE_DIR)
+    table.save(path)
+
+    s = table.stats
+    print(f"💾 {s['cells']:,} cells ({s['megabytes']:.1f} MB) saved to {path}/ in {s['build_seconds']}s")
+    print(f"📏 Quote vs exact prediction on {s['evaluated_rows']:,} training listings "
+          f"({s['coverage']:.1%} inside the grid):")
+    if s['max_abs_error'] is None:
+        print("⚠️  No training listing falls inside the grid; the error was not measured")
+        return
+    print(f"   max {s['max_abs_error']:.3f} | p95 {s['p95_abs_error']:.3f} | mean {s['mean_abs_error']:.3f} lakhs "
+          f"(max {s['max_relative_error']:.1%}, mean {s['mean_relative_error']:.1%} relative)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Bulk CSV Scoring
+Re-prices a CSV export with the same schema as train-data.csv using the model
+and encoders in models/. The input is streamed in chunks, so memory stays flat
+whatever the file size. Each chunk is encoded and scored in one batch, and the
+rows are written back out with a Predicted_Price column (CSV or Parquet).
+
+Usage:
+    python score_csv.py inventory.csv priced.csv
+    python score_csv.py inventory.csv priced.parquet --chunk-size 100000 --workers 0
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from features import REQUIRED_FIELDS
+from model_store import MODEL_DIR, load_bundle
+
+PREDICTION_COLUMN = 'Predicted_Price'
+ERROR_COLUMN = 'Prediction_Error'
+
+# Model bundle of this process (each pool worker loads its own)
+_bundle = None
+
+
+def init_scorer(model_dir):
+    """Load the model bundle once per process"""
+    global _bundle
+    _bundle = load_bundle(model_dir)
+    # Chunks are already spread across processes
+    model = _bundle.get_sklearn_model()
+    if model is not None and hasattr(model, 'n_jobs'):
+        model.n_jobs = 1
+
+
+def score_chunk(chunk):
+    """Add the prediction and error columns to one chunk of listings"""
+    features, errors = _bundle.feature_pipeline.transform_frame(chunk)
+    ok = errors == ''
+    predictions = np.full(len(chunk), np.nan)
+    if ok.any():
+        predictions[ok] = _bundle.predict(features[ok])
+
+    chunk[PREDICTION_COLUMN] = np.round(predictions, 4)
+    chunk[ERROR_COLUMN] = errors.astype(str)
+    return chunk
+
+
+class ChunkWriter:
+    """Append scored chunks to a CSV or Parquet file, chosen by extension"""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.endswith('.parquet')
+        self._writer = None
+        self._header = True
+        if self.parquet:
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise SystemExit("❌ Parquet output needs pyarrow: pip install pyarrow")
+
+    def write(self, chunk):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self._writer is None:
+                # Inputs are read as strings, so every chunk has the same schema
+                self._schema = pa.Table.from_pandas(chunk, preserve_index=False).schema
+                self._writer = pq.ParquetWriter(self.path, self._schema)
+            self._writer.write_table(pa.Table.from_pandas(chunk, schema=self._schema, preserve_index=False))
+        else:
+            chunk.to_csv(self.path, mode='w' if self._header else 'a', header=self._header, index=False)
+            self._header = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def read_chunks(path, chunk_size):
+    """Stream the input CSV, keeping every column as text so it round-trips unchanged"""
+    header = pd.read_csv(path, nrows=0)
+    missing_fields = [field for field in REQUIRED_FIELDS if field not in header.columns]
+    if missing_fields:
+        raise SystemExit(f"❌ Missing required columns in {path}: {missing_fields}")
+    return pd.read_csv(path, chunksize=chunk_size, dtype=str)
+
+
+def score_file(input_path, output_path, model_dir=MODEL_DIR, chunk_size=50000, workers=1):
+    """Score ``input_path`` into ``output_path`` and return (rows, failed rows, seconds).
+    
+    ``workers`` scoring processes are used; 0 means one per CPU core.
+    """
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    chunks = read_chunks(input_path, chunk_size)
+    writer = ChunkWriter(output_path)
+    n_rows = n_failed = 0
+
+    def record(scored):
+        nonlocal n_rows, n_failed
+        writer.write(scored)
+        n_rows += len(scored)
+        n_failed += int((scored[ERROR_COLUMN] != '').sum())
+        print(f"   {n_rows:,} rows scored", end='\r', flush=True)
+
+    try:
+        if workers == 1:
+            init_scorer(model_dir)
+            for chunk in chunks:
+                record(score_chunk(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_scorer,
+                                     initargs=(model_dir,)) as pool:
+                # Keep a couple of chunks per worker in flight so memory stays bounded
+                pending = []
+                for chunk in chunks:
+                    pending.append(pool.submit(score_chunk, chunk))
+                    if len(pending) >= 2 * workers:
+                        record(pending.pop(0).result())
+                for future in pending:
+                    record(future.result())
+    finally:
+        writer.close()
+
+    return n_rows, n_failed, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('input', help='CSV with the train-data.csv columns')
+    parser.add_argument('output', help='Output .csv or .parquet file')
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--chunk-size', type=int, default=50000, help='Rows read and scored at a time')
+    parser.add_argument('--workers', type=int, default=1, help='Scoring processes (0 = one per CPU core)')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"❌ Input file not found: {args.input}")
+        sys.exit(1)
+
+    workers = args.workers or os.cpu_count() or 1
+    print(f"🚗 Scoring {args.input} -> {args.output} ({workers} worker{'s' if workers > 1 else ''})")
+    n_rows, n_failed, seconds = score_file(args.input, args.output, args.model_dir,
+                                           args.chunk_size, workers)
+
+    print(f"✅ Scored {n_rows:,} rows in {seconds:.1f}s ({n_rows / max(seconds, 1e-9):,.0f} rows/sec)")
+    if n_failed:
+        print(f"⚠️  {n_failed:,} rows could not be scored; see the {ERROR_COLUMN} column")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Production Server
+Pre-forking server for app.py. The model is loaded and smoke-tested once in
+the parent, which then forks the worker processes: they share the model's
+memory pages copy-on-write and all accept connections on one listening socket.
+Each worker runs a threaded Werkzeug server without the debugger or reloader.
+
+Signals sent to the parent:
+    SIGTERM / SIGINT   stop accepting, let in-flight requests finish, exit
+    SIGHUP             reload the model in the parent, then replace the
+                       workers one at a time with forks carrying the new model
+
+Crashed workers are restarted. /api/ready answers 200 as soon as a worker
+accepts requests, because workers only start once the model has loaded.
+
+Usage:
+    python serve.py
+    python serve.py --workers 4 --port 8000
+"""
+
+import argparse
+import gc
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import threading
+import time
+
+from threadpoolctl import threadpool_limits
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+import app as webapp
+
+logger = logging.getLogger('serve')
+
+# A stopping worker exits after this long without any request in flight
+DRAIN_QUIET_SECONDS = 0.5
+
+
+class DrainingRequestHandler(WSGIRequestHandler):
+    """Request handler that lets a stopping worker finish what it has started.
+
+    A request counts as in flight from its request line until its response
+    has been sent, so idle keep-alive connections never delay a shutdown.
+    Once the worker is stopping, connections close after their response and
+    clients reconnect to a live worker.
+    """
+
+    def parse_request(self):
+        self._counted = True
+        self.server.in_flight.add(1)
+        return super().parse_request()
+
+    def handle_one_request(self):
+        self._counted = False
+        try:
+            super().handle_one_request()
+        finally:
+            if self._counted:
+                self.server.in_flight.add(-1)
+            if self.server.stopping:
+                self.close_connection = True
+
+    def end_headers(self):
+        if self.server.stopping:
+            # Tell the client not to reuse this connection
+            self.send_header('Connection', 'close')
+        super().end_headers()
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def add(self, amount):
+        with self._lock:
+            self.value += amount
+
+
+def run_worker(sock, host, port, graceful_timeout, watch_interval):
+    """Serve requests on the inherited socket until SIGTERM, then drain and exit"""
+    # Forked workers would otherwise share one random sequence (e.g. profiler sampling)
+    random.seed()
+    # The parent handles Ctrl+C and SIGHUP and tells the workers what to do
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    if watch_interval > 0:
+        # Threads do not survive fork, so each worker watches for itself
+        webapp.start_model_watcher(interval=watch_interval)
+
+    server = make_server(host, port, webapp.app, threaded=True, request_handler=DrainingRequestHandler,
+                         fd=sock.fileno())
+    server.in_flight = Counter()
+    server.stopping = False
+
+    def stop(signum, frame):
+        server.stopping = True
+        # shutdown() blocks until serve_forever returns, so not on this thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    server.serve_forever()
+
+    # Exit once nothing has been in flight for a moment: a request already sent
+    # on an idle keep-alive connection still gets its answer
+    deadline = time.monotonic() + graceful_timeout
+    quiet_since = None
+    while time.monotonic() < deadline:
+        now = time.monotonic()
+        if server.in_flight.value > 0:
+            quiet_since = None
+        elif quiet_since is None:
+            quiet_since = now
+        elif now - quiet_since >= DRAIN_QUIET_SECONDS:
+            break
+        time.sleep(0.05)
+    if server.in_flight.value > 0:
+        logger.warning(f"Worker {os.getpid()} exiting with {server.in_flight.value} requests still running")
+    server.server_close()
+
+
+class Arbiter:
+    """Forks the workers, restarts those that die and handles the parent's signals"""
+
+    def __init__(self, sock, host, port, workers, graceful_timeout, watch_interval):
+        self.sock = sock
+        self.host = host
+        self.port = port
+        self.n_workers = workers
+        self.graceful_timeout = graceful_timeout
+        self.watch_interval = watch_interval
+        self.workers = set()
+        self.stopping = False
+        self.reload_requested = False
+
+    def spawn(self):
+        pid = os.fork()
+        if pid:
+            self.workers.add(pid)
+            return pid
+        # Child: serve, then leave without running the parent's cleanup
+        code = 0
+        try:
+            run_worker(self.sock, self.host, self.port, self.graceful_timeout, self.watch_interval)
+        except BaseException:
+            logger.exception(f"Worker {os.getpid()} crashed")
+            code = 1
+        finally:
+            logging.shutdown()
+            os._exit(code)
+
+    def handle_stop(self, signum, frame):
+        if not self.stopping:
+            logger.info(f"Shutting down {len(self.workers)} workers (signal {signum})")
+        self.stopping = True
+        for pid in list(self.workers):
+            self._signal(pid, signal.SIGTERM)
+
+    def handle_reload(self, signum, frame):
+        self.reload_requested = True
+
+    def _signal(self, pid, signum):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            self.workers.discard(pid)
+
+    def reap(self):
+        """Collect exited workers; returns the pids that exited"""
+        exited = []
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.workers.clear()
+                break
+            if pid == 0:
+                break
+            self.workers.discard(pid)
+            exited.append(pid)
+            if not self.stopping and status != 0:
+                logger.warning(f"Worker {pid} exited with status {status}")
+        return exited
+
+    def reload(self):
+        """Reload the model in the parent and replace the workers one by one"""
+        self.reload_requested = False
+        try:
+            webapp.reload_model()
+        except Exception as e:
+            logger.error(f"Reload failed, keeping the current workers: {str(e)}")
+            return
+        preload(webapp.active_model)
+        for pid in list(self.workers):
+            if self.stopping:
+                return
+            self.spawn()
+            self._signal(pid, signal.SIGTERM)
+            deadline = time.monotonic() + self.graceful_timeout + 5
+            while pid in self.workers and time.monotonic() < deadline:
+                self.reap()
+                time.sleep(0.05)
+        logger.info(f"Workers now serve model version {webapp.active_model.version}")
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+        signal.signal(signal.SIGHUP, self.handle_reload)
+        for _ in range(self.n_workers):
+            self.spawn()
+        logger.info(f"Serving on http://{self.host}:{self.port} with {self.n_workers} workers "
+                    f"(pids {sorted(self.workers)})")
+
+        stop_deadline = None
+        while self.workers or not self.stopping:
+            self.reap()
+            if self.stopping:
+                if stop_deadline is None:
+                    stop_deadline = time.monotonic() + self.graceful_timeout + 5
+                elif time.monotonic() > stop_deadline:
+                    for pid in list(self.workers):
+                        self._signal(pid, signal.SIGKILL)
+            elif self.reload_requested:
+                self.reload()
+            else:
+                while len(self.workers) < self.n_workers:
+                    self.spawn()
+                    # Don't spin if workers die on startup
+                    time.sleep(0.5)
+            time.sleep(0.1)
+        logger.info("All workers stopped")
+
+
+def preload(bundle):
+    """Load everything lazy before forking, so workers share it instead of each loading a copy.
+    
+    With SLIM_SERVING the flat forest answers every request, so sklearn and
+    pandas are left unloaded and the parent starts in well under a second.
+    """
+    if not webapp.SLIM_SERVING:
+        bundle.get_sklearn_model()
+        # Batch requests encode with pandas
+        import pandas  # noqa: F401
+        # sklearn is imported lazily, so its OpenMP runtime may only exist now:
+        # limit it before the workers fork, like the pools limited in main()
+        threadpool_limits(1)
+    # Objects that exist now are never touched by the garbage collector again,
+    # which keeps their pages shared with the workers
+    gc.unfreeze()
+    gc.collect()
+    gc.freeze()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1)),
+                        help='Worker processes (default: WEB_CONCURRENCY or one per CPU core)')
+    parser.add_argument('--graceful-timeout', type=float, default=30.0,
+                        help='Seconds a stopping worker waits for in-flight requests')
+    parser.add_argument('--backlog', type=int, default=2048)
+    parser.add_argument('--access-log', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    logging.getLogger('werkzeug').setLevel(logging.INFO if args.access_log else logging.WARNING)
+    if not hasattr(os, 'fork'):
+        sys.exit("❌ serve.py needs os.fork (Linux/macOS); use `python app.py` on this platform")
+
+    # One worker per core already uses every core; single-threaded OpenMP
+    # (histogram gradient boosting) also never starts a thread pool that the
+    # forked workers would inherit in a broken state
+    threadpool_limits(1)
+
+    # Readiness: no worker exists until the model has loaded and passed its smoke test
+    if not webapp.load_model_and_encoders():
+        sys.exit("❌ Could not load the model; run train_model.py first")
+    preload(webapp.active_model)
+    if webapp.shadow is not None:
+        preload(webapp.shadow.candidate)
+
+    sock = socket.create_server((args.host, args.port), backlog=args.backlog)
+    sock.set_inheritable(True)
+    Arbiter(sock, args.host, args.port, args.workers, args.graceful_timeout, webapp.MODEL_WATCH_INTERVAL).run()
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Shadow evaluation of a candidate model on live traffic.
+A sample of /api/predict rows is queued for background threads that score
+them with the candidate in batches and record how far its predictions, and
+its latency, are from the primary model's. The request thread never waits:
+when the queue is full the sample is dropped.
+"""
+
+import logging
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def shares_features(primary, candidate):
+    """True when rows encoded for ``primary`` mean the same to ``candidate``"""
+    a, b = primary.feature_pipeline, candidate.feature_pipeline
+    return a.columns == b.columns and a.encoder.codes == b.encoder.codes
+
+
+def _percentiles(values, scale=1.0):
+    values = np.array(values, dtype=np.float64) * scale
+    return {'p50': round(float(np.percentile(values, 50)), 4), 'p95': round(float(np.percentile(values, 95)), 4),
+            'max': round(float(values.max()), 4)}
+
+
+class ShadowEvaluator:
+    """Score a sample of requests with a candidate model, off the request path.
+
+    ``offer`` is called by the request thread after the primary prediction.
+    Sampled rows go on a bounded queue drained by ``workers`` daemon threads,
+    started on first use. Rows are reused as encoded when the candidate's
+    feature pipeline matches the primary's; otherwise the worker re-encodes
+    the raw input with the candidate's pipeline.
+    """
+
+    def __init__(self, candidate, sample_rate=0.1, workers=1, queue_size=1000, max_batch_size=64,
+                 max_wait=0.05, history=10000, clock=time.perf_counter):
+        self.candidate = candidate
+        self.sample_rate = sample_rate
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._clock = clock
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._compatible = (None, False)
+        self._stopped = False
+        # Per scored row: candidate - primary, and both latencies
+        self._differences = deque(maxlen=history)
+        self._relative_differences = deque(maxlen=history)
+        self._primary_seconds = deque(maxlen=history)
+        self._candidate_seconds = deque(maxlen=history)
+        self._batch_seconds = deque(maxlen=history)
+        self.offered = self.sampled = self.dropped = 0
+        self.scored = self.failed = self.batches = 0
+
+    def _ensure_started(self):
+        # Started lazily so a process that forks workers starts its own threads
+        if len(self._threads) < self.workers or not all(t.is_alive() for t in self._threads):
+            with self._start_lock:
+                self._threads = [t for t in self._threads if t.is_alive()]
+                while len(self._threads) < self.workers:
+                    thread = threading.Thread(target=self._run, name=f'shadow-{len(self._threads)}', daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+
+    def offer(self, primary, data, features, prediction, primary_seconds=None):
+        """Maybe queue one request for the candidate; never blocks.
+
+        ``primary`` is the bundle that served it, ``data`` the raw input,
+        ``features`` its encoded row and ``primary_seconds`` how long the
+        primary model took (None for cached predictions). Returns True if
+        the row was queued.
+        """
+        with self._stats_lock:
+            self.offered += 1
+        if self._stopped or random.random() >= self.sample_rate:
+            return False
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((primary, data, features, float(prediction), primary_seconds))
+            queued = True
+        except queue.Full:
+            queued = False
+        with self._stats_lock:
+            self.sampled += 1
+            self.dropped += not queued
+        return queued
+
+    def stop(self):
+        """Stop the worker threads once the queued rows have been scored"""
+        self._stopped = True
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = self._clock() + self.max_wait
+            stopping = False
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - self._clock()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._score(batch)
+            if stopping:
+                return
+
+    def _encode(self, primary, items):
+        """Candidate features for ``items`` and the positions of the rows that encoded"""
+        compatible_with, compatible = self._compatible
+        if compatible_with is not primary:
+            compatible = shares_features(primary, self.candidate)
+            self._compatible = (primary, compatible)
+        if compatible:
+            return np.vstack([features for _, _, features, _, _ in items]), list(range(len(items)))
+        records = [data for _, data, _, _, _ in items]
+        features, positions, _ = self.candidate.feature_pipeline.transform_records(records)
+        return features, positions
+
+    def _score(self, batch):
+        groups = {}
+        for item in batch:
+            groups.setdefault(id(item[0]), (item[0], []))[1].append(item)
+
+        for primary, items in groups.values():
+            try:
+                features, positions = self._encode(primary, items)
+                start = self._clock()
+                predictions = self.candidate.predict(features) if positions else []
+                seconds = self._clock() - start
+            except Exception as e:
+                logger.warning(f"Shadow model {self.candidate.version} failed on {len(items)} rows: {e}")
+                with self._stats_lock:
+                    self.failed += len(items)
+                continue
+
+            with self._stats_lock:
+                self.batches += 1
+                self.scored += len(positions)
+                self.failed += len(items) - len(positions)
+                if positions:
+                    self._batch_seconds.append(seconds)
+                for i, prediction in zip(positions, predictions):
+                    _, _, _, primary_prediction, primary_seconds = items[i]
+                    difference = float(prediction) - primary_prediction
+                    self._differences.append(difference)
+                    if primary_prediction:
+                        self._relative_differences.append(difference / abs(primary_prediction))
+                    if primary_seconds is not None:
+                        self._primary_seconds.append(primary_seconds)
+                    self._candidate_seconds.append(seconds / len(positions))
+
+    def stats(self):
+        """Sampling counts, prediction differences and latencies for the health endpoint"""
+        with self._stats_lock:
+            differences = np.array(self._differences, dtype=np.float64)
+            relative = np.array(self._relative_differences, dtype=np.float64)
+            primary_seconds = list(self._primary_seconds)
+            candidate_seconds = list(self._candidate_seconds)
+            batch_seconds = list(self._batch_seconds)
+            stats = {
+                'enabled': True,
+                'candidate_version': self.candidate.version,
+                'sample_rate': self.sample_rate,
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'queued': self._queue.qsize(),
+                'offered': self.offered,
+                'sampled': self.sampled,
+                'dropped': self.dropped,
+                'scored': self.scored,
+                'failed': self.failed,
+                'batches': self.batches,
+            }
+        if differences.size:
+            stats['difference'] = {
+                'mean': round(float(differences.mean()), 4),
+                'mean_abs': round(float(np.abs(differences).mean()), 4),
+                'abs': _percentiles(np.abs(differences)),
+            }
+            if relative.size:
+                stats['difference']['mean_abs_pct'] = round(float(np.abs(relative).mean()) * 100, 2)
+            stats['latency_ms'] = {
+                'candidate_per_row': _percentiles(candidate_seconds, 1e3),
+                'candidate_batch': _percentiles(batch_seconds, 1e3),
+            }
+            if primary_seconds:
+                stats['latency_ms']['primary'] = _percentiles(primary_seconds, 1e3)
+        return stats
@@ -0,0 +1,82 @@
+"""
+Per-stage time and memory report for training runs.
+Each stage records its wall time, the peak resident memory (RSS) reached while
+it ran and the RSS when it finished. On Linux the peak is reset at the start
+of every stage (/proc/self/clear_refs), so it belongs to that stage alone;
+elsewhere it is the process peak so far.
+"""
+
+import resource
+import sys
+import time
+from contextlib import contextmanager
+
+
+def _read_status_mb(field):
+    """A memory field of /proc/self/status (VmRSS, VmHWM) in MB, or None off Linux"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(f'{field}:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak():
+    """Reset VmHWM to the current RSS; False where the kernel does not allow it"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _process_peak_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+
+def rss_mb():
+    """Current resident memory of this process in MB (peak so far where unavailable)"""
+    current = _read_status_mb('VmRSS')
+    return current if current is not None else _process_peak_mb()
+
+
+class StageReport:
+    """Collects the stages of one run; ``stage(name)`` is a context manager"""
+
+    def __init__(self):
+        self.stages = []
+        self.per_stage_peaks = _reset_peak()
+        self.started_rss_mb = rss_mb()
+
+    @contextmanager
+    def stage(self, name):
+        if self.per_stage_peaks:
+            _reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak = _read_status_mb('VmHWM') if self.per_stage_peaks else _process_peak_mb()
+            self.stages.append({'stage': name, 'seconds': round(seconds, 3),
+                                'peak_rss_mb': round(peak, 1), 'rss_after_mb': round(rss_mb(), 1)})
+
+    def as_dict(self):
+        """The finished stages and overall peak; a stage still running is not included"""
+        return {'started_rss_mb': round(self.started_rss_mb, 1),
+                'peak_rss_mb': max((s['peak_rss_mb'] for s in self.stages), default=None),
+                'per_stage_peaks': self.per_stage_peaks, 'stages': self.stages}
+
+    def print(self):
+        print(f"\n📊 {'stage':<16} | {'time':>8} | {'peak RSS':>10} | {'RSS after':>10}")
+        for s in self.stages:
+            print(f"   {s['stage']:<16} | {s['seconds']:>7.2f}s | {s['peak_rss_mb']:>7.1f} MB | "
+                  f"{s['rss_after_mb']:>7.1f} MB")
+        if not self.per_stage_peaks:
+            print("   (peaks are the process maximum so far; per-stage peaks need Linux)")
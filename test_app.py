@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+import app as webapp
+from benchmarks.synthetic_data import make_requests
+from model_store import load_bundle
+
+
+@pytest.fixture
+def client(model_dir, monkeypatch):
+    monkeypatch.setattr(webapp, 'active_model', load_bundle(model_dir))
+    monkeypatch.setattr(webapp, 'drift_monitor', None)
+    return webapp.app.test_client()
+
+
+def test_json_array_and_ndjson_bodies_score_the_same(client):
+    cars = make_requests(5, seed=1)
+    ndjson = '\n'.join(json.dumps(car) for car in cars) + '\n\n'
+
+    array = client.post('/api/predict/batch', json=cars).get_json()
+    lines = client.post('/api/predict/batch', data=ndjson, content_type='application/x-ndjson').get_json()
+    assert array == lines
+    assert (array['count'], array['succeeded'], array['failed']) == (5, 5, 0)
+    assert [row['index'] for row in array['results']] == list(range(5))
+
+    single = client.post('/api/predict', json=cars[2]).get_json()
+    assert array['results'][2]['predicted_price'] == pytest.approx(single['predicted_price'], abs=0.01)
+
+
+def test_bad_rows_get_an_error_entry_without_failing_the_batch(client):
+    cars = make_requests(4, seed=2)
+    unknown = dict(cars[1], Location='Atlantis')
+    missing = {key: value for key, value in cars[2].items() if key != 'Power'}
+    body = client.post('/api/predict/batch', json=[cars[0], unknown, missing, 'not a car', cars[3]]).get_json()
+
+    assert (body['count'], body['succeeded'], body['failed']) == (5, 2, 3)
+    assert body['results'][1] == {'index': 1, 'error': 'Unknown Location: Atlantis'}
+    assert body['results'][2]['error'] == "Missing required fields: ['Power']"
+    assert body['results'][3]['error'] == 'Row must be a JSON object'
+    assert 'predicted_price' in body['results'][0] and 'predicted_price' in body['results'][4]
+
+
+def test_malformed_ndjson_lines_are_row_errors(client):
+    cars = make_requests(2, seed=3)
+    ndjson = f'{json.dumps(cars[0])}\n{{"Name": "Honda City",\n{json.dumps(cars[1])}\n'
+    body = client.post('/api/predict/batch', data=ndjson, content_type='application/x-ndjson').get_json()
+
+    assert (body['succeeded'], body['failed']) == (2, 1)
+    assert body['results'][1]['index'] == 1 and body['results'][1]['error'].startswith('Invalid JSON')
+    assert body['results'][2]['predicted_price'] > 0
+
+
+def test_rejected_bodies(client, monkeypatch):
+    response = client.post('/api/predict/batch', json={'Name': 'Honda City'})
+    assert response.status_code == 400 and 'Expected a JSON array' in response.get_json()['error']
+    assert client.post('/api/predict/batch', json=[]).status_code == 400
+
+    monkeypatch.setattr(webapp, 'MAX_BATCH_ROWS', 3)
+    response = client.post('/api/predict/batch', json=make_requests(4, seed=4))
+    assert response.status_code == 413
+    assert response.get_json()['error'] == 'Batch too large: 4 rows (max 3)'
+    assert client.post('/api/predict/batch', json=make_requests(3, seed=4)).status_code == 200
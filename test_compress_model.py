@@ -0,0 +1,82 @@
+import json
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+import compress_model
+from benchmarks.synthetic_data import make_listings
+from drift import DRIFT_REFERENCE_FILE, DriftSketch
+from flat_forest import FlatForest
+from model_store import read_model_info
+from train_model import build_training_matrix
+
+
+def fitted_forest(n_estimators=8):
+    X, y, _ = build_training_matrix(make_listings(400, seed=3))
+    forest = RandomForestRegressor(n_estimators=n_estimators, random_state=0).fit(X, y)
+    return forest, X, y
+
+
+def test_cap_depth_predicts_the_node_reached_at_that_depth():
+    forest, X, _ = fitted_forest()
+    capped = compress_model.cap_depth(forest, 4)
+
+    for original, truncated in zip(forest.estimators_, capped.estimators_):
+        assert truncated.tree_.max_depth <= 4
+        assert truncated.tree_.node_count < original.tree_.node_count
+        # The value of the last node on each row's path within the first 4 levels
+        paths = original.decision_path(X).toarray().astype(bool)
+        depths = np.zeros(original.tree_.node_count, dtype=int)
+        for node in range(original.tree_.node_count):
+            for child in (original.tree_.children_left[node], original.tree_.children_right[node]):
+                if child != -1:
+                    depths[child] = depths[node] + 1
+        expected = [original.tree_.value[np.flatnonzero(path & (depths <= 4))[-1], 0, 0] for path in paths]
+        np.testing.assert_allclose(truncated.predict(X), expected)
+
+    # The flat forest of the capped model matches it, and the original is untouched
+    np.testing.assert_allclose(FlatForest.from_sklearn(capped).predict(X), capped.predict(X))
+    assert forest.estimators_[0].tree_.max_depth > 4
+
+
+def test_out_of_bag_mask_matches_sklearn_bootstrap():
+    X, y, _ = build_training_matrix(make_listings(300, seed=4))
+    forest = RandomForestRegressor(n_estimators=25, random_state=0, oob_score=True).fit(X, y)
+    oob = compress_model.out_of_bag_mask(forest, len(X))
+
+    predictions = np.column_stack([estimator.predict(X) for estimator in forest.estimators_])
+    covered = oob.any(axis=1)
+    ours = (predictions * oob).sum(axis=1)[covered] / oob.sum(axis=1)[covered]
+    np.testing.assert_allclose(ours, forest.oob_prediction_[covered])
+
+
+def test_rank_trees_orders_every_tree_and_keep_trees_subsets():
+    forest, X, y = fitted_forest()
+    order = compress_model.rank_trees(forest, X, y)
+    assert sorted(order) == list(range(8))
+
+    subset = compress_model.keep_trees(forest, order[:3])
+    expected = np.mean([forest.estimators_[i].predict(X) for i in order[:3]], axis=0)
+    np.testing.assert_allclose(subset.predict(X), expected)
+    assert len(forest.estimators_) == 8
+
+
+def test_deploy_records_the_training_rows_and_replaces_the_drift_reference(tmp_path):
+    model_dir, out_dir = tmp_path / 'models', tmp_path / 'compressed'
+    model_dir.mkdir()
+    (model_dir / DRIFT_REFERENCE_FILE).write_text('{"stale": true}')
+    X, y, pipeline = build_training_matrix(make_listings(300, seed=5))
+    data = {'path': 'train-data.csv', 'offset': 12345, 'rows': 300}
+    compress_model.build_report(X, y, pipeline, [], [4], [], model_dir=str(model_dir), out_dir=str(out_dir), data=data)
+
+    compress_model.deploy('depth_4', model_dir=str(model_dir), out_dir=str(out_dir))
+    assert read_model_info(model_dir)['data'] == data
+    assert DriftSketch.load(model_dir / DRIFT_REFERENCE_FILE).rows == len(X)
+
+    # A report written without the data record, and without a drift reference
+    report_path = out_dir / compress_model.REPORT_FILE
+    report_path.write_text(json.dumps({**json.loads(report_path.read_text()), 'data': None}))
+    (out_dir / DRIFT_REFERENCE_FILE).unlink()
+    compress_model.deploy('depth_4', model_dir=str(model_dir), out_dir=str(out_dir))
+    assert 'data' not in read_model_info(model_dir)
+    assert not (model_dir / DRIFT_REFERENCE_FILE).exists()
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+import app as webapp
+from benchmarks.synthetic_data import make_listings, make_requests
+from conftest import save_model_dir
+from drift import DRIFT_REFERENCE_FILE, DriftMonitor, DriftSketch
+from train_model import build_training_matrix
+
+
+@pytest.fixture(scope="module")
+def training():
+    X, y, pipeline = build_training_matrix(make_listings(3000, seed=1))
+    return X, y, pipeline, DriftSketch.from_matrix(X, pipeline)
+
+
+def shifted(cars):
+    """Older, more driven cars, half of them in Mumbai"""
+    return [dict(car, Year=car['Year'] - 6, Kilometers_Driven=car['Kilometers_Driven'] * 2,
+                 Location='Mumbai' if i % 2 else car['Location']) for i, car in enumerate(cars)]
+
+
+def test_single_rows_and_matrices_land_in_the_same_bins(tmp_path, training):
+    X, _, pipeline, reference = training
+    rows = np.vstack([pipeline.transform_record(car) for car in make_requests(200, seed=2)])
+
+    assert [reference.row_indices(row) for row in rows] == reference.indices(rows).tolist()
+    assert reference.counts.sum() == reference.rows * len(reference.layout) and reference.rows == len(X)
+
+    reference.save(tmp_path / DRIFT_REFERENCE_FILE)
+    loaded = DriftSketch.load(tmp_path / DRIFT_REFERENCE_FILE)
+    assert np.array_equal(loaded.counts, reference.counts)
+    assert np.array_equal(loaded.extended(rows).counts - reference.counts, np.bincount(
+        reference.indices(rows).ravel(), minlength=reference.size))
+
+
+def test_monitor_flags_only_the_features_that_moved(training):
+    _, _, pipeline, reference = training
+    cars = make_requests(1500, seed=3)
+
+    steady, moved = DriftMonitor(reference, window=500), DriftMonitor(reference, window=500)
+    assert steady.scores()['status'] == 'insufficient_data'
+    for car, moved_car in zip(cars, shifted(cars)):
+        steady.observe(pipeline.transform_record(car))
+        moved.observe(pipeline.transform_record(moved_car))
+
+    scores = steady.scores()
+    assert scores['observed'] == 1500 and scores['rows'] <= 1000
+    assert scores['status'] == 'stable' and scores['drifted'] == []
+
+    scores = moved.scores()
+    assert set(scores['drifted']) == {'Year', 'Kilometers_Driven', 'Location'}
+    assert scores['features']['Power(bhp)']['status'] == 'stable'
+    assert scores['features']['Location']['largest_change']['label'] == 'Mumbai'
+    year = scores['features']['Year']
+    assert year['live_median'] < year['reference_median'] - 4
+
+
+def test_drift_endpoint_scores_predict_traffic(tmp_path, training, monkeypatch):
+    X, y, pipeline, reference = training
+    save_model_dir(tmp_path, RandomForestRegressor(n_estimators=5, random_state=0).fit(X, y), pipeline)
+    monkeypatch.setattr(webapp, 'active_model', None)
+    monkeypatch.setattr(webapp, 'drift_monitor', None)
+    client = webapp.app.test_client()
+
+    webapp.reload_model(str(tmp_path))
+    assert client.get('/api/drift').status_code == 404
+
+    reference.save(tmp_path / DRIFT_REFERENCE_FILE)
+    webapp.reload_model(str(tmp_path))
+    cars = shifted(make_requests(150, seed=4))
+    for car in cars[:100]:
+        assert client.post('/api/predict', json=car).status_code == 200
+    client.post('/api/predict/batch', json=cars[100:])
+
+    body = client.get('/api/drift').get_json()
+    assert body['model_version'] == 'v1' and body['rows'] == 150
+    assert 'Year' in body['drifted']
+    assert 'car_price_feature_drift_psi{feature="Year"}' in client.get('/api/metrics').get_data(as_text=True)
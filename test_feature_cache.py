@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+
+from benchmarks.synthetic_data import make_listings
+from feature_cache import load_or_build
+from train_model import build_training_matrix, read_listings
+
+
+def counting(func, calls):
+    def wrapper(*args):
+        calls.append(func.__name__)
+        return func(*args)
+    wrapper.__name__ = func.__name__
+    return wrapper
+
+
+def test_cache_hits_until_data_or_code_changes(tmp_path):
+    csv_path = str(tmp_path / 'train-data.csv')
+    cache_dir = str(tmp_path / 'cache')
+    make_listings(500, seed=1).to_csv(csv_path)
+    calls = []
+    read = counting(read_listings, calls)
+
+    X, y, pipeline, meta = load_or_build(csv_path, read, build_training_matrix, cache_dir)
+    assert meta['cache'] == 'miss' and meta['offset'] == os.path.getsize(csv_path)
+
+    # Unchanged: memory-mapped, column-major and identical, without reading the CSV
+    cached_X, cached_y, cached_pipeline, meta = load_or_build(csv_path, read, build_training_matrix, cache_dir)
+    assert meta['cache'] == 'hit' and calls == ['read_listings']
+    assert isinstance(cached_X, np.memmap) and cached_X.flags.f_contiguous
+    np.testing.assert_array_equal(cached_X, X)
+    np.testing.assert_array_equal(cached_y, y)
+    assert cached_pipeline.encoder.codes == pipeline.encoder.codes
+
+    # New rows make the entry stale; only the newest entry is kept
+    make_listings(50, seed=2).to_csv(csv_path, mode='a', header=False)
+    X, _, _, meta = load_or_build(csv_path, read, build_training_matrix, cache_dir)
+    assert meta['cache'] == 'miss' and len(os.listdir(cache_dir)) == 1
+    assert load_or_build(csv_path, read, build_training_matrix, cache_dir)[3]['cache'] == 'hit'
+
+    # So does different preprocessing code
+    def build_training_matrix_v2(listings):
+        X, y, pipeline = build_training_matrix(listings)
+        return X * 2, y, pipeline
+
+    X2, _, _, meta = load_or_build(csv_path, read, build_training_matrix_v2, cache_dir)
+    assert meta['cache'] == 'miss'
+    np.testing.assert_array_equal(X2, X * 2)
@@ -0,0 +1,160 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_data import make_listings
+from features import FeaturePipeline, FEATURE_COLUMNS, REQUIRED_FIELDS, clean_listings
+from train_model import build_training_matrix
+
+
+@pytest.fixture(scope="module")
+def listings():
+    return clean_listings(make_listings(2000, seed=7))
+
+
+@pytest.fixture(scope="module")
+def pipeline(listings):
+    return FeaturePipeline().fit(listings)
+
+
+def as_requests(listings):
+    """Round-trip listings through JSON like /api/predict payloads"""
+    records = listings[REQUIRED_FIELDS].to_dict('records')
+    return json.loads(json.dumps(records, default=float))
+
+
+def legacy_preprocess_input(data, label_encoders):
+    """The pandas preprocess_input app.py used before FeatureEncoder"""
+    df = pd.DataFrame([data])
+    df['Company'] = df['Name'].str.split().str[0]
+    df['Mileage(km/kg)'] = df['Mileage'].str.split().str[0].astype(float)
+    df['Engine(CC)'] = df['Engine'].str.split().str[0].astype(float)
+    df['Power(bhp)'] = df['Power'].str.split().str[0].astype(float)
+    for col in ['Location', 'Fuel_Type', 'Transmission', 'Owner_Type', 'Company']:
+        df[col] = label_encoders[col].transform(df[col])
+    final_features = pd.concat([
+        df[['Year', 'Kilometers_Driven', 'Owner_Type', 'Seats', 'Mileage(km/kg)', 'Engine(CC)', 'Power(bhp)']],
+        pd.get_dummies(df['Location'], prefix='Location'),
+        pd.get_dummies(df['Fuel_Type'], prefix='Fuel_Type'),
+        pd.get_dummies(df['Transmission'], prefix='Transmission'),
+    ], axis=1)
+    for col in FEATURE_COLUMNS:
+        if col not in final_features.columns:
+            final_features[col] = 0
+    return final_features[FEATURE_COLUMNS]
+
+
+def test_encoder_matches_the_legacy_preprocess_input(listings, pipeline):
+    prefixes = ('Location_', 'Fuel_Type_', 'Transmission_')
+    one_hot = [i for i, col in enumerate(FEATURE_COLUMNS) if col.startswith(prefixes)]
+    plain = [i for i in range(len(FEATURE_COLUMNS)) if i not in one_hot]
+    for record in as_requests(listings)[:200]:
+        legacy = legacy_preprocess_input(record, pipeline.label_encoders)
+        encoded = pipeline.encoder.encode(record)[0]
+        assert list(legacy.columns) == pipeline.encoder.columns
+        np.testing.assert_array_equal(encoded[plain], legacy.to_numpy(dtype=np.float64)[0, plain])
+
+        # The legacy path built dummies from label codes (Location_3, ...), which never
+        # matched a training column, so every one-hot feature was zero-filled. The
+        # encoder sets them from the raw categories, as pd.get_dummies does in training.
+        assert not legacy.iloc[0, one_hot].any()
+        raw = pd.get_dummies(pd.DataFrame([record])[['Location', 'Fuel_Type', 'Transmission']])
+        expected = raw.reindex(columns=FEATURE_COLUMNS, fill_value=0).to_numpy(dtype=np.float64)[0]
+        np.testing.assert_array_equal(encoded[one_hot], expected[one_hot])
+
+
+def test_train_and_serve_features_are_byte_identical(listings, pipeline):
+    train_features, _, _ = build_training_matrix(make_listings(2000, seed=7))
+    records = as_requests(listings)
+
+    single = np.vstack([pipeline.transform_record(record) for record in records])
+    batch, positions, errors = pipeline.transform_records(records)
+
+    assert train_features.shape == (len(listings), len(FEATURE_COLUMNS))
+    assert errors == {} and positions == list(range(len(records)))
+    assert single.dtype == batch.dtype == np.float64
+    assert single.tobytes() == batch.tobytes() == pipeline.transform(listings).tobytes()
+    # Training keeps float32, which is what the model sees at serving time too
+    assert train_features.dtype == np.float32
+    assert single.astype(np.float32).tobytes() == train_features.tobytes()
+
+
+def test_one_hot_columns_follow_raw_categories(pipeline):
+    record = as_requests(make_listings(50, seed=1).pipe(clean_listings))[0]
+    record.update(Location='Pune', Fuel_Type='Petrol', Transmission='Manual')
+    row = dict(zip(FEATURE_COLUMNS, pipeline.transform_record(record)[0]))
+
+    assert row['Location_Pune'] == row['Fuel_Type_Petrol'] == row['Transmission_Manual'] == 1.0
+    assert sum(value for name, value in row.items() if name.startswith('Location_')) == 1.0
+
+    # The dropped baseline categories have no column of their own
+    record.update(Location='Ahmedabad', Fuel_Type='CNG', Transmission='Automatic')
+    row = dict(zip(FEATURE_COLUMNS, pipeline.transform_record(record)[0]))
+    assert all(row[name] == 0.0 for name in FEATURE_COLUMNS[7:])
+
+
+def test_bad_rows_are_reported_per_row(listings, pipeline):
+    good = as_requests(listings.head(3))
+    records = [
+        good[0],
+        dict(good[1], Location='Atlantis'),
+        dict(good[1], Power='null bhp'),
+        {'Name': 'Honda City'},
+        good[2],
+    ]
+    features, positions, errors = pipeline.transform_records(records)
+
+    assert positions == [0, 4]
+    assert features.tobytes() == np.vstack(
+        [pipeline.transform_record(good[0]), pipeline.transform_record(good[2])]
+    ).tobytes()
+    assert errors[1] == 'Unknown Location: Atlantis'
+    assert errors[2] == 'Invalid Power: null bhp'
+    assert errors[3].startswith('Missing required fields')
+
+    with pytest.raises(ValueError, match='Unknown Location'):
+        pipeline.transform_record(records[1])
+
+
+def test_missing_values_are_rejected_on_every_path(listings, pipeline):
+    record = dict(as_requests(listings.head(1))[0], Seats=float('nan'))
+
+    with pytest.raises(ValueError, match='Invalid Seats: nan'):
+        pipeline.transform_record(record)
+    assert pipeline.transform_records([record])[2] == {0: 'Invalid Seats: nan'}
+
+    # CSV chunks carry empty cells as NaN
+    frame = listings.head(2).copy()
+    frame.loc[frame.index[1], 'Power'] = np.nan
+    _, errors = pipeline.transform_frame(frame)
+    assert list(errors) == ['', 'Invalid Power: nan']
+
+
+def test_saved_pipeline_round_trips(tmp_path, listings, pipeline):
+    path = tmp_path / 'feature_pipeline.joblib'
+    pipeline.save(path)
+    loaded = FeaturePipeline.load(path)
+
+    assert loaded.columns == pipeline.columns
+    assert loaded.transform(listings).tobytes() == pipeline.transform(listings).tobytes()
+
+
+def test_extend_appends_new_categories_without_renumbering(listings):
+    pipeline = FeaturePipeline().fit(listings)
+    before = pipeline.transform(listings)
+    codes = {col: dict(pipeline.encoder.codes[col]) for col in pipeline.encoder.codes}
+
+    new = listings.head(3).copy()
+    new['Name'] = ['Tesla Model3 VX', 'Tesla Model3 VX', 'BYD Atto VX']
+    new['Location'] = ['Goa', new['Location'].iloc[1], new['Location'].iloc[2]]
+    assert pipeline.extend(new) == {'Location': ['Goa'], 'Company': ['BYD', 'Tesla']}
+
+    for col, known in codes.items():
+        assert {category: pipeline.encoder.codes[col][category] for category in known} == known
+    assert pipeline.encoder.codes['Company']['Tesla'] == len(codes['Company']) + 1
+    assert pipeline.transform(listings).tobytes() == before.tobytes()
+    # A new location has no one-hot column and encodes like the baseline category
+    assert pipeline.transform_record(as_requests(new)[0])[0, 7:17].sum() == 0
+    assert pipeline.extend(new) == {}
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+
+from benchmarks.synthetic_data import make_listings
+from flat_forest import FlatForest
+from train_model import build_training_matrix
+
+
+@pytest.fixture(scope="module")
+def data():
+    X, y, _ = build_training_matrix(make_listings(1500, seed=3))
+    return X, y
+
+
+@pytest.fixture(scope="module")
+def forest(data):
+    X, y = data
+    return RandomForestRegressor(n_estimators=20, random_state=0).fit(X[:1000], y[:1000])
+
+
+def test_matches_sklearn_predictions(data, forest):
+    X, _ = data
+    flat_forest = FlatForest.from_sklearn(forest)
+
+    np.testing.assert_allclose(flat_forest.predict(X), forest.predict(X), rtol=0, atol=1e-9)
+    np.testing.assert_allclose(flat_forest.predict(X[:1]), forest.predict(X[:1]), rtol=0, atol=1e-9)
+
+
+def test_reaches_the_same_leaves_as_sklearn(data, forest):
+    X, _ = data
+    flat_forest = FlatForest.from_sklearn(forest)
+
+    # sklearn numbers nodes per tree; the flat table offsets each tree by its root
+    assert np.array_equal(flat_forest.apply(X), forest.apply(X) + flat_forest.roots)
+
+
+def test_save_and_load_round_trip(tmp_path, data, forest):
+    X, _ = data
+    flat_forest = FlatForest.from_sklearn(forest)
+    path = tmp_path / 'forest'
+    flat_forest.save(path)
+    loaded = FlatForest.load(path)
+
+    assert isinstance(loaded.threshold, np.memmap)
+    assert (loaded.n_features, loaded.max_depth) == (flat_forest.n_features, flat_forest.max_depth)
+    assert np.array_equal(loaded.predict(X), flat_forest.predict(X))
+
+
+def test_rejects_wrong_feature_count(forest):
+    with pytest.raises(ValueError, match='Expected input of shape'):
+        FlatForest.from_sklearn(forest).predict(np.zeros((1, 3)))
+
+
+def test_boosted_trees_match_sklearn_and_survive_a_round_trip(tmp_path, data, forest):
+    X, y = data
+    boosting = HistGradientBoostingRegressor(max_iter=50, random_state=0).fit(X[:1000], y[:1000])
+    flat_boosting = FlatForest.from_sklearn(boosting)
+
+    assert flat_boosting.boosted and flat_boosting.n_trees == 50
+    np.testing.assert_allclose(flat_boosting.predict(X), boosting.predict(X), rtol=0, atol=1e-9)
+
+    path = tmp_path / 'forest'
+    flat_boosting.save(path)
+    np.testing.assert_allclose(FlatForest.load(path).predict(X), boosting.predict(X), rtol=0, atol=1e-9)
+
+    # A forest saved over it is not read back as boosted
+    FlatForest.from_sklearn(forest).save(path)
+    assert not FlatForest.load(path).boosted
+    np.testing.assert_allclose(FlatForest.load(path).predict(X), forest.predict(X), rtol=0, atol=1e-9)
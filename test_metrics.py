@@ -0,0 +1,53 @@
+import time
+
+from metrics import MetricsRegistry, SlowRequestProfiler, StageTimer
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    requests = registry.counter('requests_total', 'Requests', ('endpoint', 'status'))
+    latency = registry.histogram('latency_seconds', 'Latency', ('stage',), buckets=(0.01, 0.1))
+    requests.inc(endpoint='predict', status=200)
+    requests.inc(2, endpoint='predict', status=200)
+    for value in (0.005, 0.05, 0.5):
+        latency.observe(value, stage='predict')
+
+    lines = registry.render().splitlines()
+
+    assert '# TYPE requests_total counter' in lines
+    assert 'requests_total{endpoint="predict",status="200"} 3' in lines
+    assert '# TYPE latency_seconds histogram' in lines
+    assert 'latency_seconds_bucket{stage="predict",le="0.01"} 1' in lines
+    assert 'latency_seconds_bucket{stage="predict",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{stage="predict",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{stage="predict"} 3' in lines
+
+
+def test_collectors_refresh_values_before_render():
+    registry = MetricsRegistry()
+    entries = registry.gauge('cache_entries', 'Entries')
+    sizes = iter([5, 7])
+    registry.add_collector(lambda: entries.set(next(sizes)))
+
+    assert 'cache_entries 5' in registry.render()
+    assert 'cache_entries 7' in registry.render()
+
+
+def test_stage_timer_splits_elapsed_time():
+    timer = StageTimer()
+    time.sleep(0.002)
+    timer.mark('parse')
+    timer.mark('predict')
+
+    assert list(timer.stages) == ['parse', 'predict']
+    assert timer.stages['parse'] >= 0.002
+    assert sum(timer.stages.values()) <= timer.elapsed
+
+
+def test_profiler_keeps_only_the_slowest_dumps(tmp_path):
+    profiler = SlowRequestProfiler(sample_rate=1.0, keep=2, directory=str(tmp_path))
+    for seconds in (0.3, 0.1, 0.5, 0.2):
+        profiler.finish(profiler.start(), seconds, 'predict')
+
+    assert sorted(p.name.split('-')[1] for p in tmp_path.iterdir()) == ['300.0ms', '500.0ms']
+    assert SlowRequestProfiler(sample_rate=0.0).start() is None
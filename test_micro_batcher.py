@@ -0,0 +1,69 @@
+import threading
+
+import numpy as np
+import pytest
+
+from micro_batcher import MicroBatcher
+
+
+class RecordingBundle:
+    """Stands in for a ModelBundle: predicts the row sum and records batch sizes"""
+
+    def __init__(self, offset=0.0):
+        self.offset = offset
+        self.batch_sizes = []
+
+    def predict(self, features):
+        self.batch_sizes.append(len(features))
+        return features.sum(axis=1) + self.offset
+
+
+def submit_concurrently(batcher, bundles, n_requests):
+    barrier = threading.Barrier(n_requests)
+    results = [None] * n_requests
+
+    def client(i):
+        barrier.wait()
+        results[i] = batcher.predict(bundles[i % len(bundles)], np.full((1, 3), float(i)), timeout=5)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n_requests)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_requests_share_batches_and_get_their_own_results():
+    batcher = MicroBatcher(max_wait=0.05, max_batch_size=8)
+    bundle = RecordingBundle()
+    results = submit_concurrently(batcher, [bundle], 16)
+    batcher.stop()
+
+    assert results == [3.0 * i for i in range(16)]
+    assert max(bundle.batch_sizes) > 1
+    assert max(bundle.batch_sizes) <= 8
+    stats = batcher.stats()
+    assert stats['requests'] == 16
+    assert stats['batches'] == len(bundle.batch_sizes)
+
+
+def test_rows_from_different_model_versions_are_scored_separately():
+    batcher = MicroBatcher(max_wait=0.05, max_batch_size=64)
+    old, new = RecordingBundle(), RecordingBundle(offset=1000.0)
+    results = submit_concurrently(batcher, [old, new], 10)
+    batcher.stop()
+
+    assert results == [3.0 * i + (1000.0 if i % 2 else 0.0) for i in range(10)]
+    assert sum(old.batch_sizes) == sum(new.batch_sizes) == 5
+
+
+def test_model_errors_reach_every_request_in_the_batch():
+    class FailingBundle:
+        def predict(self, features):
+            raise ValueError('model exploded')
+
+    batcher = MicroBatcher(max_wait=0.001)
+    with pytest.raises(ValueError, match='model exploded'):
+        batcher.predict(FailingBundle(), np.zeros((1, 3)), timeout=5)
+    batcher.stop()
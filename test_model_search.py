@@ -0,0 +1,49 @@
+import os
+
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+
+import model_search
+from benchmarks.synthetic_data import make_listings
+from train_model import build_training_matrix
+
+
+@pytest.fixture
+def small_candidates(monkeypatch):
+    monkeypatch.setattr(model_search, 'CANDIDATES', {
+        'random_forest': (RandomForestRegressor, {'random_state': 0, 'n_jobs': 1},
+                          {'n_estimators': [5, 10]}),
+        'linear_regression': (LinearRegression, {}, {}),
+    })
+
+
+def test_search_saves_trials_and_resumes(tmp_path, small_candidates):
+    X, y, _ = build_training_matrix(make_listings(400, seed=2))
+    search_dir = str(tmp_path / 'search')
+
+    results = model_search.run_search(X, y, search_dir, ['random_forest', 'linear_regression'], cv=3, workers=1)
+    assert len(results) == 3
+    assert all(r['mae'] > 0 and r['predict_ms'] > 0 for r in results)
+    saved = sorted(os.listdir(os.path.join(search_dir, 'trials')))
+    assert saved == sorted(f"{r['trial_id']}.json" for r in results)
+
+    # A second run finds every trial on disk and trains nothing
+    os.remove(os.path.join(search_dir, 'X.npy'))
+    assert model_search.run_search(X, y, search_dir, ['random_forest', 'linear_regression'],
+                                   cv=3, workers=1) == results
+    assert not os.path.exists(os.path.join(search_dir, 'X.npy'))
+
+    # Different data means different trials
+    other = model_search.make_trials(['linear_regression'], 3, 42, model_search.data_fingerprint(X[1:], y[1:]))
+    assert other[0]['trial_id'] not in {r['trial_id'] for r in results}
+
+
+def test_select_best_trades_tiny_accuracy_gaps_for_speed():
+    results = [
+        {'trial_id': 'slow', 'mae': 1.000, 'rmse': 2.00, 'predict_ms': 3.0, 'fit_seconds': 5.0},
+        {'trial_id': 'fast', 'mae': 1.005, 'rmse': 2.01, 'predict_ms': 0.5, 'fit_seconds': 1.0},
+        {'trial_id': 'fastest', 'mae': 1.500, 'rmse': 2.50, 'predict_ms': 0.1, 'fit_seconds': 0.1},
+    ]
+    assert model_search.select_best(results, tolerance=0.01)['trial_id'] == 'fast'
+    assert model_search.select_best(results, tolerance=0.0)['trial_id'] == 'slow'
@@ -0,0 +1,88 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+import app as webapp
+from benchmarks.synthetic_data import make_listings, make_requests
+from flat_forest import FlatForest
+from features import FeaturePipeline
+from model_store import FEATURE_PIPELINE_FILE, ModelBundle, load_bundle, model_fingerprint, write_model_info
+from train_model import build_training_matrix
+
+
+def test_load_bundle_reads_version_and_passes_smoke_test(model_dir):
+    bundle = load_bundle(model_dir)
+
+    assert bundle.version == 'v1'
+    assert np.isfinite(bundle.smoke_test())
+
+
+def test_fingerprint_changes_only_with_model_info(model_dir):
+    before = model_fingerprint(model_dir)
+    (model_dir / FEATURE_PIPELINE_FILE).write_bytes((model_dir / FEATURE_PIPELINE_FILE).read_bytes())
+    assert model_fingerprint(model_dir) == before
+
+    write_model_info({'version': 'v2'}, model_dir)
+    assert model_fingerprint(model_dir) != before
+    assert load_bundle(model_dir).version == 'v2'
+
+
+def test_per_tree_predictions_match_each_estimator_on_both_paths():
+    X, y, pipeline = build_training_matrix(make_listings(500, seed=6))
+    forest = RandomForestRegressor(n_estimators=12, random_state=0).fit(X, y)
+    expected = np.column_stack([tree.predict(X) for tree in forest.estimators_])
+
+    # Flat forest for small inputs, sklearn's apply over the node table for large ones
+    bundle = ModelBundle(pipeline, flat_forest=FlatForest.from_sklearn(forest), model=forest,
+                         flat_forest_max_rows=64)
+    np.testing.assert_allclose(bundle.predict_per_tree(X[:10]), expected[:10])
+    np.testing.assert_allclose(bundle.predict_per_tree(X), expected)
+    np.testing.assert_allclose(ModelBundle(pipeline, model=forest).predict_per_tree(X), expected)
+
+    predictions, quantiles = bundle.predict_quantiles(X, [10, 50, 90])
+    np.testing.assert_allclose(predictions, forest.predict(X))
+    np.testing.assert_allclose(quantiles, np.percentile(expected, [10, 50, 90], axis=1).T)
+    assert (quantiles[:, 0] <= quantiles[:, 2]).all()
+
+
+def test_predict_endpoints_return_requested_quantiles(model_dir, monkeypatch):
+    client = webapp.app.test_client()
+    monkeypatch.setattr(webapp, 'active_model', load_bundle(model_dir))
+    cars = make_requests(3, seed=1)
+
+    body = client.post('/api/predict?quantiles', json=cars[0]).get_json()
+    assert list(body['quantiles']) == ['p10', 'p50', 'p90']
+    assert body['quantiles']['p10'] <= body['quantiles']['p90']
+    assert 'quantiles' not in client.post('/api/predict', json=cars[0]).get_json()
+
+    batch = client.post('/api/predict/batch?quantiles=5,95', json=cars).get_json()
+    assert [list(row['quantiles']) for row in batch['results']] == [['p5', 'p95']] * 3
+    assert batch['results'][0]['quantiles'] == client.post('/api/predict?quantiles=5,95',
+                                                           json=cars[0]).get_json()['quantiles']
+
+    assert client.post('/api/predict?quantiles=150', json=cars[0]).status_code == 400
+
+
+def test_slim_server_predicts_without_importing_pandas_or_sklearn(model_dir):
+    car = make_requests(1, seed=2)[0]
+    served = FeaturePipeline.load_serving(model_dir / FEATURE_PIPELINE_FILE)
+    assert np.array_equal(served.transform_record(car),
+                          FeaturePipeline.load(model_dir / FEATURE_PIPELINE_FILE).transform_record(car))
+
+    script = f"""
+import json, sys
+import app
+app.reload_model({str(model_dir)!r})
+body = app.app.test_client().post('/api/predict', json={car!r}).get_json()
+print(json.dumps({{'price': body['predicted_price'],
+                  'heavy': [m for m in ('pandas', 'sklearn', 'joblib') if m in sys.modules]}}))
+"""
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), env={**os.environ, 'SLIM_SERVING': '1'})
+    output = json.loads(result.stdout.strip().splitlines()[-1])
+    assert output['heavy'] == []
+    assert np.isclose(output['price'], load_bundle(model_dir).predict(served.transform_record(car))[0])
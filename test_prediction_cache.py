@@ -0,0 +1,49 @@
+import numpy as np
+
+from prediction_cache import PredictionCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_counters():
+    cache = PredictionCache(max_size=2)
+    cache.put('a', 1.0)
+    cache.put('b', 2.0)
+    assert cache.get('a') == 1.0  # 'b' is now least recently used
+    cache.put('c', 3.0)
+
+    assert cache.get('b') is None
+    assert cache.get('c') == 3.0
+    stats = cache.stats()
+    assert (stats['size'], stats['hits'], stats['misses']) == (2, 2, 1)
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = PredictionCache(max_size=10, ttl=5, clock=clock)
+    cache.put('a', 1.0)
+    clock.now = 4.9
+    assert cache.get('a') == 1.0
+    clock.now = 5.0
+    assert cache.get('a') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_clear_rejects_values_from_previous_generation():
+    cache = PredictionCache()
+    generation = cache.generation
+    cache.clear()  # model reloaded while the prediction was in flight
+    cache.put('a', 1.0, generation)
+    assert cache.get('a') is None
+
+
+def test_key_is_the_encoded_feature_row():
+    row = np.array([[2015.0, 50000.0, 0.0]])
+    assert PredictionCache.key_for(row) == PredictionCache.key_for(row.copy())
+    assert PredictionCache.key_for(row) != PredictionCache.key_for(row + 1)
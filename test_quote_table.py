@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+import app as webapp
+from benchmarks.synthetic_data import make_listings, make_requests
+from conftest import save_model_dir
+from features import clean_listings
+from model_store import load_bundle, write_model_info
+from quote_table import QUOTE_TABLE_DIR, QuoteTable, build_table, grid_dims, training_matrix
+from train_model import build_training_matrix
+
+BUCKETS = {'Kilometers_Driven': 2, 'Mileage(km/kg)': 1, 'Engine(CC)': 3, 'Power(bhp)': 2, 'Seats': 1}
+
+
+@pytest.fixture(scope="module")
+def model_dir(tmp_path_factory, trained_forest):
+    forest, X, _, pipeline = trained_forest
+    path = save_model_dir(tmp_path_factory.mktemp('models'), forest, pipeline)
+    table = build_table(forest.predict, X, pipeline, grid_dims(X, pipeline, BUCKETS), model_version='v1')
+    table.save(path / QUOTE_TABLE_DIR)
+    return path, forest, X, table
+
+
+def test_quotes_are_exact_predictions_of_the_grid_cell(model_dir):
+    path, forest, X, table = model_dir
+    loaded = QuoteTable.load(path / QUOTE_TABLE_DIR)
+    assert isinstance(loaded.prices, np.memmap)
+    assert loaded.prices.shape == (int(np.prod(loaded.shape)),)
+
+    for row in X[:50]:
+        index = loaded.index(row)
+        cell = loaded.grid_rows(index, index + 1)
+        # The cell keeps every categorical value of the row
+        for column in ['Year', 'Owner_Type', 'Location_Mumbai', 'Fuel_Type_Diesel', 'Transmission_Manual']:
+            j = loaded.columns.index(column)
+            assert cell[0, j] == row[j]
+        assert loaded.lookup(row) == pytest.approx(forest.predict(cell)[0], rel=1e-6)
+
+    # Years outside the grid are not quoted
+    row = X[0].copy()
+    row[loaded.columns.index('Year')] = 1990
+    assert loaded.lookup(row) is None
+
+    errors = np.abs([loaded.lookup(row) for row in X] - forest.predict(X))
+    assert loaded.max_error == pytest.approx(errors.max(), abs=1e-3)
+    assert loaded.stats['coverage'] == 1.0
+
+
+def test_quote_endpoint_uses_the_table_of_the_active_model(model_dir, monkeypatch):
+    path, forest, _, table = model_dir
+    client = webapp.app.test_client()
+    car = make_requests(1, seed=2)[0]
+
+    monkeypatch.setattr(webapp, 'active_model', load_bundle(path))
+    body = client.post('/api/quote', json=car).get_json()
+    features = webapp.active_model.feature_pipeline.transform_record(car)
+    assert body['approximate'] is True
+    assert body['predicted_price'] == pytest.approx(table.lookup(features[0]), rel=1e-6)
+    assert body['max_error'] == table.max_error
+
+    # A table priced by another model version is ignored
+    write_model_info({'version': 'v2'}, path)
+    monkeypatch.setattr(webapp, 'active_model', load_bundle(path))
+    assert webapp.active_model.quote_table is None
+    body = client.post('/api/quote', json=car).get_json()
+    assert body['approximate'] is False
+    assert body['predicted_price'] == pytest.approx(forest.predict(features)[0])
+
+
+def test_training_rows_are_encoded_with_the_models_pipeline():
+    listings = clean_listings(make_listings(600, seed=8))
+    fourth = (listings['Owner_Type'] == 'Fourth & Above').to_numpy()
+    _, _, pipeline = build_training_matrix(listings[~fourth])
+    # Appended rows bring an owner type that sorts before Second: a refit renumbers it
+    refit, _, _ = build_training_matrix(listings)
+
+    X = training_matrix(pipeline, listings)
+    assert len(X) == (~fourth).sum()
+    assert np.array_equal(X, pipeline.transform(listings[~fourth], dtype=np.float32))
+    assert not np.array_equal(refit[~fourth], X)
+
+
+def test_year_axis_follows_the_training_rows(trained_forest):
+    forest, X, _, pipeline = trained_forest
+    years = X[:, pipeline.columns.index('Year')]
+    dims = grid_dims(X, pipeline, BUCKETS)
+    year_dim = next(dim for dim in dims if dim.get('column') == 'Year')
+    assert year_dim['values'] == list(range(int(years.min()), int(years.max()) + 1))
+
+    # A grid no training row falls inside is still built, without error stats
+    table = build_table(forest.predict, X, pipeline, grid_dims(X, pipeline, BUCKETS, years=(1990, 1991)))
+    assert table.stats['coverage'] == 0.0
+    assert table.max_error is None and table.stats['mean_relative_error'] is None
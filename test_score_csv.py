@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_data import make_listings
+from model_store import load_bundle
+from score_csv import ERROR_COLUMN, PREDICTION_COLUMN, score_file
+
+
+def test_scores_in_chunks_like_the_api(tmp_path, model_dir):
+    inventory = make_listings(500, seed=11, null_rate=0.05)
+    inventory.to_csv(tmp_path / 'inventory.csv', index=False)
+
+    n_rows, n_failed, _ = score_file(str(tmp_path / 'inventory.csv'), str(tmp_path / 'priced.csv'),
+                                     model_dir=str(model_dir), chunk_size=64)
+    priced = pd.read_csv(tmp_path / 'priced.csv')
+
+    assert n_rows == len(priced) == len(inventory)
+    assert list(priced.columns) == list(inventory.columns) + [PREDICTION_COLUMN, ERROR_COLUMN]
+    failed = priced[ERROR_COLUMN].notna()
+    assert n_failed == failed.sum() > 0
+    assert priced.loc[failed, PREDICTION_COLUMN].isna().all()
+
+    bundle = load_bundle(str(model_dir))
+    records = inventory[~failed.to_numpy()].to_dict('records')[:20]
+    expected = [bundle.predict(bundle.feature_pipeline.transform_record(r))[0] for r in records]
+    np.testing.assert_allclose(priced.loc[~failed, PREDICTION_COLUMN][:20], expected, atol=1e-4)
+
+
+def test_zero_workers_means_one_process_per_core(tmp_path, model_dir):
+    make_listings(100, seed=12).to_csv(tmp_path / 'inventory.csv', index=False)
+
+    n_rows, _, _ = score_file(str(tmp_path / 'inventory.csv'), str(tmp_path / 'all_cores.csv'),
+                              model_dir=str(model_dir), chunk_size=40, workers=0)
+    score_file(str(tmp_path / 'inventory.csv'), str(tmp_path / 'one.csv'), model_dir=str(model_dir), chunk_size=40)
+    assert n_rows == 100
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'all_cores.csv'), pd.read_csv(tmp_path / 'one.csv'))
@@ -0,0 +1,95 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+import requests
+
+from benchmarks.synthetic_data import make_requests
+from conftest import save_model_dir
+
+SERVE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'serve.py')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(cwd, port, workers=2):
+    process = subprocess.Popen([sys.executable, SERVE_PATH, '--host', '127.0.0.1', '--port', str(port),
+                                '--workers', str(workers)], cwd=cwd,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline and process.poll() is None:
+        try:
+            return process, requests.get(f'http://127.0.0.1:{port}/api/ready', timeout=1)
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    return process, None
+
+
+@pytest.fixture
+def server_dir(tmp_path, trained_forest):
+    forest, _, _, pipeline = trained_forest
+    save_model_dir(tmp_path / 'models', forest, pipeline)
+    return tmp_path
+
+
+def test_workers_serve_the_preloaded_model_and_drain_on_sigterm(server_dir):
+    port = free_port()
+    process, ready = start_server(server_dir, port)
+    try:
+        assert ready is not None and ready.status_code == 200 and ready.json()['ready']
+        url = f'http://127.0.0.1:{port}'
+        pids = {requests.get(f'{url}/api/ready').json()['pid'] for _ in range(20)}
+        assert os.getpid() not in pids
+
+        # A batch still running when SIGTERM arrives is answered before the worker exits
+        body = json.dumps(make_requests(20000))
+        result = {}
+        def post_batch():
+            result['response'] = requests.post(f'{url}/api/predict/batch', data=body, timeout=60,
+                                               headers={'Content-Type': 'application/json'})
+        client = threading.Thread(target=post_batch)
+        client.start()
+        time.sleep(0.3)
+        process.send_signal(signal.SIGTERM)
+        client.join()
+        assert process.wait(timeout=60) == 0
+        assert result['response'].status_code == 200
+        assert result['response'].json()['succeeded'] == 20000
+    finally:
+        if process.poll() is None:
+            process.kill()
+
+
+def test_preload_limits_the_thread_pools_sklearn_loads(server_dir):
+    # A fresh process: importing app no longer loads sklearn or its OpenMP runtime
+    script = """
+import json
+from threadpoolctl import threadpool_info, threadpool_limits
+import serve
+threadpool_limits(1)
+serve.webapp.reload_model('models')
+serve.preload(serve.webapp.active_model)
+print(json.dumps([(pool['user_api'], pool['num_threads']) for pool in threadpool_info()]))
+"""
+    result = subprocess.run([sys.executable, '-c', script], cwd=server_dir, capture_output=True, text=True, check=True,
+                            env={**os.environ, 'PYTHONPATH': os.path.dirname(SERVE_PATH), 'SLIM_SERVING': '0',
+                                 'OMP_NUM_THREADS': '4'})
+    pools = json.loads(result.stdout.strip().splitlines()[-1])
+    assert 'openmp' in {api for api, _ in pools}
+    assert all(threads == 1 for _, threads in pools)
+
+
+def test_server_refuses_to_start_without_a_model(tmp_path):
+    process, ready = start_server(tmp_path, free_port(), workers=1)
+    assert ready is None
+    assert process.wait(timeout=30) == 1
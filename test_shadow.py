@@ -0,0 +1,90 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+import app as webapp
+from benchmarks.synthetic_data import make_listings, make_requests
+from model_store import ModelBundle
+from shadow import ShadowEvaluator, shares_features
+from train_model import build_training_matrix
+
+PIPELINE = SimpleNamespace(columns=['a', 'b', 'c'], encoder=SimpleNamespace(codes={}))
+
+
+class SumBundle:
+    """Stands in for a ModelBundle: predicts the row sum plus an offset"""
+
+    def __init__(self, offset=0.0, release=None):
+        self.version = f'sum+{offset:g}'
+        self.feature_pipeline = PIPELINE
+        self.offset = offset
+        self.release = release
+        self.batch_sizes = []
+
+    def predict(self, features):
+        if self.release is not None:
+            self.release.wait(5)
+        self.batch_sizes.append(len(features))
+        return features.sum(axis=1) + self.offset
+
+
+def test_sampled_rows_are_scored_in_batches_and_compared():
+    primary, candidate = SumBundle(), SumBundle(offset=2.0)
+    shadow = ShadowEvaluator(candidate, sample_rate=1.0, max_batch_size=8, max_wait=0.05)
+    for i in range(20):
+        features = np.full((1, 3), float(i))
+        assert shadow.offer(primary, None, features, primary.predict(features)[0], primary_seconds=0.001)
+    shadow.stop()
+
+    stats = shadow.stats()
+    assert (stats['offered'], stats['sampled'], stats['scored'], stats['dropped']) == (20, 20, 20, 0)
+    assert stats['difference']['mean'] == stats['difference']['abs']['max'] == 2.0
+    assert max(candidate.batch_sizes) <= 8 and sum(candidate.batch_sizes) == 20
+    assert stats['latency_ms']['primary']['p50'] == 1.0
+
+
+def test_full_queue_drops_samples_instead_of_blocking():
+    release = threading.Event()
+    candidate = SumBundle(release=release)
+    shadow = ShadowEvaluator(candidate, sample_rate=1.0, queue_size=2, max_batch_size=1)
+
+    start = time.perf_counter()
+    queued = sum(shadow.offer(SumBundle(), None, np.ones((1, 3)), 3.0) for _ in range(10))
+    assert time.perf_counter() - start < 1.0
+    release.set()
+    shadow.stop()
+
+    stats = shadow.stats()
+    assert queued <= 3 and stats['dropped'] == 10 - queued
+    assert stats['scored'] == queued
+    assert not shadow.offer(SumBundle(), None, np.ones((1, 3)), 3.0)
+
+
+def test_predict_endpoint_feeds_a_candidate_with_its_own_encoding(monkeypatch):
+    bundles = []
+    for seed in (5, 6):
+        listings = make_listings(600, seed=seed)
+        if seed == 6:
+            # A company sorted first renumbers every other company
+            listings.loc[:50, 'Name'] = 'Abarth Punto Evo'
+        X, y, pipeline = build_training_matrix(listings)
+        bundles.append(ModelBundle(pipeline, model=RandomForestRegressor(n_estimators=5, random_state=0).fit(X, y)))
+    primary, candidate = bundles
+    assert not shares_features(primary, candidate)
+
+    client = webapp.app.test_client()
+    shadow = ShadowEvaluator(candidate, sample_rate=1.0)
+    monkeypatch.setattr(webapp, 'active_model', primary)
+    monkeypatch.setattr(webapp, 'shadow', shadow)
+    webapp.prediction_cache.clear()
+    cars = make_requests(5, seed=3)
+    served = [client.post('/api/predict', json=car).get_json()['predicted_price'] for car in cars]
+    shadow.stop()
+
+    expected = [candidate.predict(candidate.feature_pipeline.transform_record(car))[0] for car in cars]
+    stats = client.get('/api/health').get_json()['shadow']
+    assert stats['scored'] == 5 and stats['candidate_version'] == candidate.version
+    assert np.isclose(stats['difference']['mean'], np.mean(np.subtract(expected, served)), atol=1e-4)
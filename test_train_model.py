@@ -0,0 +1,55 @@
+import json
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import train_model
+from benchmarks.synthetic_data import make_listings
+from model_store import MODEL_INFO_FILE, load_bundle
+
+
+def test_incremental_update_reads_only_new_rows_and_versions_the_result(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_listings(600, seed=1).to_csv('train-data.csv')
+    train_model.train_and_save_model()
+    parent = json.loads((tmp_path / 'models' / MODEL_INFO_FILE).read_text())
+    assert [s['stage'] for s in parent['training_report']['stages']][:3] == ['hash data', 'read csv', 'build features']
+
+    # Nothing new yet
+    assert train_model.update_and_save_model(add_trees=5) is None
+
+    new = make_listings(300, seed=2)
+    new['Name'] = 'Tesla Model3 VX'
+    new.index += 600
+    new.to_csv('train-data.csv', mode='a', header=False)
+    version = train_model.update_and_save_model(add_trees=5, max_trees=102)
+
+    info = json.loads((tmp_path / 'models' / MODEL_INFO_FILE).read_text())
+    assert info['version'] == version
+    assert info['data']['rows'] == 900
+    changes = info['incremental']
+    assert changes['parent_version'] == parent['version']
+    assert changes['new_rows'] + changes['skipped_rows'] == 300
+    assert changes['new_categories'] == {'Company': ['Tesla']}
+    assert (changes['n_estimators'], changes['trees_dropped']) == (102, 3)
+    assert len(joblib.load('models/random_forest_model.joblib').estimators_) == 102
+
+    # Both versions are archived and loadable; only the new one knows Tesla
+    old = load_bundle(f"models/versions/{parent['version']}")
+    new_bundle = load_bundle(f'models/versions/{version}')
+    assert 'Tesla' not in old.feature_pipeline.encoder.codes['Company']
+    assert new_bundle.feature_pipeline.encoder.codes['Company']['Tesla'] == len(old.label_encoders['Company'].classes_)
+
+
+def test_compact_listings_encode_like_the_plain_csv(tmp_path):
+    path = tmp_path / 'train-data.csv'
+    make_listings(400, seed=4).to_csv(path)
+    listings, _ = train_model.read_listings(path)
+    assert listings['Location'].dtype == 'category'
+
+    X, y, _ = train_model.build_training_matrix(listings)
+    plain_X, plain_y, _ = train_model.build_training_matrix(pd.read_csv(path))
+    assert X.dtype == np.float32
+    np.testing.assert_array_equal(X, plain_X)
+    np.testing.assert_array_equal(y, plain_y)
@@ -1,126 +1,392 @@
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import train_test_split
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
 import joblib
+import io
 import os
+import shutil
+import time
+import argparse
+from features import (FeaturePipeline, clean_listings, serving_pipeline_path, FEATURE_PIPELINE_PATH, LISTING_DTYPES,
+                      REQUIRED_FIELDS)
+from flat_forest import FlatForest, FLAT_FOREST_PATH, can_flatten
+from feature_cache import FEATURE_CACHE_DIR, load_or_build
+from drift import DRIFT_REFERENCE_FILE, DriftSketch
+from stage_report import StageReport
+from model_store import (MODEL_DIR, MODEL_FILE, MODEL_INFO_FILE, VERSIONS_DIR, archive_version,
+                         read_model_info, write_model_info)
+from model_search import CANDIDATES, SEARCH_DIR, build_estimator, print_leaderboard, run_search, select_best
 
-def train_and_save_model():
-    """Train the model and save it for the Flask application"""
+TRAIN_DATA_PATH = './train-data.csv'
+
+# Columns of train-data.csv that training reads
+TRAINING_COLUMNS = REQUIRED_FIELDS + ['Price']
+
+# Model engines selectable with --engine: (estimator class, parameters, label)
+ENGINES = {
+    'random_forest': (RandomForestRegressor, {'n_estimators': 100, 'random_state': 42}, 'Random Forest'),
+    # Bins each feature into at most 255 histogram buckets and fits shallow
+    # boosted trees on the bins, on every core
+    'hist_gradient_boosting': (HistGradientBoostingRegressor,
+                               {'max_iter': 500, 'learning_rate': 0.05, 'early_stopping': False,
+                                'random_state': 42},
+                               'Histogram Gradient Boosting'),
+}
+
+def build_engine(name):
+    """Unfitted estimator for engine ``name``"""
+    estimator_class, params, _ = ENGINES[name]
+    return estimator_class(**params)
+
+class FileSlice(io.RawIOBase):
+    """Read-only view of the next ``length`` bytes of an open binary file"""
     
-    print("Loading training data...")
-    # Load the training data
-    train_data = pd.read_csv('./train-data.csv')
+    def __init__(self, f, length):
+        self.f = f
+        self.remaining = length
+    
+    def readable(self):
+        return True
     
-    print("Data preprocessing...")
+    def readinto(self, buffer):
+        n = self.f.readinto(memoryview(buffer)[:max(0, min(len(buffer), self.remaining))])
+        self.remaining -= n
+        return n
+
+def read_listings(path=TRAIN_DATA_PATH, offset=0):
+    """Read the listings stored in ``path`` after byte ``offset`` (0 = all of them).
+    
+    Only the columns training uses are kept, with compact dtypes, and the
+    file is parsed straight from disk. Returns the listings and the file
+    size that was read, which the next incremental run passes back as
+    ``offset`` to read only newer rows.
+    """
+    with open(path, 'rb') as f:
+        header = f.readline()
+        size = os.fstat(f.fileno()).st_size
+        if offset > size:
+            raise ValueError(f"{path} is smaller than when the model was trained; run a full retrain")
+        f.seek(max(offset, len(header)))
+        options = {'usecols': TRAINING_COLUMNS, 'dtype': LISTING_DTYPES}
+        if f.tell() == size:
+            return pd.read_csv(io.BytesIO(header), **options), size
+        # Rows appended while reading are left for the next run
+        columns = pd.read_csv(io.BytesIO(header), nrows=0).columns
+        listings = pd.read_csv(io.BufferedReader(FileSlice(f, size - f.tell())), header=None, names=columns,
+                               **options)
+    
+    return listings, size
+
+def data_info(path, offset, n_rows):
+    """Record of the training data read so far, saved in model_info.json"""
+    return {'path': os.path.abspath(path), 'offset': offset, 'rows': int(n_rows)}
+
+def build_training_matrix(train_data):
+    """Turn raw listings into the model feature matrix, target and fitted feature pipeline.
+    
+    The matrix is float32: sklearn's trees split on float32 features anyway,
+    and the server casts its rows the same way (see ModelBundle.predict).
+    """
     # Data preprocessing (same as in notebook)
-    train_data = train_data[train_data['Mileage'].notna()]
-    train_data = train_data[train_data['Engine'].notna()]
-    train_data = train_data[train_data['Power'].notna()]
-    train_data = train_data[train_data['Seats'].notna()]
-    train_data = train_data.reset_index(drop=True)
-    
-    # Feature engineering
-    for i in range(train_data.shape[0]):
-        train_data.at[i, 'Company'] = train_data['Name'][i].split()[0]
-        train_data.at[i, 'Mileage(km/kg)'] = train_data['Mileage'][i].split()[0]
-        train_data.at[i, 'Engine(CC)'] = train_data['Engine'][i].split()[0]
-        train_data.at[i, 'Power(bhp)'] = train_data['Power'][i].split()[0]
-    
-    # Convert to numeric
-    train_data['Mileage(km/kg)'] = train_data['Mileage(km/kg)'].astype(float)
-    train_data['Engine(CC)'] = train_data['Engine(CC)'].astype(float)
-    
-    # Remove rows with 'null' in Power
-    train_data = train_data[train_data['Power(bhp)'] != 'null']
-    train_data = train_data.reset_index(drop=True)
-    train_data['Power(bhp)'] = train_data['Power(bhp)'].astype(float)
-    
-    # Handle New_Price
-    for i in range(train_data.shape[0]):
-        if pd.isnull(train_data.loc[i,'New_Price']) == False:
-            train_data.at[i,'New_car_Price'] = train_data['New_Price'][i].split()[0]
-    
-    train_data['New_car_Price'] = train_data['New_car_Price'].astype(float)
-    
-    # Drop original columns
-    train_data.drop(["Name", "Mileage", "Engine", "Power", "New_Price"], axis=1, inplace=True)
-    
-    print("Encoding categorical variables...")
-    # Encode categorical variables
-    label_encoders = {}
-    categorical_columns = ['Location', 'Fuel_Type', 'Transmission', 'Owner_Type', 'Company']
-    
-    for col in categorical_columns:
-        le = LabelEncoder()
-        train_data[col] = le.fit_transform(train_data[col])
-        label_encoders[col] = le
-    
-    # Create dummy variables
-    location_dummies = pd.get_dummies(train_data['Location'], prefix='Location')
-    fuel_dummies = pd.get_dummies(train_data['Fuel_Type'], prefix='Fuel_Type')
-    transmission_dummies = pd.get_dummies(train_data['Transmission'], prefix='Transmission')
-    
-    # Combine features
-    final_train = pd.concat([
-        train_data[['Year', 'Kilometers_Driven', 'Owner_Type', 'Seats', 
-                   'Mileage(km/kg)', 'Engine(CC)', 'Power(bhp)']],
-        location_dummies,
-        fuel_dummies,
-        transmission_dummies
-    ], axis=1)
-    
-    # Prepare features and target
-    X = final_train.loc[:,['Year', 'Kilometers_Driven', 'Owner_Type', 'Seats',
-                          'Mileage(km/kg)', 'Engine(CC)', 'Power(bhp)',
-                          'Location_Bangalore', 'Location_Chennai', 'Location_Coimbatore',
-                          'Location_Delhi', 'Location_Hyderabad', 'Location_Jaipur',
-                          'Location_Kochi', 'Location_Kolkata', 'Location_Mumbai',
-                          'Location_Pune', 'Fuel_Type_Diesel', 'Fuel_Type_LPG',
-                          'Fuel_Type_Petrol', 'Transmission_Manual']]
-    
-    y = train_data['Price']
-    
-    print("Training Random Forest model...")
-    # Train Random Forest model
-    rf_reg = RandomForestRegressor(n_estimators=100, random_state=42)
-    rf_reg.fit(X, y)
+    listings = clean_listings(train_data)
     
-    # Evaluate model
-    y_pred = rf_reg.predict(X)
-    from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
+    # Fit the shared feature pipeline and encode every listing
+    pipeline = FeaturePipeline()
+    X = pipeline.fit_transform(listings, dtype=np.float32)
+    y = listings['Price'].to_numpy(dtype=np.float64)
     
-    r2 = r2_score(y, y_pred)
-    mae = mean_absolute_error(y, y_pred)
-    rmse = np.sqrt(mean_squared_error(y, y_pred))
+    return X, y, pipeline
+
+def load_training_data(use_cache=True, report=None):
+    """Feature matrix, target, fitted pipeline and data record for train-data.csv.
     
-    print(f"Model Performance:")
-    print(f"R² Score: {r2:.4f}")
-    print(f"Mean Absolute Error: {mae:.4f}")
-    print(f"Root Mean Squared Error: {rmse:.4f}")
+    With ``use_cache`` the engineered matrix is memory-mapped from the
+    feature cache when neither the CSV nor the preprocessing code changed.
+    Loading is recorded as stages of ``report`` when one is given.
+    """
+    report = report or StageReport()
+    start = time.perf_counter()
+    if use_cache:
+        X, y, pipeline, meta = load_or_build(TRAIN_DATA_PATH, read_listings, build_training_matrix,
+                                             FEATURE_CACHE_DIR, report)
+        offset, n_rows = meta['offset'], meta['rows']
+        source = {'hit': 'feature cache', 'miss': 'CSV (cached for next time)'}.get(meta['cache'], 'CSV')
+    else:
+        with report.stage('read csv'):
+            train_data, offset = read_listings()
+        n_rows = len(train_data)
+        with report.stage('build features'):
+            X, y, pipeline = build_training_matrix(train_data)
+            del train_data
+        source = 'CSV'
+    print(f"Loaded {X.shape[0]:,} training rows from {source} in {time.perf_counter() - start:.2f}s")
+    return X, y, pipeline, data_info(TRAIN_DATA_PATH, offset, n_rows)
+
+def export_flat_forest(rf_reg, X, path=FLAT_FOREST_PATH):
+    """Flatten the trained forest (or boosted trees) into node arrays and check it against sklearn"""
+    flat_forest = FlatForest.from_sklearn(rf_reg)
     
+    sample = X[:1000]
+    max_diff = np.abs(flat_forest.predict(sample) - rf_reg.predict(sample)).max()
+    if max_diff > 1e-6:
+        raise ValueError(f"Flat forest disagrees with sklearn (max diff {max_diff:.3g})")
+    
+    flat_forest.save(path)
+    return flat_forest
+
+def evaluate_model(model, X, y):
+    """R², MAE and RMSE of ``model`` on (X, y)"""
+    from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
+    
+    y_pred = model.predict(X)
+    return {
+        'r2': float(r2_score(y, y_pred)),
+        'mae': float(mean_absolute_error(y, y_pred)),
+        'rmse': float(np.sqrt(mean_squared_error(y, y_pred))),
+    }
+
+def save_model(model, X, y, pipeline, metrics, extra_info=None, drift_reference=None):
+    """Save the model, encoders and feature pipeline for the Flask application.
+    
+    The drift monitor's reference sketch is built from ``X`` unless one is given.
+    Callers pass their StageReport's ``as_dict()`` in ``extra_info`` while
+    its 'save' stage is still running, so the ``training_report`` saved in
+    model_info.json has no 'save' stage. Adding it afterwards would mean
+    rewriting model_info.json, and the model watcher would reload twice.
+    """
     # Create models directory
     if not os.path.exists('models'):
         os.makedirs('models')
     
     # Save model and encoders
     print("Saving model and encoders...")
-    joblib.dump(rf_reg, 'models/random_forest_model.joblib')
-    joblib.dump(label_encoders, 'models/label_encoders.joblib')
+    joblib.dump(model, 'models/random_forest_model.joblib')
+    joblib.dump(pipeline.label_encoders, 'models/label_encoders.joblib')
+    pipeline.save(FEATURE_PIPELINE_PATH)
+    
+    if can_flatten(model):
+        print("Exporting flat forest for fast inference...")
+        export_flat_forest(model, X)
+    elif os.path.exists(FLAT_FOREST_PATH):
+        # A stale forest would be served instead of the new model
+        shutil.rmtree(FLAT_FOREST_PATH)
+    
+    # Feature distributions the server's drift monitor compares requests with
+    if drift_reference is None:
+        drift_reference = DriftSketch.from_matrix(X, pipeline)
+    drift_reference.save(os.path.join(MODEL_DIR, DRIFT_REFERENCE_FILE))
+    
+    # Versions also name the archive directories, so never reuse one
+    version = timestamp = time.strftime('%Y%m%d-%H%M%S')
+    previous = read_model_info(MODEL_DIR).get('version')
+    suffix = 1
+    while version == previous or os.path.exists(os.path.join(MODEL_DIR, VERSIONS_DIR, version)):
+        suffix += 1
+        version = f'{timestamp}-{suffix}'
     
-    print("Model and encoders saved successfully!")
+    # Written last: a running server's model watcher reloads when it changes
+    write_model_info({
+        'version': version,
+        'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'model_type': type(model).__name__,
+        'n_rows': int(len(y)),
+        'metrics': metrics,
+        **(extra_info or {}),
+    }, MODEL_DIR)
+    
+    print(f"Model and encoders saved successfully! (version {version})")
     print("Files saved:")
     print("- models/random_forest_model.joblib")
     print("- models/label_encoders.joblib")
+    print(f"- {FEATURE_PIPELINE_PATH}")
+    print(f"- {serving_pipeline_path(FEATURE_PIPELINE_PATH)}")
+    print(f"- {MODEL_DIR}/{DRIFT_REFERENCE_FILE}")
+    if can_flatten(model):
+        print(f"- {FLAT_FOREST_PATH}")
+    print(f"- {MODEL_DIR}/{MODEL_INFO_FILE}")
+    return version
+
+def train_and_save_model(use_cache=True, engine='random_forest'):
+    """Train the model and save it for the Flask application"""
+    
+    report = StageReport()
+    print("Loading training data...")
+    # Load the training data (preprocessed, from the feature cache when possible)
+    X, y, pipeline, data = load_training_data(use_cache, report)
+    label_encoders = pipeline.label_encoders
+    
+    print(f"Training {ENGINES[engine][2]} model...")
+    model = build_engine(engine)
+    start = time.perf_counter()
+    with report.stage('fit'):
+        model.fit(X, y)
+    fit_seconds = time.perf_counter() - start
+    print(f"Fitted in {fit_seconds:.1f}s")
+    
+    # Evaluate model
+    with report.stage('evaluate'):
+        metrics = evaluate_model(model, X, y)
+    
+    print(f"Model Performance:")
+    print(f"R² Score: {metrics['r2']:.4f}")
+    print(f"Mean Absolute Error: {metrics['mae']:.4f}")
+    print(f"Root Mean Squared Error: {metrics['rmse']:.4f}")
+    
+    with report.stage('save'):
+        save_model(model, X, y, pipeline, metrics, extra_info={
+            'engine': engine, 'fit_seconds': round(fit_seconds, 2), 'data': data,
+            'training_report': report.as_dict()})
+    report.print()
+    
+    return model, label_encoders
+
+def search_and_save_model(model_names, cv=5, workers=None, search_dir=SEARCH_DIR, tolerance=0.01, use_cache=True):
+    """Cross-validate every candidate model, then refit the best one and save it"""
     
-    return rf_reg, label_encoders
+    report = StageReport()
+    print("Loading training data...")
+    X, y, pipeline, data = load_training_data(use_cache, report)
+    
+    with report.stage('search'):
+        results = run_search(X, y, search_dir, model_names, cv=cv, workers=workers)
+    chosen = select_best(results, tolerance)
+    print_leaderboard(results, chosen)
+    print(f"\n🏆 Selected {chosen['trial_id']}: {chosen['model']} {chosen['params']}")
+    
+    print("Refitting the selected model on all rows...")
+    model = build_estimator(chosen['model'], chosen['params'])
+    with report.stage('fit'):
+        model.fit(X, y)
+    
+    metrics = {key: chosen[key] for key in ['mae', 'rmse', 'r2']}
+    metrics['evaluated_on'] = f"{cv}-fold cross-validation"
+    with report.stage('save'):
+        save_model(model, X, y, pipeline, metrics, extra_info={
+            'search': {'trial_id': chosen['trial_id'], 'params': chosen['params'],
+                       'fit_seconds': chosen['fit_seconds'], 'predict_ms': chosen['predict_ms'],
+                       'trials': len(results)},
+            'data': data,
+            'training_report': report.as_dict(),
+        })
+    report.print()
+    return model, chosen
+
+def update_and_save_model(add_trees=20, max_trees=None, min_rows=50):
+    """Grow the saved forest with trees fitted on the listings added since it was trained.
+    
+    Only the rows appended to train-data.csv after the recorded offset are
+    read. Unseen categories are appended to the encoders without renumbering
+    the known ones, and ``add_trees`` new trees are fitted on the new rows
+    (warm start). With ``max_trees`` the oldest trees are dropped beyond that
+    size. The result is saved as a new model version and archived under
+    models/versions/.
+    """
+    info = read_model_info(MODEL_DIR)
+    if 'data' not in info:
+        raise ValueError("The saved model does not record which rows it was trained on; run a full retrain first")
+    model = joblib.load(os.path.join(MODEL_DIR, MODEL_FILE))
+    if not hasattr(model, 'estimators_'):
+        raise ValueError(f"Incremental updates need a forest, not {type(model).__name__}; run a full retrain")
+    pipeline = FeaturePipeline.load(FEATURE_PIPELINE_PATH)
+    
+    report = StageReport()
+    print(f"Loading listings added since version {info['version']}...")
+    with report.stage('read csv'):
+        new_data, data_offset = read_listings(TRAIN_DATA_PATH, info['data']['offset'])
+    listings = clean_listings(new_data)
+    if len(listings) < min_rows:
+        print(f"Only {len(listings)} new usable listings (need {min_rows}); nothing to do.")
+        return None
+    
+    # New companies/locations get codes after the known ones
+    new_categories = pipeline.extend(listings)
+    for col, categories in new_categories.items():
+        print(f"New {col} values: {', '.join(map(str, categories))}")
+    with report.stage('build features'):
+        features, errors = pipeline.transform_frame(listings, dtype=np.float32)
+    ok = errors == ''
+    if not ok.all():
+        print(f"⚠️  Skipping {int((~ok).sum())} new rows that cannot be encoded (first: {errors[~ok][0]})")
+    X, y = features[ok], listings['Price'].to_numpy()[ok]
+    
+    # Keep the version being replaced, so it can be rolled back to
+    if not os.path.exists(os.path.join(MODEL_DIR, VERSIONS_DIR, info['version'])):
+        archive_version(MODEL_DIR)
+    
+    before = evaluate_model(model, X, y)
+    n_before = len(model.estimators_)
+    print(f"Adding {add_trees} trees fitted on {len(y)} new rows to the {n_before}-tree forest...")
+    model.set_params(warm_start=True, n_estimators=n_before + add_trees)
+    with report.stage('fit'):
+        model.fit(X, y)
+    dropped = 0
+    if max_trees and len(model.estimators_) > max_trees:
+        # Keep the most recent trees
+        dropped = len(model.estimators_) - max_trees
+        model.estimators_ = model.estimators_[dropped:]
+        model.n_estimators = max_trees
+    # A later fit() on this object should start from scratch again
+    model.warm_start = False
+    
+    after = evaluate_model(model, X, y)
+    print(f"MAE on the new rows: {before['mae']:.4f} before, {after['mae']:.4f} after")
+    
+    metrics = {**after, 'evaluated_on': f"{len(y)} new rows (seen by the added trees)"}
+    # The forest now reflects the old rows and the new ones
+    reference_path = os.path.join(MODEL_DIR, DRIFT_REFERENCE_FILE)
+    drift_reference = DriftSketch.load(reference_path).extended(X) if os.path.exists(reference_path) else None
+    with report.stage('save'):
+        version = save_model(model, X, y, pipeline, metrics, extra_info={
+            'n_rows': info.get('n_rows', 0) + int(len(y)),
+            'data': data_info(TRAIN_DATA_PATH, data_offset, info['data']['rows'] + len(new_data)),
+            'incremental': {
+                'parent_version': info['version'],
+                'new_rows': int(len(y)),
+                'skipped_rows': int(len(new_data) - len(y)),
+                'trees_added': add_trees,
+                'trees_dropped': dropped,
+                'n_estimators': len(model.estimators_),
+                'new_categories': new_categories,
+                'mae_before': before['mae'],
+            },
+            'training_report': report.as_dict(),
+        }, drift_reference=drift_reference)
+    report.print()
+    print(f"Archived as {archive_version(MODEL_DIR)}")
+    return version
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the car price model and save it to models/")
+    parser.add_argument('--engine', choices=list(ENGINES), default='random_forest',
+                        help='Model to train (default: random_forest)')
+    parser.add_argument('--search', action='store_true',
+                        help='Cross-validate the candidate models and save the best one')
+    parser.add_argument('--models', nargs='+', choices=list(CANDIDATES), default=list(CANDIDATES))
+    parser.add_argument('--cv', type=int, default=5, help='Cross-validation folds')
+    parser.add_argument('--workers', type=int, help='Search processes (default: all cores)')
+    parser.add_argument('--search-dir', default=SEARCH_DIR, help='Where finished trials are saved')
+    parser.add_argument('--tolerance', type=float, default=0.01,
+                        help='Trials this close (fraction) to the best MAE/RMSE compete on speed')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Parse train-data.csv without the feature cache (and leave the cache untouched)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Grow the saved forest with trees fitted on rows added since it was trained')
+    parser.add_argument('--add-trees', type=int, default=20, help='Trees added by --incremental')
+    parser.add_argument('--max-trees', type=int, help='With --incremental, drop the oldest trees beyond this')
+    args = parser.parse_args()
+    
     try:
-        train_and_save_model()
+        if args.incremental:
+            update_and_save_model(args.add_trees, args.max_trees)
+        elif args.search:
+            search_and_save_model(args.models, args.cv, args.workers, args.search_dir, args.tolerance,
+                                  not args.no_cache)
+        else:
+            train_and_save_model(not args.no_cache, args.engine)
     except FileNotFoundError:
         print("Error: train-data.csv not found!")
         print("Please ensure the training data file is in the current directory.")
+    except KeyboardInterrupt:
+        pass
     except Exception as e:
-        print(f"Error during training: {str(e)}") 
\ No newline at end of file
+        print(f"Error during training: {str(e)}")